@@ -0,0 +1,28 @@
+"""analysis_fingerprint
+
+Revision ID: 30e891f7af69
+Revises: 823b6605dc5b
+Create Date: 2026-10-18 18:10:05.274911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '30e891f7af69'
+down_revision: Union[str, Sequence[str], None] = '823b6605dc5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tracker_categories', sa.Column('analysis_fingerprint', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tracker_categories', 'analysis_fingerprint')
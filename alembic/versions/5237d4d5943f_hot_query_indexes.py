@@ -0,0 +1,67 @@
+"""hot_query_indexes
+
+Revision ID: 5237d4d5943f
+Revises: dffd3d950ba3
+Create Date: 2026-10-18 14:05:12.431870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5237d4d5943f'
+down_revision: Union[str, Sequence[str], None] = 'dffd3d950ba3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 🌟 user_stock_watch 在舊資料庫是手動建立的 (見 fe3f26b43b98)，
+    # 建立唯一索引前先清掉重複的 (user_id, stock_symbol)，保留最早那筆 (add_stock 更新的就是那筆)
+    if _has_table('user_stock_watch'):
+        op.execute("""
+            DELETE FROM user_stock_watch a
+            USING user_stock_watch b
+            WHERE a.user_id = b.user_id
+              AND a.stock_symbol = b.stock_symbol
+              AND a.id > b.id
+        """)
+
+    # 🌟 life_records 可能有數百萬筆，使用 CONCURRENTLY 建索引才不會鎖住寫入；
+    # CONCURRENTLY 不能在交易內執行，所以放進 autocommit_block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_life_records_category_id_created_at', 'life_records',
+                        ['category_id', 'created_at'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_calendar_events_event_time', 'calendar_events',
+                        ['event_time'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_categorized_emails_category_id_id', 'categorized_emails',
+                        ['category_id', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        if _has_table('user_stock_watch'):
+            op.create_index('uq_user_stock_watch_user_id_stock_symbol', 'user_stock_watch',
+                            ['user_id', 'stock_symbol'], unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        if _has_table('user_stock_watch'):
+            op.drop_index('uq_user_stock_watch_user_id_stock_symbol', table_name='user_stock_watch',
+                          postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_categorized_emails_category_id_id', table_name='categorized_emails',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_calendar_events_event_time', table_name='calendar_events',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_life_records_category_id_created_at', table_name='life_records',
+                      postgresql_concurrently=True, if_exists=True)
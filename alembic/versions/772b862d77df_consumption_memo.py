@@ -0,0 +1,38 @@
+"""consumption_memo
+
+Revision ID: 772b862d77df
+Revises: 30e891f7af69
+Create Date: 2026-10-18 18:52:40.117623
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '772b862d77df'
+down_revision: Union[str, Sequence[str], None] = '30e891f7af69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('consumption_memos',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('normalized_name', sa.String(), nullable=False),
+    sa.Column('subcategory_id', sa.Integer(), nullable=True),
+    sa.Column('source', sa.String(length=10), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['subcategory_id'], ['tracker_subcategories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.discord_id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'normalized_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('consumption_memos')
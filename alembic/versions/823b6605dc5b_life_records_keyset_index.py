@@ -0,0 +1,40 @@
+"""life_records_keyset_index
+
+Revision ID: 823b6605dc5b
+Revises: ce92ef93bc67
+Create Date: 2026-10-18 17:02:33.906114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '823b6605dc5b'
+down_revision: Union[str, Sequence[str], None] = 'ce92ef93bc67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 🌟 紀錄列表改用 (created_at, id) keyset 翻頁，索引補上 id 才能一次定位；
+    # 新索引涵蓋舊索引的前綴，建好後即可移除舊的
+    with op.get_context().autocommit_block():
+        op.create_index('ix_life_records_category_id_created_at_id', 'life_records',
+                        ['category_id', 'created_at', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_life_records_category_id_created_at', table_name='life_records',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_life_records_category_id_created_at', 'life_records',
+                        ['category_id', 'created_at'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_life_records_category_id_created_at_id', table_name='life_records',
+                      postgresql_concurrently=True, if_exists=True)
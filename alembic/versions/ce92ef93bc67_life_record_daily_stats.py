@@ -0,0 +1,55 @@
+"""life_record_daily_stats
+
+Revision ID: ce92ef93bc67
+Revises: 5237d4d5943f
+Create Date: 2026-10-18 16:21:47.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ce92ef93bc67'
+down_revision: Union[str, Sequence[str], None] = '5237d4d5943f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('life_record_daily_stats',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('subcat_name', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('field', sa.String(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['tracker_categories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id', 'subcat_name', 'day', 'field')
+    )
+
+    # 🌟 回填既有紀錄 (與 LifeTracker_Manager._apply_daily_stats 相同的規則)，
+    # 之後也可以用 python -m cogs.LifeTracker.backfill_daily_stats 重建
+    op.execute(r"""
+        INSERT INTO life_record_daily_stats (category_id, subcat_name, day, field, total, record_count)
+        SELECT r.category_id,
+               coalesce(nullif(r.subcat_name, ''), '其他'),
+               date(timezone('Asia/Taipei', CAST(r.created_at AS TIMESTAMP WITH TIME ZONE))),
+               kv.key,
+               sum(CAST(kv.value AS FLOAT)),
+               count(*)
+        FROM life_records r
+        JOIN LATERAL json_each_text(
+            CASE WHEN json_typeof(r.values) = 'object' THEN r.values ELSE '{}'::json END
+        ) AS kv ON true
+        WHERE kv.value ~ '^\s*[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*$'
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('life_record_daily_stats')
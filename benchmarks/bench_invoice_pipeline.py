@@ -0,0 +1,256 @@
+# benchmarks/bench_invoice_pipeline.py
+"""
+發票抓取流程基準測試
+
+啟動本機假平台 (benchmarks.mock_einvoice_portal)，建立 N 位模擬使用者，
+對每位使用者跑完整的 InvoicePipeline.execute，最後輸出各步驟的耗時統計：
+    driver_start / login / query / download / parse / classify / insert / total
+
+使用方式：
+    python -m benchmarks.bench_invoice_pipeline --users 10
+    python -m benchmarks.bench_invoice_pipeline --users 10 --mode http --reuse-session   # 不需要 Chrome
+    python -m benchmarks.bench_invoice_pipeline --users 10 --latency 0.2 --concurrency 2
+
+--mode http 打的是假平台自訂的匯出 API，正式平台的匯出路徑尚未確認，結果只能代表流程本身的成本。
+預設使用假的 AI 分類 (依關鍵字判斷，可用 --ai-latency 模擬 API 延遲)，加上 --real-ai 才會真的呼叫 OpenRouter。
+模擬使用者的 ID 從 BENCH_USER_BASE 開始，結束時會刪除這些使用者的所有資料 (--keep-data 保留)。
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmarks.mock_einvoice_portal import EXPORT_PATH, MOCK_PASSWORD, serve_in_thread
+
+BENCH_USER_BASE = 9_100_000_000
+STEPS = ["driver_start", "login", "query", "download", "parse", "classify", "insert", "total"]
+
+
+class StepTimer:
+    """把各模組的函式包一層計時 (同步、非同步都可以)，依步驟名稱累計"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add(self, step: str, seconds: float):
+        with self._lock:
+            self.samples[step].append(seconds)
+
+    def wrap(self, owner, name: str, step: str):
+        original = inspect.getattr_static(owner, name)
+        is_static = isinstance(original, staticmethod)
+        func = original.__func__ if isinstance(original, (staticmethod, classmethod)) else original
+        timer = self
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timer.add(step, time.perf_counter() - started)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    timer.add(step, elapsed)
+                    if step == "download":
+                        # download_csv 裡面等待下載的時間要從 query 扣掉
+                        timer._local.waited = getattr(timer._local, "waited", 0.0) + elapsed
+
+        if is_static:
+            wrapper = staticmethod(wrapper)
+        elif isinstance(original, classmethod):
+            wrapper = classmethod(wrapper)
+        setattr(owner, name, wrapper)
+
+    def wrap_query(self, owner, name: str):
+        """InvoiceCrawler.download_csv = 操作日曆查詢 (query) + 等待檔案下載 (download)"""
+        func = getattr(owner, name)
+        timer = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timer._local.waited = 0.0
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.add("query", time.perf_counter() - started - timer._local.waited)
+
+        setattr(owner, name, wrapper)
+
+    def report(self):
+        print()
+        print(f"{'步驟':<14}{'次數':>6}{'平均 (s)':>11}{'中位數 (s)':>12}{'最大 (s)':>11}{'合計 (s)':>11}")
+        print("-" * 65)
+        for step in STEPS:
+            values = self.samples.get(step)
+            if not values:
+                continue
+            print(
+                f"{step:<14}{len(values):>6}{statistics.mean(values):>11.3f}"
+                f"{statistics.median(values):>12.3f}{max(values):>11.3f}{sum(values):>11.3f}"
+            )
+
+
+def instrument(timer: StepTimer):
+    from cogs.LifeTracker.src.browser_pool import BrowserPool
+    from cogs.LifeTracker.src.invoice_crawler import InvoiceCrawler
+    from cogs.LifeTracker.src.invoice_http import InvoiceHttpClient
+    from cogs.LifeTracker.src.invoice_processor import InvoiceProcessor
+    from cogs.LifeTracker.utils import LifeTracker_Manager, AI_Analyzer, Classify_Memo, Local_Classifier
+
+    timer.wrap(BrowserPool, "_create", "driver_start")
+    timer.wrap(InvoiceCrawler, "login", "login")
+    timer.wrap(InvoiceCrawler, "restore_session", "login")
+    timer.wrap(InvoiceCrawler, "wait_for_csv", "download")
+    timer.wrap_query(InvoiceCrawler, "download_csv")
+    timer.wrap(InvoiceHttpClient, "download_csv", "download")
+    timer.wrap(InvoiceProcessor, "load_items", "parse")
+    timer.wrap(Classify_Memo, "lookup", "classify")
+    timer.wrap(Local_Classifier, "classify_many", "classify")
+    timer.wrap(AI_Analyzer, "classify_consumption_batch", "classify")
+    timer.wrap(LifeTracker_Manager, "add_life_records_bulk", "insert")
+
+
+def use_fake_ai(ai_latency: float):
+    """依關鍵字分類的假 AI (不花錢、結果固定)，可模擬 API 延遲"""
+    from cogs.LifeTracker.utils import AI_Analyzer
+    keywords = {"飲食": ("茶", "飯", "拿鐵", "蛋"), "通勤": ("悠遊卡", "停車", "加油"), "娛樂": ("電影", "遊戲")}
+
+    async def classify_consumption_batch(item_names, subcat_list, batch_size=None):
+        await asyncio.sleep(ai_latency)
+        return [
+            next((tag for tag, words in keywords.items() if tag in subcat_list and any(w in name for w in words)), "其他")
+            for name in item_names
+        ]
+
+    AI_Analyzer.classify_consumption_batch = staticmethod(classify_consumption_batch)
+
+
+def setup_users(count: int, base_url: str, reuse_session: bool) -> list[int]:
+    from database import SessionLocal
+    from database.models import User
+    from cogs.LifeTracker.utils import LifeTracker_Manager, EInvoice_Manager
+
+    user_ids = [BENCH_USER_BASE + i for i in range(count)]
+    with SessionLocal() as db:
+        for uid in user_ids:
+            if not db.get(User, uid):
+                db.add(User(discord_id=uid, username=f"bench_{uid}"))
+        db.commit()
+
+    for uid in user_ids:
+        phone = f"09{uid % 100_000_000:08d}"
+        LifeTracker_Manager.ensure_default_consumption_category(uid)
+        EInvoice_Manager.save_config(uid, phone, MOCK_PASSWORD)
+
+        if reuse_session:
+            # 模擬「前一晚已經登入過」：直接向假平台登入，把 cookie 存成上次的登入狀態
+            session = requests.Session()
+            session.post(f"{base_url}/accounts/login/mw", data={"mobile_phone": phone, "password": MOCK_PASSWORD})
+            EInvoice_Manager.save_session(uid, [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path} for c in session.cookies
+            ])
+    return user_ids
+
+
+def cleanup_users(user_ids: list[int]):
+    from sqlalchemy import text
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        params = {"ids": user_ids}
+        db.execute(text("DELETE FROM consumption_memos WHERE user_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM life_records WHERE user_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM invoice_archives WHERE user_id = ANY(:ids)"), params)
+        db.execute(text(
+            "DELETE FROM tracker_subcategories WHERE category_id IN "
+            "(SELECT id FROM tracker_categories WHERE user_id = ANY(:ids))"
+        ), params)
+        db.execute(text("DELETE FROM tracker_categories WHERE user_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM einvoice_configs WHERE user_id = ANY(:ids)"), params)
+        db.execute(text("DELETE FROM users WHERE discord_id = ANY(:ids)"), params)
+        db.commit()
+
+
+async def run(user_ids: list[int], concurrency: int, timer: StepTimer) -> int:
+    from cogs.LifeTracker.src.invoice_pipeline import InvoicePipeline
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(uid):
+        async with semaphore:
+            started = time.perf_counter()
+            success, msg = await InvoicePipeline.execute(uid)
+            timer.add("total", time.perf_counter() - started)
+            if not success:
+                print(f"⚠️ User({uid}) 失敗: {msg}")
+            return success
+
+    results = await asyncio.gather(*(one(uid) for uid in user_ids))
+    return sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="發票抓取流程基準測試 (本機假平台)")
+    parser.add_argument("--users", type=int, default=5, help="模擬使用者數")
+    parser.add_argument("--concurrency", type=int, default=1, help="同時抓取的使用者數")
+    parser.add_argument("--mode", choices=["browser", "http"], default="browser", help="INVOICE_FETCH_MODE")
+    parser.add_argument("--reuse-session", action="store_true", help="預先建立登入狀態，量測沿用 session 的情境")
+    parser.add_argument("--latency", type=float, default=0.0, help="假平台每個請求的延遲秒數")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="假 AI 分類每次呼叫的延遲秒數")
+    parser.add_argument("--real-ai", action="store_true", help="使用真正的 AI 分類")
+    parser.add_argument("--keep-data", action="store_true", help="結束後保留模擬使用者的資料")
+    args = parser.parse_args()
+
+    server, base_url = serve_in_thread(latency=args.latency)
+    # 設定檔在 import 時讀取環境變數，必須在載入各模組前設定好
+    os.environ["EINVOICE_BASE_URL"] = base_url
+    os.environ["EINVOICE_CSV_EXPORT_PATH"] = EXPORT_PATH  # 假平台自訂的匯出 API，http 模式的結果不代表正式平台
+    os.environ["INVOICE_FETCH_MODE"] = args.mode
+    print(f"🧾 假平台: {base_url}  模式: {args.mode}  使用者: {args.users}  同時: {args.concurrency}")
+
+    timer = StepTimer()
+    if not args.real_ai:
+        use_fake_ai(args.ai_latency)
+    instrument(timer)
+
+    from cogs.LifeTracker.src.browser_pool import browser_pool
+
+    user_ids = setup_users(args.users, base_url, args.reuse_session)
+    try:
+        started = time.perf_counter()
+        succeeded = asyncio.run(run(user_ids, args.concurrency, timer))
+        elapsed = time.perf_counter() - started
+    finally:
+        browser_pool.shutdown()
+        server.shutdown()
+        if not args.keep_data:
+            cleanup_users(user_ids)
+
+    timer.report()
+    print()
+    print(f"✅ 成功 {succeeded}/{len(user_ids)} 位，總耗時 {elapsed:.2f}s，平均每位 {elapsed / max(len(user_ids), 1):.2f}s")
+
+    from cogs.LifeTracker.src.invoice_pipeline import InvoicePipeline
+    print(f"🔑 登入狀態: {InvoicePipeline.get_session_stats()}")
+
+
+if __name__ == "__main__":
+    main()
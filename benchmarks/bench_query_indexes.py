@@ -0,0 +1,208 @@
+# benchmarks/bench_query_indexes.py
+"""
+熱查詢索引基準測試
+
+在獨立的 schema 中灌入假資料 (預設 300 萬筆 life_records)，
+分別在「沒有索引」與「套用 models 中定義的索引」兩種狀態下，
+對各模組的熱查詢執行 EXPLAIN ANALYZE 並量測延遲，最後輸出對照表。
+
+使用方式：
+    python -m benchmarks.bench_query_indexes --records 3000000
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_query_indexes
+
+注意：會建立並在結束後刪除 schema `bench_indexes`，不會動到正式資料表。
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from database.models import Base, LifeRecord, CalendarEvent, UserStockWatch, CategorizedEmail
+
+SCHEMA = "bench_indexes"
+
+# 要量測的索引 (與 models 中的 __table_args__ 相同)
+BENCH_INDEXES = [
+    idx
+    for table in (LifeRecord.__table__, CalendarEvent.__table__, UserStockWatch.__table__, CategorizedEmail.__table__)
+    for idx in table.indexes
+]
+
+# 各模組實際使用的查詢形狀
+HOT_QUERIES = {
+    "get_subcat_stats (365天)": (
+        "SELECT subcat_name, values FROM life_records "
+        "WHERE category_id = :cid AND created_at >= :start_365"
+    ),
+    "get_recent_records count": (
+        "SELECT count(id) FROM life_records "
+        "WHERE category_id = :cid AND created_at >= :start_30"
+    ),
+    "get_recent_records page": (
+        "SELECT * FROM life_records "
+        "WHERE category_id = :cid AND created_at >= :start_30 "
+        "AND (created_at, id) < (:cursor_at, :cursor_id) "
+        "ORDER BY created_at DESC, id DESC LIMIT 10"
+    ),
+    "check_reminders": (
+        "SELECT * FROM calendar_events "
+        "WHERE (event_time >= :minute AND event_time < :minute + interval '1 minute') "
+        "OR (event_time >= :minute + interval '1 hour' AND event_time < :minute + interval '61 minutes')"
+    ),
+    "StockManager (user, symbol)": (
+        "SELECT * FROM user_stock_watch WHERE user_id = :uid AND stock_symbol = :symbol LIMIT 1"
+    ),
+    "get_category_emails": (
+        "SELECT * FROM categorized_emails WHERE category_id = :email_cid ORDER BY id DESC"
+    ),
+}
+
+
+def seed(conn, records: int, users: int, categories: int):
+    """用 generate_series 在資料庫端直接產生資料，避免 Python 逐筆插入"""
+    print(f"🌱 產生假資料：{records:,} 筆 life_records / {users:,} 位使用者 / {categories:,} 個分類 ...")
+    started = time.perf_counter()
+
+    conn.execute(text(
+        "INSERT INTO users (discord_id, username, created_at) "
+        "SELECT g, 'user_' || g, now() FROM generate_series(1, :users) g"
+    ), {"users": users})
+    conn.execute(text(
+        "INSERT INTO tracker_categories (id, user_id, name, range_options, current_range, fields, created_at) "
+        "SELECT g, (g % :users) + 1, 'cat_' || g, '[7, 30, 180, 365]', 7, '[\"金額\"]', now() "
+        "FROM generate_series(1, :categories) g"
+    ), {"users": users, "categories": categories})
+    conn.execute(text(
+        "INSERT INTO life_records (user_id, category_id, subcat_name, values, note, created_at) "
+        "SELECT (g % :users) + 1, (g % :categories) + 1, "
+        "       (ARRAY['飲食','通勤','娛樂','其他'])[(g % 4) + 1], "
+        "       json_build_object('金額', (g % 500) + 1), 'seed', "
+        "       now() - (random() * interval '730 days') "
+        "FROM generate_series(1, :records) g"
+    ), {"users": users, "categories": categories, "records": records})
+    conn.execute(text(
+        "INSERT INTO calendar_events (user_id, description, event_time, is_private, created_at) "
+        "SELECT (g % :users) + 1, 'event', "
+        "       date_trunc('minute', now() - interval '365 days' + random() * interval '730 days'), true, now() "
+        "FROM generate_series(1, :n) g"
+    ), {"users": users, "n": max(records // 10, 1000)})
+    conn.execute(text(
+        "INSERT INTO user_stock_watch (user_id, stock_symbol, stock_name, shares, total_cost, created_at, updated_at) "
+        "SELECT u, lpad(s::text, 4, '0'), 'stock', 1000, 100000, now(), now() "
+        "FROM generate_series(1, :users) u, generate_series(1, 20) s"
+    ), {"users": users})
+    conn.execute(text(
+        "INSERT INTO email_categories (id, user_id, name, description) "
+        "SELECT g, (g % :users) + 1, 'mail_' || g, 'desc' FROM generate_series(1, :categories) g"
+    ), {"users": users, "categories": categories})
+    conn.execute(text(
+        "INSERT INTO categorized_emails (category_id, subject, ai_summary, gmail_link, received_at) "
+        "SELECT (g % :categories) + 1, 'subject', 'summary', 'link', 'date' "
+        "FROM generate_series(1, :n) g"
+    ), {"categories": categories, "n": max(records // 5, 1000)})
+    conn.execute(text("ANALYZE"))
+
+    print(f"✅ 資料產生完成，耗時 {time.perf_counter() - started:.1f}s")
+
+
+def measure(conn, params: dict, repeat: int) -> dict:
+    """每個查詢先暖機一次，再量測 repeat 次取中位數，並保留一份 EXPLAIN ANALYZE"""
+    results = {}
+    for name, sql in HOT_QUERIES.items():
+        conn.execute(text(sql), params).fetchall()
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        plan_rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).fetchall()
+        results[name] = {
+            "median_ms": statistics.median(timings),
+            "plan": "\n".join(row[0] for row in plan_rows),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="熱查詢索引前後對照基準測試")
+    parser.add_argument("--records", type=int, default=3_000_000, help="life_records 筆數")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--categories", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="每個查詢重複量測次數")
+    parser.add_argument("--show-plans", action="store_true", help="輸出完整查詢計畫")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        from config import DATABASE_URL
+        url = DATABASE_URL
+
+    engine = create_engine(url)
+    now = datetime.now().replace(second=0, microsecond=0)
+    params = {
+        "cid": 42,
+        "email_cid": 42,
+        "uid": 42,
+        "symbol": "0007",
+        "minute": now,
+        "start_30": now - timedelta(days=30),
+        "cursor_at": now - timedelta(days=15),
+        "cursor_id": args.records,
+        "start_365": now - timedelta(days=365),
+    }
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        conn.commit()
+
+        try:
+            Base.metadata.create_all(conn)
+            for idx in BENCH_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {idx.name}"))
+            seed(conn, args.records, args.users, args.categories)
+            conn.commit()
+
+            print("⏱️ 量測：無索引 ...")
+            before = measure(conn, params, args.repeat)
+
+            print("🔧 建立索引 ...")
+            started = time.perf_counter()
+            for idx in BENCH_INDEXES:
+                idx.create(conn)
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+            print(f"✅ 索引建立完成，耗時 {time.perf_counter() - started:.1f}s")
+
+            print("⏱️ 量測：套用索引 ...")
+            after = measure(conn, params, args.repeat)
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.commit()
+
+    print()
+    print(f"{'查詢':<32}{'無索引 (ms)':>14}{'有索引 (ms)':>14}{'加速':>10}")
+    print("-" * 70)
+    for name in HOT_QUERIES:
+        b, a = before[name]["median_ms"], after[name]["median_ms"]
+        speedup = b / a if a > 0 else float("inf")
+        print(f"{name:<32}{b:>14.2f}{a:>14.2f}{speedup:>9.1f}x")
+
+    if args.show_plans:
+        for name in HOT_QUERIES:
+            print(f"\n===== {name} =====")
+            print("--- 無索引 ---")
+            print(before[name]["plan"])
+            print("--- 有索引 ---")
+            print(after[name]["plan"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# benchmarks/mock_einvoice_portal.py
+"""
+本機的假電子發票平台 (給爬蟲與基準測試用，不會連到財政部)
+
+提供與正式平台相同的元素 ID / title，讓 InvoiceCrawler 不用修改就能跑完整流程：
+    /accounts/login/mw                      登入頁 (手機號碼、密碼、圖形驗證碼)
+    /portal/btc/mobile/btc502w/detail       查詢頁 (日曆、查詢、顯示筆數、全選、下載 CSV、登出)
+    /portal/btc/mobile/btc502w/detail/csv   CSV 匯出 (需登入 cookie；正式平台的匯出 API 未經確認，這裡只是假設的格式)
+
+每位使用者的發票依手機號碼與日期固定產生，重跑時內容一樣。
+
+使用方式：
+    python -m benchmarks.mock_einvoice_portal --port 5005 --latency 0.2
+    EINVOICE_BASE_URL=http://127.0.0.1:5005 python bot.py
+    EINVOICE_BASE_URL=http://127.0.0.1:5005 EINVOICE_CSV_EXPORT_PATH=/portal/btc/mobile/btc502w/detail/csv INVOICE_FETCH_MODE=http python bot.py
+"""
+import argparse
+import base64
+import io
+import random
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask, Response, abort, make_response, redirect, request
+
+MOCK_PASSWORD = "password"  # 所有假帳號共用的密碼
+QUERY_PATH = "/portal/btc/mobile/btc502w/detail"
+EXPORT_PATH = "/portal/btc/mobile/btc502w/detail/csv"
+
+ITEMS = [
+    ("統一茶裏王", 25), ("御飯糰鮪魚", 35), ("大杯拿鐵", 65), ("鮮奶茶", 45), ("茶葉蛋", 13),
+    ("悠遊卡自動加值", 500), ("停車費", 40), ("加油95無鉛", 1200),
+    ("衛生紙", 129), ("洗碗精", 89), ("電影票", 320), ("遊戲點數", 150),
+]
+CSV_HEADER = "載具名稱,載具號碼,發票日期,商店統編,商店店名,發票號碼,總金額,發票狀態,消費明細_數量,消費明細_單價,消費明細_金額,消費明細_品名"
+
+
+# ==================== 假資料 ====================
+
+def invoices_for(phone: str, start: date, end: date) -> list[str]:
+    """產生區間內的發票明細 CSV 列 (同一支手機、同一天永遠產生一樣的內容)"""
+    rows = []
+    day = start
+    while day <= end:
+        rng = random.Random(f"{phone}-{day.isoformat()}")
+        for n in range(rng.randint(0, 3)):
+            number = f"{rng.choice('ABCDEFGHJK')}{rng.choice('LMNPQRSTUV')}{rng.randint(0, 99999999):08d}"
+            lines = [rng.choice(ITEMS) for _ in range(rng.randint(1, 4))]
+            if rng.random() < 0.2:
+                lines.append(("折扣", -5))
+            total = sum(price for _, price in lines)
+            for name, price in lines:
+                rows.append(
+                    f"手機條碼,/{phone[-7:]},{day:%Y%m%d},12345678,測試商店{n},{number},{total},已確認,1,{price},{price},{name}"
+                )
+        day += timedelta(days=1)
+    return rows
+
+
+def captcha_png(text: str) -> bytes:
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (120, 40), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.text((20, 12), text, fill=(0, 0, 0))
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ==================== 頁面 ====================
+
+LOGIN_PAGE = """<!doctype html><html><body>
+<form method="post" action="/accounts/login/mw">
+  <input id="mobile_phone" name="mobile_phone">
+  <input id="password" name="password" type="password">
+  <img alt="圖形驗證碼" src="data:image/png;base64,{captcha}">
+  <input id="captcha" name="captcha">
+  <button type="submit">登入</button>
+</form>
+</body></html>"""
+
+QUERY_PAGE = """<!doctype html><html><body>
+<input id="dp-input-searchInvoiceDate" readonly>
+<div id="calendar" style="display:none">{days}</div>
+<button type="button" title="查詢" onclick="doQuery()">查詢</button>
+<div id="result"></div>
+<a href="/logout" title="登出">登出</a>
+<script>
+  let picked = [];
+  document.getElementById('dp-input-searchInvoiceDate').addEventListener('click', () => {{
+    document.getElementById('calendar').style.display = 'block';
+  }});
+  document.querySelectorAll('#calendar span').forEach(el => el.addEventListener('click', () => {{
+    picked.push(el.id); if (picked.length > 2) picked = [el.id];
+  }}));
+  async function doQuery() {{
+    const [s, e] = picked;
+    const resp = await fetch(`{query}/count?startDate=${{s}}&endDate=${{e}}`);
+    const count = parseInt(await resp.text());
+    const box = document.getElementById('result');
+    if (!count) {{ box.innerHTML = '<p>查無資料</p>'; return; }}
+    box.innerHTML = `
+      <select id="SelectSizes"><option value="10">10</option><option value="100">100</option></select>
+      <a href="#" title="1">1</a>
+      <input type="checkbox" id="invoiceDetailAll">
+      <button type="button" title="下載CSV檔" disabled>下載CSV檔</button>`;
+    const btn = box.querySelector('button');
+    document.getElementById('invoiceDetailAll').addEventListener('click', (ev) => {{ btn.disabled = !ev.target.checked; }});
+    btn.addEventListener('click', () => {{ window.location = `{export}?startDate=${{s}}&endDate=${{e}}`; }});
+  }}
+</script>
+</body></html>"""
+
+
+def create_app(latency: float = 0.0, strict_captcha: bool = False) -> Flask:
+    """latency: 每個請求額外延遲的秒數 (模擬政府網站的回應時間)；strict_captcha: 是否真的檢查驗證碼"""
+    app = Flask("mock_einvoice_portal")
+    sessions: dict[str, str] = {}   # sid -> 手機號碼
+    captchas: dict[str, str] = {}   # 登入頁的 pending id -> 驗證碼
+    lock = threading.Lock()
+    app.config["stats"] = {"logins": 0, "exports": 0}
+
+    def current_phone():
+        with lock:
+            return sessions.get(request.cookies.get("sid", ""))
+
+    def parse_range():
+        try:
+            start = datetime.strptime(request.args["startDate"], "%Y-%m-%d").date()
+            end = datetime.strptime(request.args["endDate"], "%Y-%m-%d").date()
+        except (KeyError, ValueError):
+            abort(400)
+        return start, end
+
+    @app.before_request
+    def slow_down():
+        if latency:
+            time.sleep(latency)
+
+    @app.get("/")
+    def index():
+        return "<h1>mock einvoice portal</h1>"
+
+    @app.get("/accounts/login/mw")
+    def login_page():
+        text = "".join(random.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=4))
+        pending = secrets.token_hex(8)
+        with lock:
+            captchas[pending] = text
+        resp = make_response(LOGIN_PAGE.format(captcha=base64.b64encode(captcha_png(text)).decode()))
+        resp.set_cookie("pending", pending)
+        return resp
+
+    @app.post("/accounts/login/mw")
+    def login_submit():
+        with lock:
+            expected = captchas.pop(request.cookies.get("pending", ""), None)
+        phone = request.form.get("mobile_phone", "")
+        ok = phone and request.form.get("password") == MOCK_PASSWORD
+        if strict_captcha:
+            ok = ok and expected and request.form.get("captcha", "").upper() == expected
+        if not ok:
+            return redirect("/accounts/login/mw")
+
+        sid = secrets.token_hex(16)
+        with lock:
+            sessions[sid] = phone
+            app.config["stats"]["logins"] += 1
+        resp = redirect(QUERY_PATH)
+        resp.set_cookie("sid", sid, httponly=True)
+        return resp
+
+    @app.get("/logout")
+    def logout():
+        with lock:
+            sessions.pop(request.cookies.get("sid", ""), None)
+        return redirect("/accounts/login/mw")
+
+    @app.get(QUERY_PATH)
+    def query_page():
+        if not current_phone():
+            return redirect("/accounts/login/mw")
+        today = date.today()
+        days = "".join(
+            f'<span id="{d:%Y-%m-%d}">{d.day}</span>'
+            for d in (today - timedelta(days=i) for i in range(90, -1, -1))
+        )
+        return QUERY_PAGE.format(days=days, query=QUERY_PATH, export=EXPORT_PATH)
+
+    @app.get(f"{QUERY_PATH}/count")
+    def query_count():
+        phone = current_phone()
+        if not phone:
+            abort(401)
+        start, end = parse_range()
+        return str(len(invoices_for(phone, start, end)))
+
+    @app.get(EXPORT_PATH)
+    def export_csv():
+        phone = current_phone()
+        if not phone:
+            abort(401)
+        start, end = parse_range()
+        with lock:
+            app.config["stats"]["exports"] += 1
+
+        # 與正式平台相同：最後兩行是注釋
+        lines = [CSV_HEADER, *invoices_for(phone, start, end), "註：本檔案僅供參考", f"資料時間：{datetime.now():%Y/%m/%d}"]
+        return Response(
+            "\n".join(lines) + "\n",
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=invoice_{start:%Y%m%d}_{end:%Y%m%d}.csv"}
+        )
+
+    return app
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0, **kwargs):
+    """在背景執行緒啟動假平台，回傳 (server, base_url)；port=0 代表自動挑選空的 port"""
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # 不要每個請求都印一行
+    server = make_server(host, port, create_app(**kwargs), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機假電子發票平台")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求額外延遲秒數")
+    parser.add_argument("--strict-captcha", action="store_true", help="真的檢查驗證碼 (測試 OCR 用)")
+    args = parser.parse_args()
+
+    print(f"🧾 假電子發票平台啟動：http://{args.host}:{args.port} (密碼一律為 {MOCK_PASSWORD!r})")
+    create_app(args.latency, args.strict_captcha).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import datetime
 from database.db import init_db, SessionLocal
 from database.models import BotSettings
 from database.db_utils import get_botsettings
+from cogs import chart_service, job_queue
 
 from config import COGS_DIR, DISCORD_BOT_TOKEN, RENDER
 
@@ -96,15 +97,22 @@ async def main():
     print("script start.")
     async with bot:
         bot.SessionLocal = SessionLocal
+        chart_service.start()
         
         await load_extensions()
+        # 各模組已在載入時註冊好工作類型，開始領取背景工作 (包含上次關機前沒做完的)
+        job_queue.start()
         keep_alive(local_test=not RENDER)
         
-        if DISCORD_BOT_TOKEN:
-            print("get token and try to start bot.")
-            await bot.start(DISCORD_BOT_TOKEN)
-        else:
-            print("❌ 錯誤：未讀取到 DISCORD_BOT_TOKEN，請檢查 .env 檔案")
+        try:
+            if DISCORD_BOT_TOKEN:
+                print("get token and try to start bot.")
+                await bot.start(DISCORD_BOT_TOKEN)
+            else:
+                print("❌ 錯誤：未讀取到 DISCORD_BOT_TOKEN，請檢查 .env 檔案")
+        finally:
+            await job_queue.shutdown()
+            chart_service.shutdown()
 
 # 確定執行此py檔才會執行
 if __name__ == "__main__":
@@ -1,54 +1,172 @@
+import asyncio
+import time
 from discord.ext import commands, tasks
 from cogs.Gmail.utils import EmailDatabaseManager, EmailTools
 from cogs.Gmail.utils import Gmail_AI_Analyzer
+from cogs.Gmail.utils.Gmail_imap_pool import imap_pool
+from cogs.Gmail.Gmail_config import (
+    IMAP_USE_IDLE, IMAP_IDLE_MAX_BACKOFF,
+    GMAIL_POLL_CONCURRENCY, GMAIL_POLL_TICK_BUDGET, GMAIL_POLL_USER_TIMEOUT, GMAIL_POLL_SLOW_SECONDS
+)
 from database.models import EmailConfig
 
 class Gmail(commands.Cog):
     def __init__(self, bot, db_session):
         self.bot = bot
         self.db_manager = EmailDatabaseManager(db_session)
+        self._user_locks: dict[int, asyncio.Lock] = {}
+        self._idle_tasks: dict[int, tuple] = {}     # user_id -> (task, email, password)
+        self._idle_users: set = set()               # IDLE 監聽中的使用者 (輪詢會略過)
+        self._idle_unsupported: set = set()         # 伺服器不支援 IDLE 的使用者
+        self._poll_slots = asyncio.Semaphore(GMAIL_POLL_CONCURRENCY)  # 同時收信 (IMAP + AI) 的名額，輪詢與推播共用
+        self._poll_tasks: dict[int, asyncio.Task] = {}  # 進行中的輪詢 (可跨輪延續)
+        self._poll_backlog: list = []               # 上一輪預算用完沒排到的使用者
+        self._poll_finished: list = []              # 上次回報後完成的 (user_id, 秒數)
+        self.poll_latency: dict[int, float] = {}    # 每位使用者最近一次輪詢的耗時 (秒)
 
     async def cog_load(self):
         if not self.test_check_mail.is_running():
             self.test_check_mail.start()
             print("[Gmail] 背景收信排程已成功啟動！")
+        if not self.imap_keepalive.is_running():
+            self.imap_keepalive.start()
+
+    async def cog_unload(self):
+        self.test_check_mail.cancel()
+        self.imap_keepalive.cancel()
+        for user_id in list(self._idle_tasks):
+            self._stop_idle_listener(user_id)
+        for task in self._poll_tasks.values():
+            task.cancel()
+        await imap_pool.shutdown()
+
+    @tasks.loop(minutes=1)
+    async def imap_keepalive(self):
+        """保持連線池中的 IMAP 連線：太久沒動靜的送 NOOP，太久沒用的關閉"""
+        try:
+            await imap_pool.keepalive()
+        except Exception as e:
+            print(f"⚠️ [IMAP 連線池] 維護失敗: {e}")
 
     @tasks.loop(seconds=30)
     async def test_check_mail(self):
         await self.bot.wait_until_ready()
         try:
             # 目前資料庫中所有綁定信箱的使用者 ID
-            with self.db_manager.session() as session:
-                user_ids = [c.user_id for c in session.query(EmailConfig.user_id).all()]
+            user_ids = await EmailDatabaseManager.get_all_config_user_ids()
         except Exception as e:
             print(f"[資料庫輪詢] 查詢設定失敗: {e}")
             return
 
+        # 已解除綁定的帳號，停掉 IDLE 監聽
+        for user_id in set(self._idle_tasks) - set(user_ids or []):
+            self._stop_idle_listener(user_id)
+
         if not user_ids:
+            self._poll_backlog = []
             return
 
-        for user_id in user_ids:
+        # 🌟 上一輪預算用完還沒排到的使用者優先；最多同時處理 GMAIL_POLL_CONCURRENCY 位，一位卡住不會拖累其他人
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + GMAIL_POLL_TICK_BUDGET
+        order = [u for u in self._poll_backlog if u in user_ids] + [u for u in user_ids if u not in self._poll_backlog]
+        self._poll_backlog = []
+        started = []
+
+        for i, user_id in enumerate(order):
+            running = self._poll_tasks.get(user_id)
+            if running is not None and not running.done():
+                continue  # 上一輪還沒收完，讓它繼續跑，不重複排
+
             try:
-                user_config = EmailDatabaseManager.get_user_config(user_id)
-                if not user_config: 
+                user_config = await EmailDatabaseManager.get_user_config_async(user_id)
+                if not user_config or not user_config['email'] or not user_config['password']:
                     continue
 
+                if IMAP_USE_IDLE:
+                    self._ensure_idle_listener(user_id, user_config['email'], user_config['password'])
+                    if user_id in self._idle_users:
+                        continue  # 🌟 IDLE 監聽中，有新信時會由推播觸發，不用輪詢
+
+            except Exception as e:
+                print(f"⚠️ [輪詢異常] 使用者 {user_id} 發生未知錯誤: {e}")
+                continue
+
+            # 名額由任務自己 async with 取得 (不會因逾時漏還)，這裡只等它拿到名額
+            acquired = asyncio.Event()
+            task = asyncio.create_task(self._poll_user(user_id, user_config, acquired))
+            try:
+                await asyncio.wait_for(acquired.wait(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                if not acquired.is_set():
+                    # 本輪預算用完，還在排隊的任務取消，剩下的使用者順延到下一輪
+                    task.cancel()
+                    self._poll_backlog = order[i:]
+                    break
+            self._poll_tasks[user_id] = task
+            started.append(task)
+
+        if started:
+            await asyncio.wait(started, timeout=max(deadline - loop.time(), 0))
+        self._report_poll_tick()
+
+    async def _poll_user(self, user_id, user_config, acquired: asyncio.Event):
+        """取得名額後輪詢單一使用者，超過 GMAIL_POLL_USER_TIMEOUT 直接中止，已處理的信件進度都有存下"""
+        async with self._poll_slots:
+            acquired.set()
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._check_user(user_id, user_config), GMAIL_POLL_USER_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"⚠️ [輪詢逾時] 使用者 {user_id} 超過 {GMAIL_POLL_USER_TIMEOUT} 秒未完成，已中止，下一輪再繼續")
+            finally:
+                latency = time.monotonic() - started
+                self.poll_latency[user_id] = latency
+                self._poll_finished.append((user_id, latency))
+
+    def _report_poll_tick(self):
+        """回報本輪 (含上一輪延續下來) 完成的使用者延遲；有人變慢、延續或順延時才印出"""
+        finished, self._poll_finished = self._poll_finished, []
+        carried = sum(1 for t in self._poll_tasks.values() if not t.done())
+        slowest = max(finished, key=lambda x: x[1], default=None)
+        if not carried and not self._poll_backlog and (slowest is None or slowest[1] < GMAIL_POLL_SLOW_SECONDS):
+            return
+
+        latencies = sorted(latency for _, latency in finished)
+        summary = f"完成 {len(finished)} 位"
+        if latencies:
+            summary += f" (中位數 {latencies[len(latencies) // 2]:.1f}s，最慢 {slowest[0]} {slowest[1]:.1f}s)"
+        print(f"📬 [Gmail 輪詢] {summary}，延續到下一輪 {carried} 位，順延 {len(self._poll_backlog)} 位")
+
+    async def _check_user(self, user_id, user_config=None):
+        """
+        收取並分類單一使用者的新信 (輪詢與 IDLE 推播共用，同一位使用者同時只會跑一組)
+        回傳 False 代表這次沒收成功，下次要再補收
+        """
+        async with self._user_locks.setdefault(user_id, asyncio.Lock()):
+            try:
+                if user_config is None:
+                    user_config = await EmailDatabaseManager.get_user_config_async(user_id)
+                if not user_config: 
+                    return
+
                 user_email = user_config['email']
                 user_password = user_config['password']
-                last_id = user_config['last_email_id']
+                last_uid = user_config['last_email_id']
+                uid_validity = user_config.get('uid_validity')
 
                 if not user_email or not user_password: 
-                    continue
+                    return
 
                 tools = EmailTools(user_email, user_password)
-                
+            
                 try:
-                    new_emails, drift_fix_id = await tools.get_unread_emails(last_id)
+                    new_emails, checkpoint = await tools.get_unread_emails(last_uid, uid_validity)
                 except ValueError as ve:
                     # 處理驗證失敗
                     if str(ve) == "AUTH_FAILED":
                         print(f"[密碼錯誤] 使用者 {user_email} 驗證失敗。")
-                        
+                    
                         # 發送私訊通知使用者
                         user = self.bot.get_user(int(user_id))
                         if user:
@@ -63,7 +181,9 @@ class Gmail(commands.Cog):
                                 print(f"已私訊通知使用者 {user_id}")
                             except Exception as dm_err:
                                 print(f"無法私訊使用者 {user_id}: {dm_err}")
-                        
+                    
+                        await imap_pool.close(user_email)
+
                         # 資料庫刪除該筆錯誤
                         try:
                             with self.db_manager.session() as session:
@@ -74,46 +194,110 @@ class Gmail(commands.Cog):
                                     print(f"[資料刪除] 已強制移除使用者 {user_id} 的錯誤信箱設定")
                         except Exception as db_err:
                             print(f"刪除使用者資料庫紀錄時失敗: {db_err}")
-                            
-                        continue # 跳過該使用者後續的收信處理
+                        
+                        return # 跳過該使用者後續的收信處理
                     raise ve
-                
+            
                 except Exception as fetch_error:
                     # 處理一般連線錯誤（如網路不穩、逾時），單次跳過，不刪除資料
                     print(f"⚠️ [EmailTools] 使用者 {user_email} 暫時性抓取失敗: {fetch_error}")
-                    continue 
+                    return False
 
-                # 若有校正 ID
-                if drift_fix_id:
-                    self.db_manager.update_last_email_id(user_id, drift_fix_id)
-                    print(f"🔧 [自動修復] 使用者 {user_email} ID 校正為: {drift_fix_id}")
-        
+                # 剛綁定或 UIDVALIDITY 變更時，先把進度校正到新的 UID 起點
+                if checkpoint:
+                    validity, checkpoint_uid = checkpoint
+                    await self.db_manager.update_last_email_id(user_id, checkpoint_uid, validity)
+                    print(f"🔧 [自動修復] 使用者 {user_email} 進度校正為 UID {checkpoint_uid} (UIDVALIDITY {validity})")
+    
                 if new_emails:
-                    user_categories = EmailDatabaseManager.get_user_categories(user_id)
+                    user_categories = await EmailDatabaseManager.get_user_categories_async(user_id) or []
 
                     for email_info in new_emails:
                         print(f"🔍 分析信件：{email_info['subject']} ...")
-                        
+                    
                         # AI 分析
                         cat_name, summary = await Gmail_AI_Analyzer.analyze_and_classify_email(
                             subject=email_info['subject'],
                             body=email_info['body'],
                             categories=user_categories
                         )
-                        
+                    
                         email_info['ai_summary'] = summary
                         email_info['category'] = cat_name
 
                         if cat_name:
                             target_cat = next((c for c in user_categories if c['name'] == cat_name), None)
                             if target_cat:
-                                self.db_manager.save_categorized_email(target_cat['id'], email_info, summary)
+                                await self.db_manager.save_categorized_email(target_cat['id'], email_info, summary)
                                 print(f"📁 歸檔至 [{cat_name}]")
                         else:
                             print("⏩ 未符合分類，略過。")
 
                         # 更新進度
-                        self.db_manager.update_last_email_id(user_id, str(email_info['id']))
-                    
+                        await self.db_manager.update_last_email_id(user_id, str(email_info['id']))
+                return True
             except Exception as e:
-                print(f"⚠️ [輪詢異常] 使用者 {user_id} 發生未知錯誤: {e}")
\ No newline at end of file
+                print(f"⚠️ [輪詢異常] 使用者 {user_id} 發生未知錯誤: {e}")
+                return False
+
+    # ==================== IMAP IDLE 監聽 ====================
+
+    def _ensure_idle_listener(self, user_id, user_email, user_password):
+        """確保該帳號有一個 IDLE 監聽 task (帳密變更時重開；伺服器不支援 IDLE 的帳號不再嘗試)"""
+        current = self._idle_tasks.get(user_id)
+        if current is not None:
+            task, email, password = current
+            if (email, password) == (user_email, user_password):
+                if not task.done() or user_id in self._idle_unsupported:
+                    return
+            self._stop_idle_listener(user_id)
+        elif user_id in self._idle_unsupported:
+            return
+
+        task = asyncio.create_task(self._idle_listener(user_id, user_email, user_password))
+        self._idle_tasks[user_id] = (task, user_email, user_password)
+
+    def _stop_idle_listener(self, user_id):
+        current = self._idle_tasks.pop(user_id, None)
+        if current is not None:
+            current[0].cancel()
+        self._idle_users.discard(user_id)
+        self._idle_unsupported.discard(user_id)
+
+    async def _idle_listener(self, user_id, user_email, user_password):
+        """單一帳號的 IDLE 監聽迴圈：連線中斷時以指數退避重連，密碼錯誤或不支援 IDLE 時結束並交回輪詢"""
+        tools = EmailTools(user_email, user_password)
+        backoff = 5
+
+        async def on_new_mail():
+            self._idle_users.add(user_id)
+            async with self._poll_slots:
+                ok = await self._check_user(user_id)
+            if ok is False:
+                raise ConnectionError("收信失敗，重新連線後補收")
+
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    if await tools.watch_inbox(on_new_mail) is False:
+                        print(f"[Gmail IDLE] {user_email} 的伺服器不支援 IDLE，改用輪詢")
+                        self._idle_unsupported.add(user_id)
+                        return
+                except ValueError as ve:
+                    if str(ve) == "AUTH_FAILED":
+                        self._idle_users.discard(user_id)
+                        await self._check_user(user_id)  # 走一般流程通知使用者並刪除設定
+                        return
+                    print(f"⚠️ [Gmail IDLE] {user_email} 監聽中斷: {ve}")
+                except Exception as e:
+                    print(f"⚠️ [Gmail IDLE] {user_email} 監聽中斷: {e!r}")
+
+                # 斷線期間改回輪詢
+                self._idle_users.discard(user_id)
+                if time.monotonic() - started > IMAP_IDLE_MAX_BACKOFF:
+                    backoff = 5
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, IMAP_IDLE_MAX_BACKOFF)
+        finally:
+            self._idle_users.discard(user_id)
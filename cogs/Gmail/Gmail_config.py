@@ -2,4 +2,24 @@
 MAX_EMAIL_BODY_LENGTH = 800
 MAX_CATEGORY_COUNT = 25
 MAX_CATEGORY_NAME_LENGTH = 10
-MAX_CATEGORY_DESC_LENGTH = 40
\ No newline at end of file
+MAX_CATEGORY_DESC_LENGTH = 40
+
+IMAP_HOST = "imap.gmail.com"
+IMAP_PORT = 993
+IMAP_COMMAND_TIMEOUT = 15          # 單一 IMAP 指令的逾時秒數
+IMAP_KEEPALIVE_SECONDS = 5 * 60    # 連線閒置超過此秒數就送 NOOP 保持連線
+IMAP_IDLE_TIMEOUT = 30 * 60        # 連線超過此秒數沒被使用就登出關閉
+IMAP_MAX_SESSIONS = 200            # 同時保留的 IMAP 連線上限 (超過時關掉最久沒用的)
+
+IMAP_USE_IDLE = True               # 支援 IDLE 的信箱改用推播模式 (有新信才收)，不支援的繼續輪詢
+IMAP_IDLE_RENEW_SECONDS = 25 * 60  # IDLE 每隔多久重新下一次 (RFC 2177 建議不超過 29 分鐘)
+IMAP_IDLE_MAX_BACKOFF = 5 * 60     # IDLE 連線中斷後重連的最長等待秒數
+
+IMAP_FETCH_BATCH_SIZE = 50         # 一個 FETCH 指令最多抓幾封信
+IMAP_FETCH_TEXT_BYTES = 8 * 1024   # 純文字內文最多下載的 bytes (內文只保留 MAX_EMAIL_BODY_LENGTH 字)
+IMAP_FETCH_HTML_BYTES = 64 * 1024  # HTML 內文最多下載的 bytes (HTML 標籤與樣式佔很多空間，上限放寬)
+
+GMAIL_POLL_CONCURRENCY = 8         # 同時收信 (IMAP + AI 分析) 的使用者上限
+GMAIL_POLL_TICK_BUDGET = 25        # 每輪輪詢最多花幾秒排程 (排程間隔 30 秒)，沒排到的順延到下一輪
+GMAIL_POLL_USER_TIMEOUT = 5 * 60   # 單一使用者一次收信的時間上限
+GMAIL_POLL_SLOW_SECONDS = 10       # 有使用者超過這個秒數時印出本輪延遲統計
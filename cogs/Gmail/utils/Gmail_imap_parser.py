@@ -0,0 +1,101 @@
+import base64
+import itertools
+import quopri
+import re
+
+# IMAP 回應中的語彙單元：括號、帶引號字串、{n} 長度標記、一般 atom (含 BODY[...]<n> 這種帶中括號的名稱)
+_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|\{\d+\}|[^\s()"\[]+(?:\[[^\]]*\](?:<\d+>)?)?')
+
+
+def parse_fetch_response(lines) -> dict[int, dict]:
+    """
+    解析 (UID) FETCH 的回應，回傳 {UID: {項目名稱: 值}}
+    aioimaplib 會把 literal ({n} 後面的原始資料) 拆成獨立的 bytearray 行，其餘的行是 bytes
+    """
+    messages = {}
+    stack = [[]]
+    for line in lines:
+        if isinstance(line, bytearray):
+            stack[-1].append(bytes(line))
+            continue
+
+        for token in _TOKEN_RE.findall(line):
+            if token == b"(":
+                stack.append([])
+            elif token == b")":
+                if len(stack) > 1:
+                    closed = stack.pop()
+                    stack[-1].append(closed)
+            elif token.startswith(b"{"):
+                continue
+            elif token.startswith(b'"'):
+                stack[-1].append(re.sub(rb'\\(.)', rb"\1", token[1:-1]).decode("utf-8", errors="replace"))
+            elif token.upper() == b"NIL":
+                stack[-1].append(None)
+            else:
+                stack[-1].append(token.decode("latin1"))
+
+        if len(stack) == 1:
+            # 一則 FETCH 回應結束: [序號, "FETCH", [名稱, 值, 名稱, 值 ...]]
+            top = stack[0]
+            if len(top) >= 3 and str(top[1]).upper() == "FETCH" and isinstance(top[2], list):
+                items = {str(k).upper(): v for k, v in zip(top[2][::2], top[2][1::2])}
+                if "UID" in items:
+                    messages[int(items["UID"])] = items
+            stack = [[]]
+    return messages
+
+
+def get_item(items: dict, prefix: str):
+    """依名稱前綴取值 (例如 BODY[HEADER.FIELDS (...)] 或 BODY[1.2]<0>)"""
+    for key, value in items.items():
+        if key.startswith(prefix):
+            return value
+    return None
+
+
+def find_text_part(structure, section: str = ""):
+    """
+    從 BODYSTRUCTURE 找出要讀的內文段落 (與原本解析邏輯相同：第一個 text/plain 優先，沒有才用最後一個 text/html，略過附件)
+    回傳 (段落編號, 是否為 HTML, 編碼, 字元集) 或 None；單一段落的信件段落編號為 TEXT
+    """
+    if not isinstance(structure, list) or not structure:
+        return None
+
+    if isinstance(structure[0], list):
+        # multipart: 開頭連續的 list 是子段落，之後才是 subtype 與參數
+        children = list(itertools.takewhile(lambda c: isinstance(c, list), structure))
+        found_html = None
+        for i, child in enumerate(children, 1):
+            part = find_text_part(child, f"{section}.{i}" if section else str(i))
+            if part and not part[1]:
+                return part
+            found_html = part or found_html
+        return found_html
+
+    maintype, subtype = str(structure[0]).lower(), str(structure[1]).lower()
+    if maintype != "text" or subtype not in ("plain", "html"):
+        return None
+
+    # text 段落的 disposition 在第 10 個欄位 (type, subtype, params, id, desc, enc, size, lines, md5, disposition)
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and disposition and str(disposition[0]).lower() == "attachment":
+        return None
+
+    params = structure[2] if isinstance(structure[2], list) else []
+    params = {str(k).lower(): v for k, v in zip(params[::2], params[1::2])}
+    encoding = str(structure[5] or "7bit").lower()
+    return section or "TEXT", subtype == "html", encoding, params.get("charset") or "utf-8"
+
+
+def decode_part(data: bytes, encoding: str, charset: str) -> str:
+    """解碼被截斷的段落內容 (base64 只取完整的 4 字元組，尾端殘缺的字元直接替換)"""
+    if encoding == "base64":
+        data = re.sub(rb"\s+", b"", data)
+        data = base64.b64decode(data[: len(data) // 4 * 4])
+    elif encoding == "quoted-printable":
+        data = quopri.decodestring(data)
+    try:
+        return data.decode(charset, errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
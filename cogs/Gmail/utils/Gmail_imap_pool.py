@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import time
+import aioimaplib
+from ..Gmail_config import (
+    IMAP_HOST, IMAP_PORT, IMAP_COMMAND_TIMEOUT,
+    IMAP_KEEPALIVE_SECONDS, IMAP_IDLE_TIMEOUT, IMAP_MAX_SESSIONS
+)
+
+class _ImapSession:
+    def __init__(self, client, secret: str, select_lines: list, lost: asyncio.Event):
+        self.client = client
+        self.lost = lost                  # 連線被伺服器關閉時會被設定 (IDLE 等待推播時用來偵測斷線)
+        self.secret = secret              # 密碼的雜湊，密碼改了就重新登入
+        self.select_lines = select_lines  # SELECT INBOX 的回應 (EXISTS、UIDVALIDITY 等)
+        self.last_used = time.monotonic()
+        self.last_noop = self.last_used
+
+class ImapConnectionPool:
+    """
+    每個信箱帳號保留一條已登入、已 SELECT INBOX 的 IMAP 連線
+    原本每次收信都要重新 TLS 握手 + LOGIN + SELECT + LOGOUT，改為沿用同一條連線，
+    一次收信只需要一個指令的來回 (借出時重新 SELECT，沒有新信就不用再 UID SEARCH)；連線斷掉時自動重連，閒置太久的連線定期 NOOP 或關閉
+    """
+    def __init__(self, host: str = IMAP_HOST, port: int = IMAP_PORT, use_ssl: bool = True,
+                 timeout: float = IMAP_COMMAND_TIMEOUT, max_sessions: int = IMAP_MAX_SESSIONS):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self._sessions: dict[str, _ImapSession] = {}
+        self._locks: dict[str, asyncio.Lock] = {}  # 同一個帳號的指令依序執行 (IMAP 連線不能同時跑兩組流程)
+        self._stats = {"connects": 0, "reused": 0, "reconnects": 0, "keepalive": 0, "closed": 0}
+
+    @staticmethod
+    def _secret(password: str) -> str:
+        return hashlib.sha256((password or "").encode()).hexdigest()
+
+    @staticmethod
+    def _is_open(session: _ImapSession) -> bool:
+        protocol = session.client.protocol
+        transport = protocol.transport
+        return (transport is not None and not transport.is_closing() and not session.lost.is_set()
+                and protocol.state == "SELECTED")
+
+    @staticmethod
+    async def close_client(client):
+        """登出並關閉連線 (失敗也不拋例外)"""
+        transport = client.protocol.transport
+        if transport is None or transport.is_closing():
+            return  # 已經斷線，不用再等 LOGOUT 逾時
+        try:
+            await asyncio.wait_for(client.logout(), 5)
+        except Exception:
+            pass
+        transport.close()
+
+    # ==================== 建立 / 取得連線 ====================
+
+    async def open_session(self, user: str, password: str) -> _ImapSession:
+        """建立一條新的已登入、已 SELECT INBOX 的連線 (不放進池中，例如給 IDLE 監聽專用)"""
+        imap_cls = aioimaplib.IMAP4_SSL if self.use_ssl else aioimaplib.IMAP4
+        client = imap_cls(host=self.host, port=self.port, timeout=self.timeout)
+        lost = asyncio.Event()
+        client.protocol.conn_lost_cb = lambda exc: lost.set()  # IMAP4_SSL 的建構子沒有開放這個參數
+        try:
+            await client.wait_hello_from_server()
+
+            login_res = await client.login(user, password)
+            if login_res.result != "OK":
+                raise ValueError("AUTH_FAILED")
+
+            select_res = await client.select("INBOX")
+            if select_res.result != "OK":
+                raise ConnectionError(f"SELECT INBOX 失敗: {select_res.lines}")
+        except BaseException:
+            await self.close_client(client)
+            raise
+
+        self._stats["connects"] += 1
+        return _ImapSession(client, self._secret(password), select_res.lines, lost)
+
+    async def _get(self, user: str, password: str) -> _ImapSession:
+        """取得可用的連線 (需持有該帳號的鎖)"""
+        session = self._sessions.get(user)
+        if session is not None:
+            if session.secret == self._secret(password) and self._is_open(session):
+                try:
+                    await self._reselect(session)
+                    self._stats["reused"] += 1
+                    return session
+                except Exception:
+                    pass  # 連線其實已經不能用，重新連線
+            await self._discard(user)
+
+        await self._evict_if_full()
+        session = await self.open_session(user, password)
+        self._sessions[user] = session
+        return session
+
+    @staticmethod
+    async def _reselect(session: _ImapSession):
+        """
+        沿用連線前重新 SELECT INBOX，更新 UIDVALIDITY / UIDNEXT / EXISTS
+        (連線期間信箱可能被重建，不能相信建立連線時的 SELECT 結果；aioimaplib 也會丟掉沒有指令在等的回應)
+        """
+        res = await session.client.select("INBOX")
+        if res.result != "OK":
+            raise ConnectionError(f"SELECT INBOX 失敗: {res.lines}")
+        session.select_lines = res.lines
+
+    async def _discard(self, user: str):
+        session = self._sessions.pop(user, None)
+        if session is not None:
+            self._stats["closed"] += 1
+            await self.close_client(session.client)
+
+    async def _evict_if_full(self):
+        """連線數到上限時，關掉最久沒用、且目前沒在使用的連線"""
+        while len(self._sessions) >= self.max_sessions:
+            idle = [(s.last_used, u) for u, s in self._sessions.items() if not self._locks[u].locked()]
+            if not idle:
+                return
+            _, user = min(idle)
+            await self._discard(user)
+
+    def lock(self, user: str) -> asyncio.Lock:
+        return self._locks.setdefault(user, asyncio.Lock())
+
+    # ==================== 對外介面 ====================
+
+    async def run(self, user: str, password: str, func):
+        """
+        用該帳號的連線執行 await func(client, session)
+        沿用的連線若執行失敗 (例如伺服器已經把連線關掉)，重新連線後再試一次；密碼錯誤時拋出 ValueError("AUTH_FAILED")
+        """
+        async with self.lock(user):
+            for attempt in (1, 2):
+                session = await self._get(user, password)
+                try:
+                    result = await func(session.client, session)
+                except Exception:
+                    await self._discard(user)
+                    if attempt == 2:
+                        raise
+                    self._stats["reconnects"] += 1
+                    continue
+                session.last_used = time.monotonic()
+                return result
+
+    async def keepalive(self, keepalive_seconds: float = IMAP_KEEPALIVE_SECONDS, idle_timeout: float = IMAP_IDLE_TIMEOUT):
+        """
+        定期呼叫：閒置超過 idle_timeout 的連線登出關閉；其餘超過 keepalive_seconds 沒有動靜的送 NOOP
+        (NOOP 失敗代表連線已斷，直接丟掉，下次使用時重連)
+        """
+        now = time.monotonic()
+        for user in list(self._sessions):
+            lock = self.lock(user)
+            if lock.locked():
+                continue
+            async with lock:
+                session = self._sessions.get(user)
+                if session is None:
+                    continue
+                if now - session.last_used >= idle_timeout or not self._is_open(session):
+                    await self._discard(user)
+                    continue
+                if now - max(session.last_used, session.last_noop) < keepalive_seconds:
+                    continue
+                try:
+                    res = await asyncio.wait_for(session.client.noop(), self.timeout)
+                    if res.result != "OK":
+                        raise ConnectionError(res.lines)
+                    session.last_noop = time.monotonic()
+                    self._stats["keepalive"] += 1
+                except Exception:
+                    await self._discard(user)
+
+    async def close(self, user: str):
+        """帳號解除綁定或密碼失效時關閉連線"""
+        async with self.lock(user):
+            await self._discard(user)
+
+    async def shutdown(self):
+        for user in list(self._sessions):
+            await self._discard(user)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "open": len(self._sessions)}
+
+imap_pool = ImapConnectionPool()
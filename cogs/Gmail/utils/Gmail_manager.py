@@ -1,9 +1,11 @@
 import re
 from typing import Optional, Dict
 from cryptography.fernet import Fernet
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from database.models import EmailConfig, EmailCategory, CategorizedEmail
-from database.db_utils import with_db_decorator, get_user
+from database.db import AsyncSessionLocal
+from database.db_utils import with_db_decorator, with_async_db_decorator, get_user
 from config import ENCRYPTION_KEY
 
 class EmailDatabaseManager:
@@ -45,10 +47,33 @@ class EmailDatabaseManager:
             "email": config.email_address,
             "password": EmailDatabaseManager._decrypt(config.email_password),
             "last_email_id": config.last_email_id,
+            "uid_validity": config.uid_validity,
             "is_active": config.is_active
         } if config else None
 
 
+    @staticmethod
+    @with_async_db_decorator
+    async def get_user_config_async(user_id: int, db=None) -> Optional[Dict]:
+        """get_user_config 的非同步版本 (背景收信排程使用)"""
+        config = (await db.execute(select(EmailConfig).filter_by(user_id=user_id))).scalars().first()
+        return {
+            "email": config.email_address,
+            "password": EmailDatabaseManager._decrypt(config.email_password),
+            "last_email_id": config.last_email_id,
+            "uid_validity": config.uid_validity,
+            "is_active": config.is_active
+        } if config else None
+
+
+    @staticmethod
+    @with_async_db_decorator
+    async def get_all_config_user_ids(db=None) -> list[int]:
+        """取得所有已綁定信箱的使用者 ID"""
+        result = await db.execute(select(EmailConfig.user_id))
+        return list(result.scalars().all())
+
+
     @staticmethod
     @with_db_decorator
     def save_user_config(user_id: int, user_name: str, email: str, password: str, db=None) -> str:
@@ -61,6 +86,10 @@ class EmailDatabaseManager:
         
         config = db.query(EmailConfig).filter_by(user_id=user_id).first()
         if config:
+            if config.email_address != email:
+                # 換了信箱，舊信箱的收信進度 (UID) 不能沿用
+                config.last_email_id = None
+                config.uid_validity = None
             config.email_address = email
             config.email_password = encrypted_password
             config.is_active = True
@@ -72,10 +101,14 @@ class EmailDatabaseManager:
         return f"✅ 個人信箱設置成功！\n帳號：`{email}`"
         
 
-    def update_last_email_id(self, user_id: int, last_id: str):
-        with self.session() as session:
-            session.query(EmailConfig).filter_by(user_id=user_id).update({"last_email_id": last_id})
-            session.commit()
+    @staticmethod
+    @with_async_db_decorator
+    async def update_last_email_id(user_id: int, last_id: str, uid_validity: int = None, db=None):
+        values = {"last_email_id": last_id}
+        if uid_validity is not None:
+            values["uid_validity"] = uid_validity
+        await db.execute(update(EmailConfig).filter_by(user_id=user_id).values(**values))
+        await db.commit()
 
     def set_user_active_status(self, user_id: int, status: bool):
         """更新使用者的收信功能開關 (True: 啟用, False: 停用)"""
@@ -92,10 +125,19 @@ class EmailDatabaseManager:
         return [{"id": c.id, "name": c.name, "desc": c.description} for c in categories]
 
 
-    def save_categorized_email(self, category_id: int, email_info: dict, summary: str):
+    @staticmethod
+    @with_async_db_decorator
+    async def get_user_categories_async(user_id: int, db=None) -> list[dict]:
+        """get_user_categories 的非同步版本 (背景收信排程使用)"""
+        result = await db.execute(select(EmailCategory).filter_by(user_id=user_id))
+        return [{"id": c.id, "name": c.name, "desc": c.description} for c in result.scalars().all()]
+
+
+    @staticmethod
+    async def save_categorized_email(category_id: int, email_info: dict, summary: str):
         """將 AI 處理完的信件存入對應分類"""
         try:
-            with self.session() as session:
+            async with AsyncSessionLocal() as session:
                 new_email = CategorizedEmail(
                     category_id=category_id,
                     subject=email_info.get('subject', '(無主旨)')[:100], # 避免主旨過長
@@ -104,7 +146,7 @@ class EmailDatabaseManager:
                     received_at=email_info.get('date', '未知時間')
                 )
                 session.add(new_email)
-                session.commit()
+                await session.commit()
                 return True
         except Exception as e:
             print(f"❌ 儲存分類信件失敗: {e}")
@@ -1,6 +1,6 @@
 import os
-import aioimaplib
 import asyncio
+import aioimaplib
 from aiosmtplib import SMTP
 from email.message import EmailMessage
 from email import message_from_bytes
@@ -9,11 +9,19 @@ import re
 import html
 from email.header import decode_header
 from email.utils import parseaddr
+from .Gmail_imap_pool import imap_pool
+from .Gmail_imap_parser import parse_fetch_response, get_item, find_text_part, decode_part
+from ..Gmail_config import (
+    IMAP_HOST, IMAP_COMMAND_TIMEOUT, IMAP_IDLE_RENEW_SECONDS, MAX_EMAIL_BODY_LENGTH,
+    IMAP_FETCH_BATCH_SIZE, IMAP_FETCH_TEXT_BYTES, IMAP_FETCH_HTML_BYTES
+)
+
+MAIL_HEADER_FIELDS = "FROM SUBJECT DATE MESSAGE-ID"
 
 class EmailTools:
     def __init__(self, email_user=None, email_password=None):
         self.host = "smtp.gmail.com"
-        self.imap_host = "imap.gmail.com"
+        self.imap_host = IMAP_HOST
         self.port = 465
         
         self.user = email_user
@@ -24,62 +32,18 @@ class EmailTools:
         _, addr = parseaddr(text)
         return addr.strip()
 
-    async def get_unread_emails(self, last_id):
+    async def get_unread_emails(self, last_uid, uid_validity=None):
+        """
+        收取 last_uid 之後的新信 (last_uid / uid_validity 為上次存下的進度)
+        回傳 (新信列表, 校正點)，校正點不為 None 時要先把進度改成 (UIDVALIDITY, UID)
+        """
         if not self.user or not self.password:
             print("[EmailTools] 錯誤: 未提供帳號密碼，跳過檢查")
             return [], None
 
-        imap_client = None
-        results = []
-        drift_fix_id = None
-
         try:
-            imap_client = aioimaplib.IMAP4_SSL(self.imap_host)
-
-            timeout = 15
-            while imap_client.protocol.state == 'STARTED' and timeout > 0:
-                await asyncio.sleep(0.5)
-                timeout -= 0.5
-            
-            await asyncio.sleep(1)
-
-            login_res = await imap_client.login(self.user, self.password)
-
-            if login_res.result != 'OK':
-                raise ValueError("AUTH_FAILED")
-
-            # await imap_client.login(self.user, self.password)
-            await imap_client.select("INBOX")
-
-            status, messages = await imap_client.search("ALL")
-            if status != "OK" or not messages[0]:
-                return [], None
-
-            all_ids = [int(m.decode()) for m in messages[0].split()]
-            if not all_ids:
-                return [], None
-            
-            new_ids = []
-            if last_id and str(last_id).isdigit():
-                last_id_int = int(last_id)
-                max_id = all_ids[-1]
-                
-                if last_id_int > max_id:
-                    print(f"⚠️ [EmailTools] 序列號偏移 (舊:{last_id_int} > 新:{max_id})，僅發送校正訊號，不重複抓取！")
-                    #  記錄需要校正的 ID，但 new_ids 保持為空，這樣就不會去 fetch 信件內容了
-                    drift_fix_id = str(max_id) 
-                else:
-                    new_ids = [str(i) for i in all_ids if i > last_id_int]
-            else:
-                new_ids = [str(i) for i in all_ids[-3:]]
-
-            for m_id in new_ids:
-                res, data = await imap_client.fetch(m_id, "(RFC822)")
-                if res == "OK":
-                    email_data = self._parse_latest_mail(data[1], m_id)
-                    results.append(email_data)
-            
-            return results, drift_fix_id
+            # 🌟 沿用連線池中已登入的連線，不再每次重新握手、登入、登出
+            return await imap_pool.run(self.user, self.password, lambda client, session: self._fetch_new(client, session, last_uid, uid_validity))
 
         except Exception as e:
             # 判斷是否為密碼錯誤
@@ -90,12 +54,184 @@ class EmailTools:
             
             print(f"⚠️ [EmailTools] 使用者 {self.user} 抓取發生其他錯誤: {e}")
             return [], None # 其他錯誤 則回傳空值，不拋出異常
+
+    async def watch_inbox(self, on_new_mail):
+        """
+        IMAP IDLE 監聽：開一條專用連線停在 IDLE，伺服器回報 EXISTS (有新信) 時才呼叫 await on_new_mail()
+        連線建立後會先呼叫一次 on_new_mail()，補上斷線期間進來的信
+        伺服器不支援 IDLE 時回傳 False；其餘情況會一直執行到被取消或連線中斷 (拋出例外)
+        """
+        session = await imap_pool.open_session(self.user, self.password)
+        client = session.client
+        try:
+            if not client.has_capability("IDLE"):
+                return False
+
+            known = self._count_exists(session.select_lines, 0)
+            await on_new_mail()
+
+            while True:
+                # 下 IDLE 前先 NOOP：確認連線還活著，也補上處理信件期間進來的新信
+                res = await client.noop()
+                if res.result != "OK":
+                    raise ConnectionError(f"NOOP 失敗: {res.lines}")
+                count = self._count_exists(res.lines, known)
+                arrived, known = count > known, count
+
+                if not arrived:
+                    idle = await client.idle_start(timeout=IMAP_IDLE_RENEW_SECONDS)
+                    while not arrived:
+                        push = await self._wait_push(session)
+                        if push == aioimaplib.STOP_WAIT_SERVER_PUSH:
+                            break  # 到了重新下 IDLE 的時間
+                        count = self._count_exists(push, known)
+                        arrived, known = count > known, count
+                    client.idle_done()
+                    await asyncio.wait_for(idle, IMAP_COMMAND_TIMEOUT)
+
+                if arrived:
+                    await on_new_mail()
         finally:
-            if imap_client:
-                try: 
-                    await imap_client.logout()
-                except Exception:
-                    pass
+            await imap_pool.close_client(client)
+
+    @staticmethod
+    async def _wait_push(session):
+        """等待 IDLE 推播；連線被關閉時拋出 ConnectionError (aioimaplib 本身不會通知等待中的 IDLE)"""
+        push = asyncio.ensure_future(session.client.wait_server_push(IMAP_IDLE_RENEW_SECONDS + IMAP_COMMAND_TIMEOUT))
+        lost = asyncio.ensure_future(session.lost.wait())
+        try:
+            await asyncio.wait({push, lost}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lost.cancel()
+            if not push.done():
+                push.cancel()
+        if not push.done() or push.cancelled():
+            raise ConnectionError("IMAP 連線已中斷")
+        return push.result()
+
+    @staticmethod
+    def _count_exists(lines, current: int) -> int:
+        """從伺服器回應中算出目前的信件數 (EXISTS 直接更新，EXPUNGE 減一)"""
+        for line in lines:
+            parts = bytes(line).split()
+            if len(parts) == 2 and parts[0].isdigit():
+                if parts[1].upper() == b"EXISTS":
+                    current = int(parts[0])
+                elif parts[1].upper() == b"EXPUNGE":
+                    current -= 1
+        return current
+
+    async def _fetch_new(self, imap_client, session, last_uid, uid_validity):
+        """
+        以 UID 增量收信：UID SEARCH UID n:* 的成本只跟新信數量有關，不會隨信箱大小成長
+        session.select_lines 是連線池借出時剛 SELECT 的結果；UIDNEXT 沒有前進代表沒有新信，連 UID SEARCH 都不用送
+        回傳 (新信列表, 校正點)；校正點為 (UIDVALIDITY, UID) 或 None，代表需要先把進度寫成這個值
+        """
+        current_validity = self._uid_validity(session.select_lines)
+        checkpoint = None
+
+        if last_uid and str(last_uid).isdigit() and uid_validity and int(uid_validity) == current_validity:
+            last = int(last_uid)
+            uid_next = self._uid_next(session.select_lines)
+            if uid_next and uid_next <= last + 1:
+                return [], None
+
+            res = await imap_client.uid_search("UID", f"{last + 1}:*", charset=None)
+            if res.result != "OK":
+                raise ConnectionError(f"UID SEARCH 失敗: {res.lines}")
+            # n:* 在沒有新信時仍會回傳最大的那封，所以要再過濾一次
+            new_uids = sorted(u for u in self._parse_numbers(res.lines[0] if res.lines else b"") if u > last)
+        else:
+            # 剛綁定、舊版的序列號進度、或 UIDVALIDITY 變更 (信箱重建，UID 全部重編)：只抓最新幾封的 UID 校正進度
+            recent_uids = await self._recent_uids(imap_client, self._count_exists(session.select_lines, 0), 3)
+            if last_uid:
+                print(f"⚠️ [EmailTools] {self.user} 的 UIDVALIDITY 變更或進度為舊格式，僅校正進度，不重複抓取！")
+                return [], (current_validity, str(max(recent_uids, default=0)))
+
+            # 首次綁定：與過去一樣抓最新的 3 封
+            new_uids = recent_uids
+            checkpoint = (current_validity, str(min(new_uids) - 1 if new_uids else 0))
+
+        results = []
+        for i in range(0, len(new_uids), IMAP_FETCH_BATCH_SIZE):
+            results += await self._fetch_messages(imap_client, new_uids[i:i + IMAP_FETCH_BATCH_SIZE])
+
+        return results, checkpoint
+
+    async def _fetch_messages(self, imap_client, uids: list[int]) -> list[dict]:
+        """
+        🌟 批次抓信：一個指令取回整批信的標頭與 BODYSTRUCTURE，再依結構只抓內文段落的前 N bytes
+        (同一個段落編號的信合併成一個指令)，附件與完整原始信件都不會下載
+        """
+        uid_set = ",".join(map(str, uids))
+        res = await imap_client.uid("fetch", uid_set, f"(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({MAIL_HEADER_FIELDS})])")
+        if res.result != "OK":
+            raise ConnectionError(f"FETCH 標頭失敗: {res.lines}")
+        headers = parse_fetch_response(res.lines)
+
+        # 依 (段落, 讀取上限) 分組
+        groups, parts = {}, {}
+        for uid, items in headers.items():
+            part = find_text_part(items.get("BODYSTRUCTURE"))
+            if part:
+                parts[uid] = part
+                limit = IMAP_FETCH_HTML_BYTES if part[1] else IMAP_FETCH_TEXT_BYTES
+                groups.setdefault((part[0], limit), []).append(uid)
+
+        bodies = {}
+        for (section, limit), group_uids in groups.items():
+            res = await imap_client.uid("fetch", ",".join(map(str, group_uids)), f"(BODY.PEEK[{section}]<0.{limit}>)")
+            if res.result != "OK":
+                raise ConnectionError(f"FETCH 內文失敗: {res.lines}")
+            for uid, items in parse_fetch_response(res.lines).items():
+                bodies[uid] = get_item(items, f"BODY[{section}]")
+
+        results = []
+        for uid in uids:
+            if uid not in headers:
+                continue  # 抓取前已被刪除
+            header = get_item(headers[uid], "BODY[HEADER")
+            msg = message_from_bytes(header if isinstance(header, bytes) else (header or "").encode())
+
+            body = ""
+            if uid in parts and bodies.get(uid) is not None:
+                _, is_html, encoding, charset = parts[uid]
+                data = bodies[uid] if isinstance(bodies[uid], bytes) else bodies[uid].encode()
+                body = self._finalize_body(decode_part(data, encoding, charset), is_html)
+
+            results.append(self._build_mail_info(msg, body, str(uid)))
+        return results
+
+    @staticmethod
+    async def _recent_uids(imap_client, exists: int, count: int) -> list[int]:
+        """用序列號取最後 count 封信的 UID (FETCH n-2:n (UID))"""
+        if exists <= 0:
+            return []
+        res = await imap_client.fetch(f"{max(1, exists - count + 1)}:{exists}", "(UID)")
+        if res.result != "OK":
+            raise ConnectionError(f"FETCH UID 失敗: {res.lines}")
+        return sorted(int(m) for line in res.lines for m in re.findall(rb"UID (\d+)", bytes(line)))
+
+    @staticmethod
+    def _uid_validity(select_lines) -> int:
+        for line in select_lines:
+            match = re.search(rb"UIDVALIDITY (\d+)", bytes(line))
+            if match:
+                return int(match.group(1))
+        return 0
+
+    @staticmethod
+    def _uid_next(select_lines) -> int:
+        """SELECT 回應中的 UIDNEXT (下一封信會拿到的 UID)，伺服器沒給時回傳 0"""
+        for line in select_lines:
+            match = re.search(rb"UIDNEXT (\d+)", bytes(line))
+            if match:
+                return int(match.group(1))
+        return 0
+
+    @staticmethod
+    def _parse_numbers(line) -> list[int]:
+        return [int(m) for m in bytes(line).split() if m.isdigit()]
 
     def safe_decode(self, msg, header_name):
         header_value = msg.get(header_name, "")
@@ -125,58 +261,15 @@ class EmailTools:
         text = re.sub(r'\n{3,}', '\n\n', text)
         return text.strip()
 
-    def _parse_multipart_body(self, msg):
-        """專門處理 multipart 郵件的輔助函數 (降低主要函數的認知複雜度)"""
-        body = ""
-        is_html = False
-        
-        for part in msg.walk():
-            content_type = part.get_content_type()
-            if "attachment" in str(part.get("Content-Disposition")):
-                continue
-                
-            if content_type == "text/plain":
-                payload = part.get_payload(decode=True)
-                charset = part.get_content_charset() or "utf-8"
-                body = payload.decode(charset, errors="replace")
-                is_html = False
-                break 
-                
-            elif content_type == "text/html":
-                payload = part.get_payload(decode=True)
-                charset = part.get_content_charset() or "utf-8"
-                body = payload.decode(charset, errors="replace")
-                is_html = True
-                
-        return body, is_html
-
-
-    def _get_body(self, msg):
-        """主要獲取郵件內文的函數"""
-        body = ""
-        is_html = False
-        
-        # 將原本沉重的巢狀邏輯抽離
-        if msg.is_multipart():
-            body, is_html = self._parse_multipart_body(msg)
-        else:
-            payload = msg.get_payload(decode=True)
-            charset = msg.get_content_charset() or "utf-8"
-            body = payload.decode(charset, errors="replace")
-            if msg.get_content_type() == "text/html":
-                is_html = True
-        
-        # 後續的 HTML 清理與長度限制邏輯維持不變
+    def _finalize_body(self, body, is_html):
+        """HTML 轉純文字並限制長度"""
         if is_html or "<html" in body.lower() or "<body" in body.lower():
             body = self._clean_html_to_text(body)
         
         body = body.strip()
-        from ..Gmail_config import MAX_EMAIL_BODY_LENGTH
         return (body[:MAX_EMAIL_BODY_LENGTH] + "...") if len(body) > MAX_EMAIL_BODY_LENGTH else body
 
-    def _parse_latest_mail(self, raw_email, msg_id):
-        msg = message_from_bytes(raw_email)
-        
+    def _build_mail_info(self, msg, body, msg_id):
         message_id = msg.get("Message-ID", "")
         gmail_link = ""
         if message_id:
@@ -188,8 +281,7 @@ class EmailTools:
             "id": msg_id,
             "from": self.safe_decode(msg, "From"),
             "subject": self.safe_decode(msg, "Subject"),
-            "body": self._get_body(msg),
+            "body": body,
             "date": msg.get("Date"),
-            "link": gmail_link, 
-            "raw": msg
-        }
\ No newline at end of file
+            "link": gmail_link
+        }
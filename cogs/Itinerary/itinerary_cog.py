@@ -1,7 +1,10 @@
 import discord
 from datetime import datetime, timezone, timedelta
 from discord.ext import commands, tasks
+from sqlalchemy import select
+from database import AsyncSessionLocal
 from database.models import CalendarEvent, BotSettings
+from database.db_utils import get_botsettings_async
 from .utils.calendar_manager import CalendarDatabaseManager
 
 class Itinerary(commands.Cog):
@@ -14,7 +17,15 @@ class Itinerary(commands.Cog):
         self.last_check_minute = -1
         self.check_reminders.start()
 
-    async def _send_single_event_reminder(self, session, event, settings, now_tw):
+    async def _get_calendar_channel_id(self):
+        """從 BotSettings 快取中找出第一個有設定行程通知頻道的伺服器"""
+        for guild in self.bot.guilds:
+            channel_id = await get_botsettings_async(BotSettings.calendar_notify_channel_id, guild.id)
+            if channel_id:
+                return channel_id
+        return None
+
+    async def _send_single_event_reminder(self, session, event, channel_id, now_tw):
         try:
             user = await self.bot.fetch_user(event.user_id)
             if not user: 
@@ -41,7 +52,6 @@ class Itinerary(commands.Cog):
             if event.is_private:
                 await user.send(embed=embed)
             else:
-                channel_id = settings.calendar_notify_channel_id if settings else None
                 channel = None
                 
                 if channel_id:
@@ -61,13 +71,13 @@ class Itinerary(commands.Cog):
                     await user.send(content=f"⚠️ 找不到公開通知頻道，改為私訊提醒：\n{content_prefix}", embed=embed)
 
             if not is_one_hour_ahead:
-                session.delete(event)
+                await session.delete(event)
         except Exception as e:
             print(f"❌ 發送出錯: {e}")
 
-    async def _process_events(self, session, events, settings, now_tw):
+    async def _process_events(self, session, events, channel_id, now_tw):
         for event in events:
-            await self._send_single_event_reminder(session, event, settings, now_tw)
+            await self._send_single_event_reminder(session, event, channel_id, now_tw)
 
     @tasks.loop(seconds=10.0)
     async def check_reminders(self):
@@ -86,9 +96,10 @@ class Itinerary(commands.Cog):
         one_hour_later_start = current_minute_start + timedelta(hours=1)
         one_hour_later_end = one_hour_later_start + timedelta(minutes=1)
 
-        with self.db_session_maker() as session:
+        # 每分鐘都會執行，改用非同步 session，查詢等待期間不阻塞事件迴圈
+        async with AsyncSessionLocal() as session:
             try:
-                events = session.query(CalendarEvent).filter(
+                result = await session.execute(select(CalendarEvent).where(
                     (
                         (CalendarEvent.event_time >= current_minute_start) & 
                         (CalendarEvent.event_time < current_minute_end)
@@ -97,17 +108,18 @@ class Itinerary(commands.Cog):
                         (CalendarEvent.event_time >= one_hour_later_start) & 
                         (CalendarEvent.event_time < one_hour_later_end)
                     )
-                ).all()
+                ))
+                events = result.scalars().all()
 
                 if not events:
                     return
-                settings = session.query(BotSettings).first() 
-                await self._process_events(session, events, settings, current_minute_start)
+                channel_id = await self._get_calendar_channel_id()
+                await self._process_events(session, events, channel_id, current_minute_start)
 
-                session.commit()
+                await session.commit()
             except Exception as e:
                 print(f"❌ 提醒任務發生錯誤: {e}")
-                session.rollback()
+                await session.rollback()
 
                 
     @check_reminders.before_loop
@@ -115,8 +127,8 @@ class Itinerary(commands.Cog):
         await self.bot.wait_until_ready()
 
     @staticmethod
-    def create_itinerary_dashboard_ui(user_id: int):
+    async def create_itinerary_dashboard_ui(user_id: int):
         from .ui.View.ItineraryDashboardView import ItineraryDashboardView
         
-        embed, view, file = ItineraryDashboardView.create_ui(user_id)
+        embed, view, file = await ItineraryDashboardView.create_ui(user_id)
         return embed, view, file
\ No newline at end of file
@@ -13,7 +13,7 @@ class BackToItineraryDashboardBtn(SafeButton):
 
     async def do_action(self, interaction: discord.Interaction):
         try:
-            embed, view, file = Itinerary.create_itinerary_dashboard_ui(interaction.user.id)
+            embed, view, file = await Itinerary.create_itinerary_dashboard_ui(interaction.user.id)
 
             if not interaction.response.is_done():
                 await interaction.response.edit_message(embed=embed, view=view, attachments=[file])
@@ -1,4 +1,5 @@
 import discord
+import inspect
 from cogs.BasicDiscordObject import SafeButton
 
 class PrevPageBtn(SafeButton):
@@ -20,6 +21,9 @@ class PrevPageBtn(SafeButton):
             interaction.user.id, 
             **kwargs
         )
+        # 行程看板的 create_ui 需要等待圖表渲染，刪除列表則是同步的
+        if inspect.isawaitable(result):
+            result = await result
         
         if len(result) == 3:
             embed, view, file = result
@@ -74,7 +74,7 @@ class ItineraryModal(ValidatedModal):
     async def on_success(self, interaction: discord.Interaction):
         """💡 成功後切換回 Dashboard"""
         try:
-            embed, view, file = Itinerary.create_itinerary_dashboard_ui(interaction.user.id)
+            embed, view, file = await Itinerary.create_itinerary_dashboard_ui(interaction.user.id)
             
             embed.title = "✅ 行程新增成功！"
             embed.color = discord.Color.green()
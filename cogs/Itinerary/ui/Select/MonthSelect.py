@@ -41,7 +41,7 @@ class MonthSelect(discord.ui.Select):
         
         # 2. 呼叫產生器，並將 page 重置為 0
         from cogs.Itinerary.ui.View.ItineraryDashboardView import ItineraryDashboardView
-        embed, view, file = ItineraryDashboardView.create_ui(
+        embed, view, file = await ItineraryDashboardView.create_ui(
             interaction.user.id, 
             month_offset=new_offset, 
             page=0
@@ -46,7 +46,7 @@ class ItineraryDashboardView(LockableView):
             pass
 
     @staticmethod
-    def create_ui(user_id, month_offset=0, page=0):
+    async def create_ui(user_id, month_offset=0, page=0):
         now = datetime.now(conf.TW_TZ)
         now_naive = now.replace(tzinfo=None)
         
@@ -65,7 +65,7 @@ class ItineraryDashboardView(LockableView):
         
         # 2. 生成月曆圖片
         event_days = list(set(ev.event_time.day for ev in month_events))
-        img_buffer = generate_month_calendar(target_year, target_month, event_days)
+        img_buffer = await generate_month_calendar(target_year, target_month, event_days)
         file = discord.File(fp=img_buffer, filename="calendar.png")
 
         # 3. 組裝清單 Embed
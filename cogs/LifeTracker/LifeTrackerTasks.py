@@ -2,10 +2,17 @@ from discord.ext import commands, tasks
 from datetime import time, datetime
 import asyncio
 from database import SessionLocal
-from database.models import TrackerCategory, EInvoiceConfig
+from database.models import EInvoiceConfig
 from cogs.LifeTracker.utils import LifeTracker_Manager, AI_Analyzer
 from cogs.LifeTracker.src.invoice_pipeline import InvoicePipeline
+from cogs.LifeTracker.src.browser_pool import browser_pool
+from cogs.LifeTracker.src.invoice_processor import InvoiceProcessor
+from cogs import job_queue
 from config import TW_TZ
+from cogs.LifeTracker.LifeTracker_config import (
+    AI_SUMMARY_CONCURRENCY, INVOICE_BROWSER_IDLE_TIMEOUT,
+    INVOICE_FETCH_CONCURRENCY, INVOICE_FETCH_START_INTERVAL
+)
 
 REPORT_TIME = time(hour=0, minute=0, tzinfo=TW_TZ)
 FETCH_INVOICE_TIME = time(hour=23, minute=30, tzinfo=TW_TZ)
@@ -13,8 +20,20 @@ FETCH_INVOICE_TIME = time(hour=23, minute=30, tzinfo=TW_TZ)
 class LifeTrackerTasks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._start_gate = asyncio.Lock()
+
+        # 實際的工作都放進背景工作佇列執行，bot 重啟後會從沒做完的地方繼續
+        job_queue.register("invoice_fetch", self._run_invoice_job, concurrency=INVOICE_FETCH_CONCURRENCY)
+        job_queue.register("weekly_summary", self._run_summary_job, concurrency=AI_SUMMARY_CONCURRENCY)
+        job_queue.register("invoice_reclassify", self._run_reclassify_job)
+
         self.weekly_ai_summary.start()
         self.daily_invoice_fetch.start()
+        self.close_idle_browsers.start()
+
+    def cog_unload(self):
+        self.close_idle_browsers.cancel()
+        browser_pool.shutdown()
 
     @tasks.loop(time=REPORT_TIME)
     async def weekly_ai_summary(self):
@@ -26,26 +45,42 @@ class LifeTrackerTasks(commands.Cog):
         print(f"🚀 [Task] 開始執行每週 AI 總結 (台灣時間: {now_tw})")
         
         try:
-            with SessionLocal() as db:
-                categories = db.query(TrackerCategory).all()
-                
-                for cat in categories:
-                    analysis_data = LifeTracker_Manager.get_records_for_analysis(cat.id, range_type="week")
-                    
-                    if analysis_data:
-                        try:
-                            summary = await AI_Analyzer.analyze_lifestyle(cat.name, analysis_data)
-                            
-                            cat.last_ai_analysis = summary
-                            cat.analysis_updated_at = datetime.now(TW_TZ)
-                            db.commit()
-                            print(f"✅ 已完成分類 [{cat.name}] 的每週總結")
-                        except Exception as e:
-                            db.rollback()
-                            print(f"❌ 分類 [{cat.name}] 分析失敗: {e}")
+            start_date = LifeTracker_Manager.get_analysis_start("week")
+            targets = await LifeTracker_Manager.get_analysis_targets(start_date)
+            
+            # 紀錄指紋與上次分析相同 (本週資料沒變) 的分類直接沿用舊的總結
+            pending = [t for t in targets if t.fingerprint != t.analysis_fingerprint]
+            print(f"📋 本週有紀錄的分類 {len(targets)} 個，需要重新分析 {len(pending)} 個")
+
+            # 指紋放進 dedupe_key：同一份資料的總結已經在排隊就不重複放
+            ids = await job_queue.enqueue_many(
+                "weekly_summary",
+                [{"category_id": t.id, "name": t.name, "fingerprint": t.fingerprint, "start_date": start_date.isoformat()} for t in pending],
+                dedupe_keys=[f"weekly_summary:{t.id}:{t.fingerprint}" for t in pending],
+                max_attempts=3
+            )
+            print(f"📮 [Task] 已排入 {len(ids)} 件每週總結工作")
         except Exception as e:
             print(f"❌ [Task] 每週總結任務出錯: {e}")
 
+    async def _run_summary_job(self, payload: dict):
+        """單一分類的總結：讀資料、呼叫 AI、寫回，三個步驟各自用短連線，等待 AI 時不佔用資料庫連線"""
+        category_id, name = payload["category_id"], payload["name"]
+        start_date = datetime.fromisoformat(payload["start_date"])
+
+        analysis_data = await LifeTracker_Manager.get_records_for_analysis(category_id, start_date=start_date)
+        if not analysis_data:
+            return
+
+        summary = await AI_Analyzer.analyze_lifestyle(name, analysis_data)
+
+        # analyze_lifestyle 失敗時回傳 ⚠️ 開頭的訊息：照舊寫入，但不記指紋，並交給佇列稍後重試
+        succeeded = not summary.startswith("⚠️")
+        saved = await LifeTracker_Manager.save_ai_analysis(category_id, summary, payload["fingerprint"] if succeeded else None)
+        if not (saved and succeeded):
+            raise RuntimeError(f"分類 [{name}] 分析失敗: {summary if not succeeded else '寫入失敗'}")
+        print(f"✅ 已完成分類 [{name}] 的每週總結")
+
     @tasks.loop(time=FETCH_INVOICE_TIME)
     async def daily_invoice_fetch(self):
         now_tw = datetime.now(TW_TZ)
@@ -57,20 +92,55 @@ class LifeTrackerTasks(commands.Cog):
                 configs = db.query(EInvoiceConfig).all()
                 # 為了避免資料庫 session 跨非同步操作過期，先將 ID 取出存成 list
                 user_ids = [c.user_id for c in configs]
+
+            # 先把瀏覽器與 OCR 模型暖好，之後每位使用者都直接借用
+            if user_ids:
+                try:
+                    await asyncio.to_thread(browser_pool.warm)
+                except Exception as e:
+                    print(f"⚠️ [Task] 瀏覽器暖機失敗，改為使用時再開啟: {e}")
                 
-            for uid in user_ids:
-                print(f"▶️ 正在為 User({uid}) 抓取發票...")
-                success, msg = await InvoicePipeline.execute(uid)
-                
-                if success:
-                    print(f"✅ User({uid}) 發票抓取成功。")
-                else:
-                    print(f"⚠️ User({uid}) 發票抓取失敗: {msg}")
-                    
-                # 禮貌性延遲：每次抓完一位使用者停頓 10 秒，避免對財政部伺服器造成瞬間 DDoS
-                await asyncio.sleep(10)
-                
-            print(f"🏁 [Task] 每日發票自動抓取任務結束！")
+            # 🌟 每位使用者一件工作，最多同時抓 INVOICE_FETCH_CONCURRENCY 位 (由佇列控制)
+            InvoicePipeline.reset_session_stats()
+            today = now_tw.date().isoformat()
+            ids = await job_queue.enqueue_many(
+                "invoice_fetch",
+                [{"user_id": uid} for uid in user_ids],
+                dedupe_keys=[f"invoice_fetch:{uid}:{today}" for uid in user_ids],
+                max_attempts=3
+            )
+            print(f"📮 [Task] 已排入 {len(ids)} / {len(user_ids)} 位使用者的發票抓取工作")
                 
         except Exception as e:
-            print(f"❌ [Task] 每日發票自動抓取任務出錯: {e}")
\ No newline at end of file
+            print(f"❌ [Task] 每日發票自動抓取任務出錯: {e}")
+
+    async def _run_invoice_job(self, payload: dict):
+        uid = payload["user_id"]
+        # 禮貌性間隔：錯開每個工作的啟動時間，避免同一瞬間對財政部伺服器送出多個登入
+        async with self._start_gate:
+            await asyncio.sleep(INVOICE_FETCH_START_INTERVAL)
+
+        print(f"▶️ 正在為 User({uid}) 抓取發票...")
+        success, msg, retryable = await InvoicePipeline.run(uid)
+        if not success:
+            # 帳密錯誤、沒有設定：重試只會多幾次驗證碼登入 (可能害帳號被鎖)，直接放棄
+            error_cls = RuntimeError if retryable else job_queue.PermanentError
+            raise error_cls(f"User({uid}) 發票抓取失敗: {msg}")
+        print(f"✅ User({uid}) 發票抓取成功。")
+
+        # 佇列裡只剩自己這一件：這一輪結束，印出登入狀態的沿用情況
+        if await job_queue.pending_count("invoice_fetch") <= 1:
+            session = InvoicePipeline.get_session_stats()
+            print(
+                f"🔑 [Task] 沿用登入狀態 {session['reused']} 次、重新登入 {session['fresh_logins']} 次 "
+                f"(沿用率 {session['reuse_rate']:.0%}，估計省下 {session['saved_seconds']} 秒)"
+            )
+
+    async def _run_reclassify_job(self, payload: dict):
+        await InvoiceProcessor(payload["user_id"]).reclassify()
+
+    @tasks.loop(minutes=5)
+    async def close_idle_browsers(self):
+        closed = await asyncio.to_thread(browser_pool.close_idle, INVOICE_BROWSER_IDLE_TIMEOUT)
+        if closed:
+            print(f"🧹 [Task] 已關閉 {closed} 個閒置的瀏覽器")
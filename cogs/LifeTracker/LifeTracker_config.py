@@ -8,5 +8,25 @@ MAX_DAY_RANGE = 9999
 MIN_DAY_RANGE = 1
 MAX_INPUT_VALUE = 1000000
 
+RECORD_COUNT_TTL = 60  # 紀錄列表總筆數快取秒數 (區間會隨時間滑動，不能永久快取)
+CHART_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 圖表快取記憶體上限
+CHART_CACHE_MAX_ENTRIES = 500
+
+AI_REQUESTS_PER_MINUTE = 60  # 所有 LLM 請求共用的速率上限
+AI_SUMMARY_CONCURRENCY = 8   # 每週總結同時進行的分類數
+CLASSIFY_BATCH_SIZE = 50     # 發票品項每次送給 AI 分類的數量
+
+LOCAL_CLASSIFY_THRESHOLD = 0.9   # 本地分類器信心低於此值才交給 AI
+LOCAL_CLASSIFY_MIN_SAMPLES = 30  # 分類內有備註的紀錄少於此數時不使用本地分類器
+LOCAL_CLASSIFY_MIN_LABEL_SAMPLES = 5  # 至少兩個標籤各有這麼多筆紀錄，本地分類器才會回答
+LOCAL_CLASSIFY_MAX_TRAIN = 5000  # 訓練時最多讀取的歷史紀錄數 (取最新的)
+LOCAL_CLASSIFY_MAX_MODELS = 200  # 記憶體中最多保留的分類模型數
+
+INVOICE_BROWSER_POOL_SIZE = 2          # 發票爬蟲同時保留的無頭 Chrome 數量
+INVOICE_BROWSER_MAX_USES = 20          # 每個瀏覽器用滿幾次就重開 (避免記憶體越吃越多)
+INVOICE_BROWSER_IDLE_TIMEOUT = 30 * 60 # 閒置超過幾秒就關閉
+INVOICE_FETCH_CONCURRENCY = 2          # 每日抓取同時進行的使用者數 (不超過瀏覽器數量才不會排隊)
+INVOICE_FETCH_START_INTERVAL = 3       # 每個抓取工作啟動的最小間隔秒數
+
 MAX_PHONE_LENGTH = 10
 MAX_PASSWORD_LENGTH = 25
\ No newline at end of file
@@ -0,0 +1,29 @@
+# cogs/LifeTracker/backfill_daily_stats.py
+"""
+從 life_records 重建每日彙總表 (life_record_daily_stats)
+
+使用方式：
+    python -m cogs.LifeTracker.backfill_daily_stats                 # 全部重建
+    python -m cogs.LifeTracker.backfill_daily_stats --category 42   # 只重建單一分類
+"""
+import argparse
+import time
+
+from cogs.LifeTracker.utils.LifeTracker_Manager import LifeTracker_Manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建生活紀錄每日彙總")
+    parser.add_argument("--category", type=int, default=None, help="只重建指定的分類 ID")
+    args = parser.parse_args()
+
+    target = f"分類 {args.category}" if args.category is not None else "所有分類"
+    print(f"🔧 開始重建每日彙總：{target} ...")
+
+    started = time.perf_counter()
+    count = LifeTracker_Manager.rebuild_daily_stats(category_id=args.category)
+    print(f"✅ 重建完成，共 {count:,} 筆彙總，耗時 {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# cogs\LifeTracker\src\browser_pool.py
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from config import EINVOICE_BASE_URL
+from cogs.LifeTracker.LifeTracker_config import INVOICE_BROWSER_POOL_SIZE, INVOICE_BROWSER_MAX_USES
+
+# 清除網站資料時要指定完整的 origin (scheme://host[:port])，不接受萬用字元
+_parts = urlsplit(EINVOICE_BASE_URL)
+PORTAL_ORIGIN = f"{_parts.scheme}://{_parts.netloc}"
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+class BrowserPool:
+    """
+    無頭 Chrome 的共用池
+    開 Chrome、解析 chromedriver 路徑、載入 OCR 模型都很慢，這裡保留 N 個暖好的瀏覽器給爬蟲輪流使用；
+    每次用完清掉 cookie 與網站資料，用滿 M 次或發生錯誤就換一個新的
+    """
+    def __init__(self, size: int = INVOICE_BROWSER_POOL_SIZE, max_uses: int = INVOICE_BROWSER_MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self._idle: list[_PooledDriver] = []
+        self._created = 0
+        self._cond = threading.Condition()
+        self._ocr = None
+        self._ocr_lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "recycled": 0}
+
+    # ==================== 共用資源 ====================
+
+    def get_ocr(self):
+        """驗證碼 OCR 模型整個程式只載入一次"""
+        with self._ocr_lock:
+            if self._ocr is None:
+                import ddddocr
+                self._ocr = ddddocr.DdddOcr()
+            return self._ocr
+
+    def classify_captcha(self, img_bytes: bytes) -> str:
+        # 多個爬蟲共用同一個模型，辨識時排隊 (每次只要幾毫秒)
+        ocr = self.get_ocr()
+        with self._ocr_lock:
+            return ocr.classification(img_bytes)
+
+    def _create(self) -> _PooledDriver:
+        """開一個新的瀏覽器 (呼叫前需先在鎖內把 _created 加一，失敗時這裡會退回)"""
+        from cogs.LifeTracker.src.invoice_crawler import InvoiceCrawler
+        try:
+            item = _PooledDriver(InvoiceCrawler.create_driver())
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return item
+
+    # ==================== 借用 / 歸還 ====================
+
+    @staticmethod
+    def _is_alive(item: _PooledDriver) -> bool:
+        try:
+            item.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(item: _PooledDriver):
+        try:
+            item.driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, item: _PooledDriver):
+        """清掉上一位使用者的登入狀態 (cookie、快取、localStorage 等)，並回到空白頁"""
+        driver = item.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": PORTAL_ORIGIN, "storageTypes": "all"})
+        # 上一個工作的下載資料夾之後會被刪掉，借出前一律先禁止下載，由下一個工作重新指定
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "deny"})
+
+    def acquire(self, timeout: float = None):
+        """借出一個瀏覽器 (池中沒有閒置且已達上限時會等待)，回傳 _PooledDriver"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            item = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        item = self._idle.pop()
+                        break
+                    if self._created < self.size:
+                        self._created += 1
+                        break
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("等待瀏覽器逾時")
+                    self._cond.wait(remaining)
+
+            if item is None:
+                # 開新的瀏覽器很慢，不要佔著鎖
+                return self._create()
+
+            # 確認存活要跟瀏覽器來回一次，同樣在鎖外進行 (檢查期間仍算在 _created 內，不會超開)
+            if self._is_alive(item):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return item
+
+            # 閒置期間瀏覽器掛掉了，丟掉換新的
+            self._quit(item)
+            with self._cond:
+                self._created -= 1
+                self._stats["recycled"] += 1
+                self._cond.notify()
+
+    def release(self, item: _PooledDriver, broken: bool = False):
+        """歸還瀏覽器；發生錯誤或使用次數用完就關掉，下次借用時重開"""
+        item.uses += 1
+        item.last_used = time.monotonic()
+
+        if not broken and item.uses < self.max_uses:
+            try:
+                self._reset(item)
+            except Exception:
+                broken = True
+        else:
+            broken = True
+
+        with self._cond:
+            if broken:
+                self._created -= 1
+                self._stats["recycled"] += 1
+            else:
+                self._idle.append(item)
+            self._cond.notify()
+
+        if broken:
+            self._quit(item)
+
+    @contextmanager
+    def driver(self, timeout: float = None):
+        """with browser_pool.driver() as driver: ... (發生例外時瀏覽器會被回收)"""
+        item = self.acquire(timeout)
+        try:
+            yield item.driver
+        except BaseException:
+            self.release(item, broken=True)
+            raise
+        else:
+            self.release(item)
+
+    # ==================== 生命週期 ====================
+
+    def warm(self, count: int = None):
+        """預先開好瀏覽器並載入 OCR 模型 (大量抓取前呼叫)"""
+        self.get_ocr()
+        target = min(count or self.size, self.size)
+        while True:
+            with self._cond:
+                if self._created >= target:
+                    return
+                self._created += 1
+            item = self._create()
+            with self._cond:
+                self._idle.append(item)
+                self._cond.notify()
+
+    def close_idle(self, idle_seconds: float = 0):
+        """關掉閒置超過 idle_seconds 秒的瀏覽器，把記憶體還給系統"""
+        now = time.monotonic()
+        with self._cond:
+            stale = [i for i in self._idle if now - i.last_used >= idle_seconds]
+            self._idle = [i for i in self._idle if i not in stale]
+            self._created -= len(stale)
+            self._cond.notify_all()
+        for item in stale:
+            self._quit(item)
+        return len(stale)
+
+    def shutdown(self):
+        self.close_idle()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "alive": self._created, "idle": len(self._idle)}
+
+browser_pool = BrowserPool()
@@ -3,11 +3,10 @@ import os
 import time
 import base64
 import io
-import ddddocr
 import PIL.Image
 from PIL import Image
 from datetime import datetime, timedelta
-from config import TW_TZ
+from config import TW_TZ, EINVOICE_BASE_URL
 if not hasattr(PIL.Image, 'ANTIALIAS'):
     PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
 
@@ -20,12 +19,20 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select 
 from selenium.webdriver.common.keys import Keys
 from webdriver_manager.chrome import ChromeDriverManager
+from cogs.LifeTracker.src.browser_pool import browser_pool
+
+QUERY_PAGE_URL = f"{EINVOICE_BASE_URL}/portal/btc/mobile/btc502w/detail"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
 class InvoiceCrawler:
-    def __init__(self):
-        self.ocr = ddddocr.DdddOcr()
-        self.driver = self._setup_stealth_driver()
+    _driver_path = None  # chromedriver 路徑只解析一次
+
+    def __init__(self, driver=None):
+        # 通常由 browser_pool 借出暖好的瀏覽器；單獨執行時才自己開一個
+        self.driver = driver or self.create_driver()
 
-    def _setup_stealth_driver(self):
+    @classmethod
+    def create_driver(cls):
         options = Options()
         # 確保無頭模式開啟
         options.add_argument("--headless=new") 
@@ -40,8 +47,7 @@ class InvoiceCrawler:
         options.add_argument("--disable-extensions")
         options.page_load_strategy = 'normal' # 確保網頁完全載入
         
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-        options.add_argument(f"user-agent={user_agent}")
+        options.add_argument(f"user-agent={USER_AGENT}")
         
         download_dir = os.path.abspath(os.path.join(os.getcwd(), "cogs", "LifeTracker", "src", "downloads"))
         if not os.path.exists(download_dir):
@@ -55,7 +61,9 @@ class InvoiceCrawler:
         }
         options.add_experimental_option("prefs", prefs)
         
-        service = Service(ChromeDriverManager().install())
+        if cls._driver_path is None:
+            cls._driver_path = ChromeDriverManager().install()
+        service = Service(cls._driver_path)
         driver = webdriver.Chrome(service=service, options=options)
         
         driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
@@ -67,9 +75,29 @@ class InvoiceCrawler:
         })
         return driver
 
+    def restore_session(self, cookies: list) -> bool:
+        """放回上次登入的 cookie 並打開查詢頁，仍在登入狀態就回傳 True (不必再過驗證碼)"""
+        try:
+            # 要先進到同一個網域才能設定 cookie
+            self.driver.get(f"{EINVOICE_BASE_URL}/")
+            for cookie in cookies:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception:
+                    pass
+
+            self.driver.get(QUERY_PAGE_URL)
+            WebDriverWait(self.driver, 10).until(
+                lambda d: d.find_elements(By.ID, "dp-input-searchInvoiceDate") or d.find_elements(By.ID, "mobile_phone")
+            )
+            return bool(self.driver.find_elements(By.ID, "dp-input-searchInvoiceDate"))
+        except Exception as e:
+            print(f"⚠️ 無法沿用上次的登入狀態: {e}")
+            return False
+
     def login(self, phone, password):
         """自動登入財政部電子發票平台"""
-        target_url = "https://www.einvoice.nat.gov.tw/accounts/login/mw"
+        target_url = f"{EINVOICE_BASE_URL}/accounts/login/mw"
         max_retries = 5
         wait = WebDriverWait(self.driver, 10)
 
@@ -105,7 +133,7 @@ class InvoiceCrawler:
                 image.save(img_byte_arr, format='PNG')
                 clean_img_bytes = img_byte_arr.getvalue()
                 
-                captcha_text = self.ocr.classification(clean_img_bytes)
+                captcha_text = browser_pool.classify_captcha(clean_img_bytes)
                 print(f"👁️ OCR 辨識出驗證碼: {captcha_text}")
                 
                 captcha_input = self.driver.find_element(By.ID, "captcha")
@@ -125,14 +153,42 @@ class InvoiceCrawler:
                 print(f"❌ 錯誤: {e}")
                 time.sleep(2)
                 
-        self.driver.quit()
         return False
     
-    def download_csv(self, start_id: str, end_id: str):
-        """執行查詢、過濾與下載 CSV 的自動化流程"""
+    def set_download_dir(self, download_dir: str):
+        """指定這次工作的下載資料夾 (每個工作各自一個，平行抓取時才不會互相覆蓋)"""
+        os.makedirs(download_dir, exist_ok=True)
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(download_dir),
+            "eventsEnabled": False
+        })
+
+    @staticmethod
+    def wait_for_csv(download_dir: str, timeout: float = 30):
+        """等待下載資料夾出現完整的 CSV (Chrome 下載中會是 .crdownload)，回傳路徑或 None"""
+        deadline = time.monotonic() + timeout
+        while True:
+            files = os.listdir(download_dir) if os.path.isdir(download_dir) else []
+            done = [f for f in files if f.endswith('.csv')]
+            if done and not any(f.endswith('.crdownload') for f in files):
+                return os.path.join(download_dir, done[0])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.5)
+
+    def download_csv(self, start_id: str, end_id: str, download_dir: str = None, logout: bool = True):
+        """
+        執行查詢、過濾與下載 CSV 的自動化流程
+        有指定 download_dir 時 CSV 會下載到該資料夾，並等到檔案下載完成
+        logout=False 時保留登入狀態，讓下次抓取可以沿用
+        """
         wait = WebDriverWait(self.driver, 10)
         
         try:
+            if download_dir:
+                self.set_download_dir(download_dir)
+
             print(f"📅 準備點擊日曆，區間: {start_id} ~ {end_id}")
 
             # 🌟 [新增] 給網頁多一點時間載入 Vue 框架，防止 JS 點擊時崩潰
@@ -195,7 +251,11 @@ class InvoiceCrawler:
                 self.driver.execute_script("arguments[0].click();", download_btn)
                 
                 print("🎉 CSV 下載指令已送出！等待檔案下載...")
-                time.sleep(5) 
+                if download_dir:
+                    if not self.wait_for_csv(download_dir):
+                        print("⚠️ 等待 CSV 下載逾時。")
+                else:
+                    time.sleep(5) 
                 
             except Exception:
                 # 找不到 SelectSizes 或下載按鈕，通常代表畫面顯示「查無資料」
@@ -207,21 +267,21 @@ class InvoiceCrawler:
             
         finally:
             # 🌟 [新增] 無論有沒有發票、甚至發生錯誤，都保證執行安全登出系統
-            try:
-                print("🚪 任務完成，準備登出系統...")
-                logout_btn = WebDriverWait(self.driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//a[@title='登出']")))
-                self.driver.execute_script("arguments[0].click();", logout_btn)
-                time.sleep(2) 
-                print("✅ 成功登出，安全下線！")
-            except Exception as e:
-                print(f"⚠️ 登出時發生異常，可能已經登出或頁面卡住: {e}")
+            if logout:
+                try:
+                    print("🚪 任務完成，準備登出系統...")
+                    logout_btn = WebDriverWait(self.driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//a[@title='登出']")))
+                    self.driver.execute_script("arguments[0].click();", logout_btn)
+                    time.sleep(2) 
+                    print("✅ 成功登出，安全下線！")
+                except Exception as e:
+                    print(f"⚠️ 登出時發生異常，可能已經登出或頁面卡住: {e}")
                 
         return True
 
 if __name__ == "__main__":
     TEST_PHONE = "" 
     TEST_PWD = ""
-    QUERY_PAGE_URL = "https://www.einvoice.nat.gov.tw/portal/btc/mobile/btc502w/detail"
     
     crawler = InvoiceCrawler()
     if crawler.login(TEST_PHONE, TEST_PWD):
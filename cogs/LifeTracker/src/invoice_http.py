@@ -0,0 +1,67 @@
+# cogs\LifeTracker\src\invoice_http.py
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import EINVOICE_BASE_URL, EINVOICE_CSV_EXPORT_PATH
+
+class SessionExpired(Exception):
+    """登入 cookie 已失效 (平台回 401/403 或把請求導回登入頁)"""
+
+# 所有工作共用同一組連線池；cookie 則每個工作各自一個 Session，避免不同使用者的登入狀態混在一起
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+)
+
+class InvoiceHttpClient:
+    """
+    不開瀏覽器的發票匯出
+    瀏覽器只負責過驗證碼登入，之後用登入得到的 cookie 直接向匯出 API 下載 CSV
+    """
+    def __init__(self, cookies: list = None, user_agent: str = None, base_url: str = EINVOICE_BASE_URL):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.mount("http://", _adapter)
+        self.session.mount("https://", _adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for c in cookies or []:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    @classmethod
+    def from_driver(cls, driver, base_url: str = EINVOICE_BASE_URL):
+        """沿用 Selenium 已登入的 cookie 與 User-Agent"""
+        user_agent = driver.execute_script("return navigator.userAgent")
+        return cls(driver.get_cookies(), user_agent, base_url)
+
+    def get_cookies(self) -> list:
+        """目前的 cookie (含伺服器回應時更新的)，格式與 Selenium 的 get_cookies() 相同"""
+        return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path} for c in self.session.cookies]
+
+    def download_csv(self, start_date: str, end_date: str, download_dir: str, timeout: float = 30) -> str:
+        """
+        下載區間內的發票明細 CSV 到 download_dir，回傳檔案路徑
+        日期格式與日曆元件的 ID 相同 (YYYY-MM-DD)；登入失效時拋出 SessionExpired
+        """
+        resp = self.session.get(
+            f"{self.base_url}{EINVOICE_CSV_EXPORT_PATH}",
+            params={"startDate": start_date, "endDate": end_date},
+            timeout=timeout,
+            allow_redirects=False
+        )
+        if resp.status_code in (401, 403) or resp.is_redirect:
+            raise SessionExpired(f"HTTP {resp.status_code}")
+        resp.raise_for_status()
+        if "html" in resp.headers.get("Content-Type", ""):
+            raise SessionExpired("回應為 HTML 頁面 (可能被導回登入頁)")
+
+        os.makedirs(download_dir, exist_ok=True)
+        path = os.path.join(download_dir, f"invoice_{start_date}_{end_date}.csv")
+        with open(path, "wb") as f:
+            f.write(resp.content)
+        return path
+
+    def close(self):
+        self.session.close()
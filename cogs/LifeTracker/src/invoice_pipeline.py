@@ -1,84 +1,183 @@
 import asyncio
 import traceback
 import os
-import glob
+import shutil
+import tempfile
+import threading
+import time
 from cogs.LifeTracker.utils.EInvoice_Manager import EInvoice_Manager
-from cogs.LifeTracker.src.invoice_crawler import InvoiceCrawler
+from cogs.LifeTracker.src.invoice_crawler import InvoiceCrawler, QUERY_PAGE_URL, USER_AGENT
+from cogs.LifeTracker.src.browser_pool import browser_pool
+from cogs.LifeTracker.src.invoice_http import InvoiceHttpClient, SessionExpired
+from config import INVOICE_FETCH_MODE
 from cogs.LifeTracker.src.invoice_processor import InvoiceProcessor
 
+DOWNLOAD_ROOT = os.path.abspath(os.path.join(os.getcwd(), "cogs", "LifeTracker", "src", "downloads"))
+
 class InvoicePipeline:
+    # 登入狀態沿用的統計 (爬蟲在多條執行緒中跑，更新時要上鎖)
+    # 兩種樣本都量「開始登入或沿用 → CSV 下載完成」同一段時間，只記成功拿到 CSV 的那幾次
+    _session_stats = {"reused": 0, "fresh": 0, "fresh_seconds": 0.0, "reused_seconds": 0.0}
+    _stats_lock = threading.Lock()
+
+    @staticmethod
+    def _record_session(reused: bool, seconds: float):
+        with InvoicePipeline._stats_lock:
+            key = "reused" if reused else "fresh"
+            InvoicePipeline._session_stats[key] += 1
+            InvoicePipeline._session_stats[f"{key}_seconds"] += seconds
+
+    @staticmethod
+    def get_session_stats() -> dict:
+        """登入狀態的沿用率，以及用「完整登入的平均抓取耗時 - 沿用登入的平均抓取耗時」估計省下的秒數"""
+        with InvoicePipeline._stats_lock:
+            st = dict(InvoicePipeline._session_stats)
+        total = st["reused"] + st["fresh"]
+        avg_fresh = st["fresh_seconds"] / st["fresh"] if st["fresh"] else 0.0
+        avg_reused = st["reused_seconds"] / st["reused"] if st["reused"] else 0.0
+        return {
+            "reused": st["reused"],
+            "fresh_logins": st["fresh"],
+            "reuse_rate": st["reused"] / total if total else 0.0,
+            "avg_fresh_fetch_seconds": round(avg_fresh, 2),
+            "avg_reused_fetch_seconds": round(avg_reused, 2),
+            "saved_seconds": round(max(avg_fresh - avg_reused, 0.0) * st["reused"], 1),
+        }
+
+    @staticmethod
+    def reset_session_stats():
+        with InvoicePipeline._stats_lock:
+            InvoicePipeline._session_stats.update({"reused": 0, "fresh": 0, "fresh_seconds": 0.0, "reused_seconds": 0.0})
+
     @staticmethod
-    def _run_crawler_sync(phone: str, password: str, start_id: str, end_id: str) -> tuple[bool, str]:
-        """阻塞型的同步函數，負責控制 Selenium"""
-        
-        # 🌟 [新增] 執行前先清空 downloads 資料夾，防止讀到上次崩潰殘留的舊 CSV
-        download_dir = os.path.abspath(os.path.join(os.getcwd(), "cogs", "LifeTracker", "src", "downloads"))
-        if os.path.exists(download_dir):
-            for f in glob.glob(os.path.join(download_dir, "*.csv")):
-                try: os.remove(f)
-                except: pass
-
-        crawler = None
+    def _run_crawler_sync(phone: str, password: str, start_id: str, end_id: str, download_dir: str, saved_cookies: list = None) -> tuple[bool, str, str, list, bool]:
+        """
+        阻塞型的同步函數，負責控制 Selenium
+        回傳: (成功與否, 訊息, CSV 路徑 或 None(該區間沒有發票), 要保存的登入 cookie, 失敗時是否值得重試)
+        """
+        # 🌟 http 模式且有上次的登入狀態：直接打匯出 API，連瀏覽器都不用借
+        if saved_cookies and INVOICE_FETCH_MODE == "http":
+            started = time.perf_counter()
+            client = InvoiceHttpClient(saved_cookies, USER_AGENT)
+            try:
+                csv_path = client.download_csv(start_id, end_id, download_dir)
+                InvoicePipeline._record_session(True, time.perf_counter() - started)
+                return True, "CSV 下載成功", csv_path, client.get_cookies(), False
+            except SessionExpired:
+                print("🔑 上次的登入狀態已失效，重新登入...")
+            except Exception as e:
+                print(f"⚠️ 沿用登入狀態下載失敗，重新登入: {e}")
+            finally:
+                client.close()
+
         try:
-            crawler = InvoiceCrawler()
-            if not crawler.login(phone, password):
-                return False, "載具登入失敗，請確認帳號密碼是否正確。"
-            
-            # 登入成功後，跳轉到查詢頁面
-            QUERY_PAGE_URL = "https://www.einvoice.nat.gov.tw/portal/btc/mobile/btc502w/detail"
-            crawler.driver.get(QUERY_PAGE_URL)
-            import time; time.sleep(3) 
-            
-            success = crawler.download_csv(start_id, end_id)
-            
-            if success:
-                return True, "CSV 下載成功"
-            else:
-                return False, "CSV 下載流程失敗"
+            # 🌟 從瀏覽器池借一個暖好的 Chrome，用完會清掉登入狀態歸還；發生例外時直接回收換新的
+            with browser_pool.driver() as driver:
+                crawler = InvoiceCrawler(driver)
+
+                # 先試著放回上次的 cookie，還有效就跳過驗證碼登入
+                started = time.perf_counter()
+                reused = bool(saved_cookies) and INVOICE_FETCH_MODE != "http" and crawler.restore_session(saved_cookies)
+                if not reused:
+                    started = time.perf_counter()  # 沿用失敗的那次嘗試不算進完整登入的耗時
+                    if not crawler.login(phone, password):
+                        # login 內部已經重試過多次，再重試只會增加帳號被平台鎖住的風險
+                        return False, "載具登入失敗，請確認帳號密碼是否正確。", None, None, False
+
+                # 🌟 http 模式：直接用登入 cookie 下載 CSV，不用再操作日曆與等待頁面
+                if INVOICE_FETCH_MODE == "http":
+                    csv_path = InvoicePipeline._download_via_http(driver, start_id, end_id, download_dir)
+                    if csv_path:
+                        InvoicePipeline._record_session(reused, time.perf_counter() - started)
+                        return True, "CSV 下載成功", csv_path, driver.get_cookies(), False
+                
+                # 登入成功後，跳轉到查詢頁面 (沿用登入狀態時已經在查詢頁了)
+                if not reused:
+                    crawler.driver.get(QUERY_PAGE_URL)
+                    time.sleep(3)
+                
+                # 不登出，讓下一次抓取可以沿用這次的登入狀態
+                success = crawler.download_csv(start_id, end_id, download_dir, logout=False)
+                
+                if success:
+                    InvoicePipeline._record_session(reused, time.perf_counter() - started)
+                    return True, "CSV 下載成功", InvoiceCrawler.wait_for_csv(download_dir, timeout=0), driver.get_cookies(), False
+                else:
+                    return False, "CSV 下載流程失敗", None, None, True
                 
         except Exception as e:
             print("[InvoicePipeline 爬蟲錯誤]")
             traceback.print_exc()
-            return False, f"爬蟲發生未預期錯誤: {e}"
+            return False, f"爬蟲發生未預期錯誤: {e}", None, None, True
+
+    @staticmethod
+    def _download_via_http(driver, start_id: str, end_id: str, download_dir: str):
+        """用瀏覽器的登入狀態直接下載 CSV，失敗時回傳 None (改走瀏覽器流程)"""
+        client = InvoiceHttpClient.from_driver(driver)
+        try:
+            return client.download_csv(start_id, end_id, download_dir)
+        except Exception as e:
+            print(f"⚠️ HTTP 下載 CSV 失敗，改用瀏覽器下載: {e}")
+            return None
         finally:
-            # 🌟 [新增] 使用 finally 保證無論如何都會關閉瀏覽器，釋放記憶體
-            if crawler and hasattr(crawler, 'driver') and crawler.driver:
-                try: crawler.driver.quit()
-                except: pass
+            client.close()
 
     @staticmethod
     async def execute(user_id: int) -> tuple[bool, str]:
-        """給按鈕或排程呼叫的非同步主入口"""
+        """給按鈕呼叫的非同步主入口"""
+        success, msg, _ = await InvoicePipeline.run(user_id)
+        return success, msg
+
+    @staticmethod
+    async def run(user_id: int) -> tuple[bool, str, bool]:
+        """
+        抓取並處理發票，回傳 (成功與否, 訊息, 失敗時是否值得重試)
+        帳密錯誤、沒有設定這類重試也不會成功的失敗回傳 False，排程不應該再重試
+        """
         config = EInvoice_Manager.get_config(user_id)
         if not config:
-            return False, "找不到發票載具設定，請先綁定帳號。"
+            return False, "找不到發票載具設定，請先綁定帳號。", False
 
         start_id, end_id = EInvoice_Manager.calculate_fetch_date_range(config.get('last_fetch_date'))
 
         # 🌟 [重要修改] 將 > 改為 >=。如果起點等於終點(代表今天已經抓過了)，就直接跳過！
         if start_id >= end_id:
             print(f"✅ 使用者 {user_id} 的發票資料已是最新，跳過爬蟲抓取。")
-            return True, "發票資料已是最新，無需重新抓取！"
-
-        success, msg = await asyncio.to_thread(
-            InvoicePipeline._run_crawler_sync, 
-            config['phone_number'], 
-            config['password'],
-            start_id,
-            end_id
-        )
-        
-        if not success:
-            return False, msg
+            return True, "發票資料已是最新，無需重新抓取！", False
+
+        # 🌟 每個工作各自一個下載資料夾，多位使用者同時抓取也不會拿錯檔案
+        os.makedirs(DOWNLOAD_ROOT, exist_ok=True)
+        job_dir = tempfile.mkdtemp(prefix=f"{user_id}_", dir=DOWNLOAD_ROOT)
 
         try:
-            processor = InvoiceProcessor(user_id=user_id)
-            await processor.process()
+            success, msg, csv_path, cookies, retryable = await asyncio.to_thread(
+                InvoicePipeline._run_crawler_sync, 
+                config['phone_number'], 
+                config['password'],
+                start_id,
+                end_id,
+                job_dir,
+                config.get('session_cookies')
+            )
             
-            EInvoice_Manager.update_last_fetch_date(user_id, end_id)
-            return True, f"區間 {start_id} ~ {end_id} 的發票抓取與 AI 分類已全數完成！"
-            
-        except Exception as e:
-            print("[InvoicePipeline 處理器錯誤]")
-            traceback.print_exc()
-            return False, "CSV 處理與 AI 分類時發生錯誤。"
\ No newline at end of file
+            if not success:
+                # 登入狀態可能已經壞掉，下次從頭登入
+                EInvoice_Manager.clear_session(user_id)
+                return False, msg, retryable
+
+            if cookies:
+                EInvoice_Manager.save_session(user_id, cookies)
+
+            try:
+                processor = InvoiceProcessor(user_id=user_id)
+                await processor.process(csv_path)
+                
+                EInvoice_Manager.update_last_fetch_date(user_id, end_id)
+                return True, f"區間 {start_id} ~ {end_id} 的發票抓取與 AI 分類已全數完成！", False
+                
+            except Exception as e:
+                print("[InvoicePipeline 處理器錯誤]")
+                traceback.print_exc()
+                return False, "CSV 處理與 AI 分類時發生錯誤。", True
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
\ No newline at end of file
@@ -3,87 +3,185 @@ import os
 import pandas as pd
 import asyncio
 from datetime import datetime
-from cogs.LifeTracker.utils import LifeTracker_Manager, AI_Analyzer
+from cogs.LifeTracker.utils import LifeTracker_Manager, AI_Analyzer, Classify_Memo, Local_Classifier, Invoice_Archive
 from database import SessionLocal
 from database.models import TrackerCategory, TrackerSubCategory
 import time
 class InvoiceProcessor:
     def __init__(self, user_id: int):
         self.user_id = user_id
-        self.download_path = os.path.join("cogs", "LifeTracker", "src", "downloads")
-        
         self.target_category_id = LifeTracker_Manager.get_consumption_category_id(user_id)
 
-    def get_latest_csv(self):
-        """獲取最近下載的發票 CSV 檔案路徑"""
-        files = [f for f in os.listdir(self.download_path) if f.endswith('.csv')]
-        if not files: return None
-        files.sort(key=lambda x: os.path.getmtime(os.path.join(self.download_path, x)), reverse=True)
-        return os.path.join(self.download_path, files[0])
+    @staticmethod
+    def load_items(csv_path: str) -> pd.DataFrame:
+        """
+        讀取發票 CSV 並整理成消費明細表 (C 解析器 + 向量化運算)
+        額外欄位: invoice_line (同一張發票中的第幾行)、record_date (YYYY/MM/DD)、invoice_date (date，去重用)
+        """
+        df = pd.read_csv(csv_path, encoding='utf-8', dtype={'發票號碼': str, '發票日期': str}, on_bad_lines='skip')
+
+        # 檔尾的注釋行在 C 解析器下會變成缺欄位的列，金額轉不成數字的直接丟掉
+        df['消費明細_金額'] = pd.to_numeric(df['消費明細_金額'], errors='coerce')
+        df = df.dropna(subset=['發票號碼', '消費明細_金額'])
+
+        # 在過濾折扣行之前編號，重跑時同一行的序號才會一致
+        df['invoice_line'] = df.groupby(['發票號碼', '發票日期'], sort=False).cumcount()
+        df = df[df['消費明細_金額'] > 0].copy()
+
+        dates = df['發票日期'].str.strip()
+        df['record_date'] = dates.str[:4] + '/' + dates.str[4:6] + '/' + dates.str[6:8]
+        df['invoice_date'] = pd.to_datetime(dates, format='%Y%m%d', errors='coerce').dt.date
+        return df
+
+    @staticmethod
+    def archive_lines(df: pd.DataFrame) -> list:
+        """把 load_items 的結果轉成 Invoice_Archive 的明細格式"""
+        amounts = [int(a) if float(a).is_integer() else a for a in df['消費明細_金額'].tolist()]
+        return [
+            list(row) for row in zip(
+                df['發票號碼'].tolist(), df['invoice_line'].tolist(), df['record_date'].tolist(),
+                df['商店店名'].fillna('').astype(str).tolist(), df['消費明細_品名'].tolist(), amounts
+            )
+        ]
+
+    def _get_subcat_map(self) -> dict:
+        """消費分類底下的標籤 {名稱: ID}"""
+        with SessionLocal() as db:
+            subcats = db.query(TrackerSubCategory).filter_by(category_id=self.target_category_id).all()
+            return {s.name: s.id for s in subcats}
+
+    async def _classify(self, item_names: list, subcat_map: dict) -> dict:
+        """
+        品名分類：先查分類記憶，再用本地分類器，兩者都沒把握的品名才批次交給 AI (每 CLASSIFY_BATCH_SIZE 筆一次請求)
+        回傳: {正規化品名: subcategory_id 或 None(其他)}
+        """
+        subcat_names = list(subcat_map.keys())
+        keys = [Classify_Memo.normalize(name) for name in item_names]
+        memo = await asyncio.to_thread(Classify_Memo.lookup, self.user_id, keys)
+
+        unknown = {}
+        for key, item_name in zip(keys, item_names):
+            if key and key not in memo:
+                unknown.setdefault(key, item_name)
+
+        if unknown:
+            local_tags = await asyncio.to_thread(
+                Local_Classifier.classify_many, self.target_category_id, list(unknown.values()), subcat_names
+            )
+            for key, tag in zip(list(unknown), local_tags):
+                # 「其他」代表現有標籤都不適合，標籤一變就不準了，這種交給 AI 判斷
+                if tag is not None and tag in subcat_map:
+                    memo[key] = subcat_map.get(tag)
+                    del unknown[key]
+        print(f"🔍 {len(item_names)} 筆消費明細，{len(unknown)} 個品名交給 AI 分類...")
+
+        if unknown:
+            ai_tags = await AI_Analyzer.classify_consumption_batch(list(unknown.values()), subcat_names)
+            learned = {key: subcat_map.get(tag) for key, tag in zip(unknown, ai_tags)}
+            await asyncio.to_thread(Classify_Memo.remember, self.user_id, learned)
+            memo.update(learned)
+        return memo
 
-    async def process(self):
+    async def process(self, csv_path: str):
+        """匯入爬蟲下載的發票 CSV (csv_path 為 None 代表該區間沒有發票)"""
         if not self.target_category_id:
             print(f"❌ 找不到 User({self.user_id}) 的「消費」分類，停止匯入。")
             return
 
-        csv_path = self.get_latest_csv()
-        if not csv_path:
+        if not csv_path or not os.path.exists(csv_path):
             print("📅 找不到任何 CSV 檔案。")
             return
 
         print(f"🚀 開始處理發票檔案: {csv_path} (對應分類 ID: {self.target_category_id})")
         
-        # 1. 讀取 CSV (跳過最後兩行注釋)
+        # 1. 讀取 CSV
         try:
-            df = pd.read_csv(csv_path, skipfooter=2, engine='python', encoding='utf-8')
+            df = self.load_items(csv_path)
         except Exception as e:
             print(f"❌ CSV 讀取失敗: {e}")
             return
 
-        # 2. 取得該分類下所有的子分類標籤
-        with SessionLocal() as db:
-            subcats = db.query(TrackerSubCategory).filter_by(category_id=self.target_category_id).all()
-            subcat_map = {s.name: s.id for s in subcats} 
-            subcat_names = list(subcat_map.keys())
-
-        # 3. 逐行處理消費明細
-        for index, row in df.iterrows():
-            item_name = row['消費明細_品名']
-            amount = row['消費明細_金額']
-            date_raw = str(row['發票日期']) 
-            
-            if amount <= 0: continue 
-
-            record_date = f"{date_raw[:4]}/{date_raw[4:6]}/{date_raw[6:8]}"
-            print(f"🔍 正在分類: {item_name} (${amount})...")
-
-            ai_tag = await AI_Analyzer.classify_consumption(item_name, subcat_names)
-            target_subcat_id = subcat_map.get(ai_tag)
-            
-            print(f"🤖 AI 建議標籤: [{ai_tag}]")
-
-            # 5. 寫入 LifeTracker 資料庫
-            values_dict = {"金額": amount}
-            note = item_name
-            
-            success, err = LifeTracker_Manager.add_life_record(
-                user_id=self.user_id,
-                category_id=self.target_category_id,
-                subcat_id=target_subcat_id,
-                values_dict=values_dict,
-                note=note,
-                record_time_str=record_date
+        # 2. 封存原始明細 (之後新增或修改標籤時，不必重新爬取就能重新分類)
+        try:
+            archived = await asyncio.to_thread(Invoice_Archive.store, self.user_id, self.archive_lines(df))
+            print(f"🗄️ 已封存 {archived} 筆新的發票明細。")
+        except Exception as e:
+            print(f"⚠️ 發票明細封存失敗: {e}")
+
+        subcat_map = self._get_subcat_map()
+
+        # 3. 整理消費明細，已經匯入過的發票明細直接略過 (不必再分類)
+        imported = await asyncio.to_thread(
+            LifeTracker_Manager.get_imported_invoice_lines, self.user_id, df['發票號碼'].unique().tolist()
+        )
+        items = [
+            (number, invoice_date, line, name, int(amount) if float(amount).is_integer() else amount, record_date)
+            for number, invoice_date, line, name, amount, record_date in zip(
+                df['發票號碼'].tolist(), df['invoice_date'].tolist(), df['invoice_line'].tolist(),
+                df['消費明細_品名'].tolist(), df['消費明細_金額'].tolist(), df['record_date'].tolist()
             )
+            if (number, invoice_date, line) not in imported
+        ]
+        if len(df) > len(items):
+            print(f"⏭️ {len(df) - len(items)} 筆明細先前已匯入，略過。")
+
+        # 4. 先查分類記憶，再用本地分類器，兩者都沒把握的品名才批次交給 AI
+        keys = [Classify_Memo.normalize(item[3]) for item in items]
+        memo = await self._classify([item[3] for item in items], subcat_map)
 
-            if success:
-                print(f"✅ 成功記錄: {item_name}")
-            else:
-                print(f"❌ 記錄失敗: {err}")
-            await asyncio.sleep(1)
+        subcat_names_by_id = {v: k for k, v in subcat_map.items()}
+        rows = []
+        for key, (number, invoice_date, line, item_name, amount, record_date) in zip(keys, items):
+            subcat_id = memo.get(key)
+            print(f"🏷️ {item_name} (${amount}) → [{subcat_names_by_id.get(subcat_id, '其他')}]")
+            rows.append({
+                "subcat_id": subcat_id if subcat_id in subcat_names_by_id else None,
+                "values": {"金額": amount},
+                "note": item_name,
+                "record_time_str": record_date,
+                "invoice_number": number,
+                "invoice_date": invoice_date,
+                "invoice_line": line,
+            })
+
+        # 5. 批次寫入 LifeTracker 資料庫 (單一交易，丟到執行緒避免卡住事件迴圈)
+        if rows:
+            inserted, errors = await asyncio.to_thread(
+                LifeTracker_Manager.add_life_records_bulk,
+                self.user_id, self.target_category_id, rows
+            )
+            print(f"✅ 成功記錄 {inserted}/{len(rows)} 筆")
+            for index, err in errors:
+                print(f"❌ 記錄失敗 ({rows[index]['note']}): {err}")
         print("🏁 所有發票資料處理完畢！")
 
         try:
             os.remove(csv_path)
             print(f"🗑️ 已成功刪除暫存檔案: {os.path.basename(csv_path)}")
         except Exception as e:
-            print(f"⚠️ 無法刪除檔案 {csv_path}: {e}")
\ No newline at end of file
+            print(f"⚠️ 無法刪除檔案 {csv_path}: {e}")
+
+    async def reclassify(self) -> int:
+        """
+        用封存的發票明細重新分類 (新增或修改標籤後由背景工作佇列執行，不必重新爬取)
+        分類流程與匯入相同；只更新標籤有變動的紀錄，回傳更新筆數
+        """
+        if not self.target_category_id:
+            return 0
+
+        lines = await asyncio.to_thread(Invoice_Archive.load, self.user_id)
+        if not lines:
+            return 0
+
+        print(f"♻️ User({self.user_id}) 重新分類 {len(lines)} 筆封存的發票明細...")
+        names = [line[4] for line in lines]
+        memo = await self._classify(names, self._get_subcat_map())
+        assignments = {
+            (line[0], datetime.strptime(line[2], "%Y/%m/%d").date(), line[1]): memo.get(Classify_Memo.normalize(line[4]))
+            for line in lines
+        }
+        changed = await asyncio.to_thread(
+            LifeTracker_Manager.reclassify_invoice_records, self.user_id, self.target_category_id, assignments
+        )
+        print(f"✅ User({self.user_id}) 重新分類完成，{changed} 筆紀錄的標籤有變動。")
+        return changed
@@ -9,7 +9,7 @@ class LogRecordBtn(SafeButton):
         self.category_id = category_id
 
     async def do_action(self, interaction: discord.Interaction):
-        cat_info, subcats_info = LifeTracker_Manager.get_category_details(self.category_id)
+        cat_info, subcats_info = await LifeTracker_Manager.get_category_details(self.category_id)
         if not cat_info:
             await interaction.followup.send("❌ 發生錯誤：找不到該分類資訊", ephemeral=True)
             return
@@ -2,19 +2,21 @@ import discord
 from cogs.BasicDiscordObject import SafeButton
 
 class PageBtn(SafeButton):
-    def __init__(self, bot, category_id, target_page, field_index=0, show_list=True, label=None, emoji=None, row=1):
+    def __init__(self, bot, category_id, target_page, field_index=0, show_list=True, label=None, emoji=None, row=1, cursors=None):
         super().__init__(label=label, style=discord.ButtonStyle.secondary, emoji=emoji, row=row)
         self.bot = bot
         self.category_id = category_id
         self.target_page = target_page
         self.field_index = field_index
         self.show_list = show_list
+        self.cursors = cursors  # 目標頁之前每一頁的起點 (created_at, id)，翻頁時直接從索引定位
 
     async def do_action(self, interaction: discord.Interaction):
         from cogs.LifeTracker.ui.View.CategoryDetailView import CategoryDetailView
         
         embed, view, chart_file = await CategoryDetailView.create_ui(
-            self.bot, self.category_id, self.target_page, field_index=self.field_index, show_list=self.show_list
+            self.bot, self.category_id, self.target_page, field_index=self.field_index, show_list=self.show_list,
+            cursors=self.cursors
         )
 
         if chart_file:
@@ -1,6 +1,7 @@
 # cogs/LifeTracker/ui/Button/SubmitRecordBtn.py
+import asyncio
 import discord
-from cogs.LifeTracker.utils import LifeTracker_Manager
+from cogs.LifeTracker.utils import LifeTracker_Manager, Classify_Memo
 from cogs.BasicDiscordObject import SafeButton
 
 class SubmitRecordBtn(SafeButton): 
@@ -25,6 +26,15 @@ class SubmitRecordBtn(SafeButton):
                 
                 return await interaction.followup.send(f"⚠️ 儲存失敗：{error_msg}", ephemeral=True)
 
+            # 手動記帳的品名與標籤也記下來，之後匯入發票時優先採用
+            await asyncio.to_thread(
+                Classify_Memo.learn_manual,
+                interaction.user.id,
+                self.parent_view.category_id,
+                self.parent_view.selected_subcat_id,
+                self.parent_view.note
+            )
+
             from cogs.LifeTracker.ui.View.CategoryDetailView import CategoryDetailView
             
             embed, view, chart_file = await CategoryDetailView.create_ui(
@@ -2,6 +2,7 @@
 import discord
 from discord import ui
 from cogs.LifeTracker.utils import LifeTracker_Manager
+from cogs import job_queue
 from cogs.BasicDiscordObject import ValidatedModal 
 from cogs.LifeTracker.LifeTracker_config import (
     MAX_SUBCATS,
@@ -30,6 +31,11 @@ class AddSubCategoryModal(ValidatedModal):
         
         if not success:
             return error_msg
+
+        # 🌟 消費分類的標籤有異動：用封存的發票明細在背景重新分類 (已經在排隊就不重複放)
+        if self.category_id == LifeTracker_Manager.get_consumption_category_id(interaction.user.id):
+            uid = interaction.user.id
+            await job_queue.enqueue("invoice_reclassify", {"user_id": uid}, dedupe_key=f"invoice_reclassify:{uid}", priority=10)
         return None
 
     async def on_success(self, interaction: discord.Interaction):
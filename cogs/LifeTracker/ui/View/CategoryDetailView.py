@@ -13,7 +13,8 @@ from cogs.BasicDiscordObject import LockableView
 class CategoryDetailView(LockableView):
     def __init__(self, bot, category_id: int, page: int = 0, field_index: int = 0, 
                  fields_count: int = 1, show_list: bool = False, range_days: int = 7, 
-                 options_list: list = None, total_pages: int = 0, cat_name: str = ""):
+                 options_list: list = None, total_pages: int = 0, cat_name: str = "",
+                 cursors: list = None, next_cursor: tuple = None):
         super().__init__(timeout=None)
         self.bot = bot
         self.category_id = category_id
@@ -37,22 +38,29 @@ class CategoryDetailView(LockableView):
             if self.cat_name == "消費":
                 self.add_item(EInvoicePlatformBtn(bot, category_id, row=2))
         else:
+            # cursors[i] 為第 i 頁的起點，長度不符 (例如舊介面) 時交給 OFFSET 處理
+            has_cursors = cursors is not None and len(cursors) == page + 1
             if page > 0:
-                self.add_item(PageBtn(bot, category_id, page - 1, field_index, show_list, emoji="◀️", row=2))
+                self.add_item(PageBtn(bot, category_id, page - 1, field_index, show_list, emoji="◀️", row=2,
+                                      cursors=cursors[:-1] if has_cursors else None))
             
             if page + 1 < total_pages:
-                self.add_item(PageBtn(bot, category_id, page + 1, field_index, show_list, emoji="▶️", row=2))
+                self.add_item(PageBtn(bot, category_id, page + 1, field_index, show_list, emoji="▶️", row=2,
+                                      cursors=cursors + [next_cursor] if has_cursors and next_cursor else None))
 
         self.add_item(BackToLifeDashboardBtn(bot, row=2))
 
 
     @staticmethod
     async def create_ui(bot, category_id: int, page: int = 0, field_index: int = 0, 
-                        show_list: bool = False, range_days: int = None):
+                        show_list: bool = False, range_days: int = None, cursors: list = None):
         try:
-            cat_info, subcats_info = LifeTracker_Manager.get_category_details(category_id)
+            cat_info, subcats_info = await LifeTracker_Manager.get_category_details(category_id)
             cat_name = cat_info['name']
             total_pages = 0
+            next_cursor = None
+            if cursors is None and page == 0:
+                cursors = [None]
             if range_days is not None:
                 current_days = range_days
             else:
@@ -82,16 +90,18 @@ class CategoryDetailView(LockableView):
                 else:
                     embed.add_field(name="🪄 AI 分析服務", value="目前尚無分析紀錄，將在下週一自動產生。", inline=False)
 
-                stats_data = LifeTracker_Manager.get_subcat_stats(category_id, target_field, range_days=current_days)
+                stats_data = await LifeTracker_Manager.get_subcat_stats(category_id, target_field, range_days=current_days)
                 if stats_data:
-                    chart_file = generate_donut_chart(cat_name, stats_data, target_field)
+                    chart_file = await generate_donut_chart(cat_name, stats_data, target_field,
+                                                            category_id=category_id, range_days=current_days)
                     if chart_file:
                         embed.set_image(url=f"attachment://{chart_file.filename}")
                 else:
                     embed.add_field(name="目前暫無數據", value=f"在過去 {current_days} 天內沒有紀錄。", inline=False)
             else:
-                records, total_pages = LifeTracker_Manager.get_recent_records(
-                    category_id, page=page, limit=10, range_days=current_days
+                cursor = cursors[page] if cursors is not None and len(cursors) == page + 1 else None
+                records, total_pages, next_cursor = await LifeTracker_Manager.get_recent_records(
+                    category_id, page=page, limit=10, range_days=current_days, cursor=cursor
                 )
                 
                 if not records:
@@ -105,7 +115,8 @@ class CategoryDetailView(LockableView):
                             inline=False
                         )
             
-            view = CategoryDetailView(bot, category_id, page, field_index, fields_count, show_list, current_days, options_list, total_pages, cat_name)
+            view = CategoryDetailView(bot, category_id, page, field_index, fields_count, show_list, current_days, options_list, total_pages, cat_name,
+                                      cursors, next_cursor)
             return embed, view, chart_file
 
         except Exception as e:
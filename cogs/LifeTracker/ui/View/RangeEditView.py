@@ -18,7 +18,7 @@ class RangeEditView(LockableView):
 
     @staticmethod
     async def create_ui(bot, category_id):
-        cat_info, _ = LifeTracker_Manager.get_category_details(category_id)
+        cat_info, _ = await LifeTracker_Manager.get_category_details(category_id)
         options_list = cat_info.get('range_options') or [7, 30, 180, 365]
 
         embed = discord.Embed(
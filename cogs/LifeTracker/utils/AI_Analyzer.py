@@ -1,12 +1,35 @@
 # cogs\LifeTracker\utils\AI_Analyzer.py
+import asyncio
+import json
+import re
+import time
 from openai import AsyncOpenAI
 from config import OPENROUTER_API_KEY
+from cogs.LifeTracker.LifeTracker_config import AI_REQUESTS_PER_MINUTE, CLASSIFY_BATCH_SIZE
 
 client = AsyncOpenAI(
     base_url="https://openrouter.ai/api/v1",
     api_key=OPENROUTER_API_KEY,
 )
 
+class RateLimiter:
+    """平均分配請求的速率限制器：同時有多個任務時，依序排到下一個可用的時間點"""
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# 所有 LLM 請求共用同一個限制器，避免並行任務一起打爆 OpenRouter 的額度
+rate_limiter = RateLimiter(AI_REQUESTS_PER_MINUTE)
+
 class AI_Analyzer:
     SUMMARY_MODEL_ID = "nvidia/nemotron-3-super-120b-a12b:free"
     
@@ -32,6 +55,7 @@ class AI_Analyzer:
         """
         
         try:
+            await rate_limiter.wait()
             response = await client.chat.completions.create(
                 model=AI_Analyzer.SUMMARY_MODEL_ID,
                 messages=[
@@ -74,6 +98,7 @@ class AI_Analyzer:
         """
         
         try:
+            await rate_limiter.wait()
             response = await client.chat.completions.create(
                 model=AI_Analyzer.CLASSIFY_MODEL_ID,
                 messages=[{"role": "user", "content": prompt}],
@@ -90,4 +115,124 @@ class AI_Analyzer:
             return "其他"
         except Exception as e:
             print(f"❌ AI 分類失敗: {e}")
-            return "其他"
\ No newline at end of file
+            return "其他"
+
+    @staticmethod
+    def _parse_batch_result(content: str, count: int) -> dict:
+        """
+        解析批次分類的 JSON 回覆：{"1": "標籤", "2": "標籤", ...}
+        模型偶爾會包上 ```json 或多講幾句，只取第一個 {...} 區塊；格式不對的項目直接略過
+        """
+        match = re.search(r"\{.*\}", content or "", re.S)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+
+        results = {}
+        for key, tag in data.items():
+            try:
+                index = int(key) - 1
+            except (ValueError, TypeError):
+                continue
+            if 0 <= index < count and isinstance(tag, str):
+                results[index] = tag.strip()
+        return results
+
+    @staticmethod
+    async def _request_chunk(item_names: list, subcat_list: list) -> dict:
+        """送出一次批次分類請求，回傳 {索引: 標籤}；請求失敗或回覆完全無法解析時回傳 None"""
+        numbered = "\n".join(f"{i}. {name}" for i, name in enumerate(item_names, start=1))
+        prompt = f"""
+        你是一位消費紀錄分類專家。
+        以下是使用者購買的品項 (已編號)：
+        {numbered}
+        
+        請替每個品項從以下現有的標籤清單中選擇一個最適合的分類：
+        清單：{", ".join(subcat_list)}
+        如果真的都不適合，請填「其他」。
+        
+        請只回覆一個 JSON 物件，key 為品項編號、value 為標籤名稱，例如：{{"1": "飲食", "2": "其他"}}
+        不要有任何多餘的解釋。
+        """
+
+        try:
+            await rate_limiter.wait()
+            response = await client.chat.completions.create(
+                model=AI_Analyzer.CLASSIFY_MODEL_ID,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0
+            )
+        except Exception as e:
+            print(f"❌ AI 批次分類失敗 ({len(item_names)} 筆): {e}")
+            return None
+
+        parsed = {}
+        if hasattr(response, 'choices') and response.choices:
+            parsed = AI_Analyzer._parse_batch_result(response.choices[0].message.content, len(item_names))
+        if not parsed:
+            print(f"❌ AI 批次分類回覆無法解析 ({len(item_names)} 筆)")
+            return None
+        return parsed
+
+    @staticmethod
+    async def _classify_chunk(item_names: list, subcat_list: list, retry: bool = True) -> list:
+        """
+        一次請求分類一批品項
+        整批失敗 (逾時、限流、服務中斷) 時拆成兩半各重試一次，仍失敗的歸為「其他」，不逐筆補問；
+        只有回覆正常但缺漏的項目才逐筆補問
+        """
+        parsed = await AI_Analyzer._request_chunk(item_names, subcat_list)
+        if parsed is None:
+            if not retry:
+                return ["其他"] * len(item_names)
+            half = (len(item_names) + 1) // 2
+            parts = [item_names[:half], item_names[half:]] if len(item_names) > 1 else [item_names]
+            results = await asyncio.gather(
+                *(AI_Analyzer._classify_chunk(part, subcat_list, retry=False) for part in parts)
+            )
+            return [tag for part in results for tag in part]
+
+        results = []
+        missing = 0
+        for i, name in enumerate(item_names):
+            tag = parsed.get(i)
+            if tag is None:
+                # 這一筆沒拿到結果：退回單筆分類
+                missing += 1
+                tag = await AI_Analyzer.classify_consumption(name, subcat_list)
+            results.append(tag if tag in subcat_list else "其他")
+
+        if missing:
+            print(f"⚠️ 批次分類有 {missing}/{len(item_names)} 筆需要逐筆補問")
+        return results
+
+    @staticmethod
+    async def classify_consumption_batch(item_names: list, subcat_list: list, batch_size: int = None) -> list:
+        """
+        批次消費分類：每 batch_size 個品項只發一次請求
+        回傳與 item_names 等長、順序相同的標籤列表
+        """
+        if not item_names:
+            return []
+        if not subcat_list:
+            return ["其他"] * len(item_names)
+
+        batch_size = batch_size or CLASSIFY_BATCH_SIZE
+
+        # 同一個品名只問一次 (便利商店的發票常常重複買一樣的東西)
+        unique_names = [name for name in dict.fromkeys(str(n).strip() for n in item_names) if name]
+        chunks = [unique_names[i:i + batch_size] for i in range(0, len(unique_names), batch_size)]
+        chunk_results = await asyncio.gather(
+            *(AI_Analyzer._classify_chunk(chunk, subcat_list) for chunk in chunks)
+        )
+
+        tag_map = {}
+        for chunk, tags in zip(chunks, chunk_results):
+            tag_map.update(zip(chunk, tags))
+
+        return [tag_map.get(str(n).strip(), "其他") for n in item_names]
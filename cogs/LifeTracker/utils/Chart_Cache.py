@@ -0,0 +1,71 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from cogs.LifeTracker.LifeTracker_config import CHART_CACHE_MAX_BYTES, CHART_CACHE_MAX_ENTRIES
+
+class Chart_Cache:
+    """
+    已渲染圖表的 LRU 快取 (以內容定址)
+    key = (category_id, 欄位, 區間天數, 統計內容的雜湊)，資料沒變就直接回傳上次的 PNG
+    """
+    _entries: OrderedDict = OrderedDict()
+    _lock = threading.Lock()  # 批次寫入在執行緒中呼叫 invalidate，與事件迴圈上的 get / put 同時進行
+    _size = 0
+    _stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(category_id: int, target_field: str, range_days: int, category_name: str, stats_data: dict) -> tuple:
+        payload = json.dumps([category_name, stats_data], ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return (category_id, target_field, range_days, digest)
+
+    @classmethod
+    def get(cls, key: tuple):
+        with cls._lock:
+            png = cls._entries.get(key)
+            if png is None:
+                cls._stats["misses"] += 1
+                return None
+            cls._entries.move_to_end(key)
+            cls._stats["hits"] += 1
+            return png
+
+    @classmethod
+    def put(cls, key: tuple, png: bytes):
+        if len(png) > CHART_CACHE_MAX_BYTES:
+            return
+        with cls._lock:
+            if key in cls._entries:
+                cls._size -= len(cls._entries.pop(key))
+
+            cls._entries[key] = png
+            cls._size += len(png)
+
+            # 超過記憶體上限或筆數上限時，從最久沒用的開始淘汰
+            while cls._size > CHART_CACHE_MAX_BYTES or len(cls._entries) > CHART_CACHE_MAX_ENTRIES:
+                _, old = cls._entries.popitem(last=False)
+                cls._size -= len(old)
+                cls._stats["evictions"] += 1
+
+    @classmethod
+    def invalidate(cls, category_id: int = None):
+        """紀錄或標籤變動後，丟掉該分類 (或全部) 的圖表"""
+        with cls._lock:
+            for key in [k for k in cls._entries if category_id is None or k[0] == category_id]:
+                cls._size -= len(cls._entries.pop(key))
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            hits, misses = cls._stats["hits"], cls._stats["misses"]
+            evictions, entries, size = cls._stats["evictions"], len(cls._entries), cls._size
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from datetime import datetime
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from database import SessionLocal
+from database.models import ConsumptionMemo, TrackerCategory
+
+class Classify_Memo:
+    """
+    每位使用者的「品名 → 標籤」分類記憶
+    發票匯入時先查記憶，查不到的才送 AI；使用者手動記帳時會覆蓋 AI 的判斷
+    """
+    _stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def normalize(name) -> str:
+        """全形轉半形、忽略大小寫與空白，讓「統一 茶裏王」和「統一茶裏王」視為同一個品項"""
+        if name is None:
+            return ""
+        text = unicodedata.normalize("NFKC", str(name)).casefold()
+        return re.sub(r"\s+", "", text)
+
+    @classmethod
+    def lookup(cls, user_id: int, names: list) -> dict:
+        """
+        查詢多個品名的分類記憶 (一次查詢)
+        回傳: {normalized_name: subcategory_id 或 None(其他)}，沒有記憶的品名不會出現在結果中
+        """
+        keys = {cls.normalize(n) for n in names} - {""}
+        if not keys:
+            return {}
+
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(ConsumptionMemo.normalized_name, ConsumptionMemo.subcategory_id).where(
+                    ConsumptionMemo.user_id == user_id,
+                    ConsumptionMemo.normalized_name.in_(keys)
+                )
+            ).all()
+            found = {name: subcat_id for name, subcat_id in rows}
+
+            if found:
+                db.execute(
+                    update(ConsumptionMemo)
+                    .where(ConsumptionMemo.user_id == user_id, ConsumptionMemo.normalized_name.in_(found.keys()))
+                    .values(hit_count=ConsumptionMemo.hit_count + 1)
+                )
+                db.commit()
+
+        cls._stats["hits"] += len(found)
+        cls._stats["misses"] += len(keys) - len(found)
+        return found
+
+    @classmethod
+    def remember(cls, user_id: int, mapping: dict, source: str = "ai"):
+        """
+        寫入分類記憶 {品名: subcategory_id 或 None}
+        AI 的結果不會覆蓋使用者手動指定的記憶
+        """
+        values = [
+            {"user_id": user_id, "normalized_name": key, "subcategory_id": subcat_id,
+             "source": source, "hit_count": 0, "updated_at": datetime.now()}
+            for key, subcat_id in ((cls.normalize(n), s) for n, s in mapping.items()) if key
+        ]
+        if not values:
+            return
+
+        stmt = pg_insert(ConsumptionMemo).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "normalized_name"],
+            set_={
+                "subcategory_id": stmt.excluded.subcategory_id,
+                "source": stmt.excluded.source,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=or_(ConsumptionMemo.source != "manual", stmt.excluded.source == "manual")
+        )
+        with SessionLocal() as db:
+            try:
+                db.execute(stmt)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[Error] 寫入分類記憶失敗: {e}")
+
+    @classmethod
+    def learn_manual(cls, user_id: int, category_id: int, subcat_id, note: str):
+        """使用者在「消費」分類手動記帳時，以使用者選的標籤為準 (之後同品名的發票都照這個分類)"""
+        if not note:
+            return
+        with SessionLocal() as db:
+            cat = db.get(TrackerCategory, category_id)
+            if not cat or cat.user_id != user_id or cat.name != "消費":
+                return
+        cls.remember(user_id, {note: subcat_id}, source="manual")
+
+    @classmethod
+    def forget_unmatched(cls, user_id: int):
+        """新增標籤後，之前被 AI 歸為「其他」的品名可能有更適合的標籤了，清掉讓它們重新分類"""
+        with SessionLocal() as db:
+            db.execute(
+                delete(ConsumptionMemo).where(
+                    ConsumptionMemo.user_id == user_id,
+                    ConsumptionMemo.subcategory_id.is_(None),
+                    ConsumptionMemo.source == "ai"
+                )
+            )
+            db.commit()
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        hits, misses = cls._stats["hits"], cls._stats["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
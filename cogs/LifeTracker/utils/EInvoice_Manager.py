@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 from database import SessionLocal
 from database.models import EInvoiceConfig
@@ -17,6 +18,10 @@ class EInvoice_Manager:
                     config = EInvoiceConfig(user_id=user_id)
                     db.add(config)
                 
+                # 帳號換了，舊帳號的登入狀態不能再用
+                if config.phone_number != phone:
+                    config.session_cookies = None
+                    config.session_saved_at = None
                 config.phone_number = phone
                 config.password = encrypted_password
                 db.commit()
@@ -38,7 +43,8 @@ class EInvoice_Manager:
                 return {
                     "phone_number": config.phone_number,
                     "password": decrypted_password,
-                    "last_fetch_date": config.last_fetch_date
+                    "last_fetch_date": config.last_fetch_date,
+                    "session_cookies": EInvoice_Manager._decode_session(config.session_cookies)
                 }
             except Exception as e:
                 print(f"❌ 密碼解密失敗 (可能是金鑰被更換過): {e}")
@@ -83,4 +89,48 @@ class EInvoice_Manager:
                     return True
         except Exception as e:
             print(f"❌ 更新最後擷取日期失敗: {e}")
-        return False
\ No newline at end of file
+        return False
+
+    # Selenium 的 add_cookie 只接受這些欄位
+    _COOKIE_KEYS = ("name", "value", "domain", "path", "expiry", "secure", "httpOnly", "sameSite")
+
+    @staticmethod
+    def _decode_session(encrypted: str):
+        if not encrypted:
+            return None
+        try:
+            return json.loads(Crypto_Helper.decrypt(encrypted))
+        except Exception as e:
+            print(f"⚠️ 登入狀態解密失敗，將重新登入: {e}")
+            return None
+
+    @staticmethod
+    def save_session(user_id: int, cookies: list) -> bool:
+        """加密儲存登入後的 cookie，下次抓取時先嘗試沿用"""
+        try:
+            cleaned = [{k: c[k] for k in EInvoice_Manager._COOKIE_KEYS if k in c} for c in cookies]
+            with SessionLocal() as db:
+                config = db.query(EInvoiceConfig).filter_by(user_id=user_id).first()
+                if config:
+                    config.session_cookies = Crypto_Helper.encrypt(json.dumps(cleaned))
+                    config.session_saved_at = datetime.now()
+                    db.commit()
+                    return True
+        except Exception as e:
+            print(f"❌ 儲存登入狀態失敗: {e}")
+        return False
+
+    @staticmethod
+    def clear_session(user_id: int) -> bool:
+        """登入狀態失效或登入失敗時清除"""
+        try:
+            with SessionLocal() as db:
+                config = db.query(EInvoiceConfig).filter_by(user_id=user_id).first()
+                if config and config.session_cookies:
+                    config.session_cookies = None
+                    config.session_saved_at = None
+                    db.commit()
+                return True
+        except Exception as e:
+            print(f"❌ 清除登入狀態失敗: {e}")
+        return False
@@ -0,0 +1,105 @@
+import json
+import zlib
+from datetime import date
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from database import SessionLocal
+from database.models import InvoiceArchive
+
+class Invoice_Archive:
+    """
+    發票明細的壓縮封存
+    每位使用者每個月存成一列：明細列表轉成 JSON 後用 zlib 壓縮 (同一家店、同樣品名重複很多，壓縮率很高)
+    明細格式: [發票號碼, 明細序號, 日期(YYYY/MM/DD), 店名, 品名, 金額]
+    """
+
+    @staticmethod
+    def pack(lines: list) -> bytes:
+        raw = json.dumps(lines, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(raw, 9)
+
+    @staticmethod
+    def unpack(payload: bytes) -> list:
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    @staticmethod
+    def _month_of(record_date: str) -> date:
+        year, month = record_date.split("/")[:2]
+        return date(int(year), int(month), 1)
+
+    @staticmethod
+    def store(user_id: int, lines: list) -> int:
+        """
+        把明細併入封存 (已存在的發票號碼 + 序號會略過)，同一個交易內完成
+        回傳: 新增的明細數
+        """
+        by_month = {}
+        for line in lines:
+            by_month.setdefault(Invoice_Archive._month_of(line[2]), []).append(list(line))
+        if not by_month:
+            return 0
+
+        with SessionLocal() as db:
+            # 鎖住既有的月份，避免同時匯入時互相覆蓋
+            existing = {
+                row.month: Invoice_Archive.unpack(row.payload)
+                for row in db.execute(
+                    select(InvoiceArchive.month, InvoiceArchive.payload)
+                    .where(InvoiceArchive.user_id == user_id, InvoiceArchive.month.in_(by_month))
+                    .with_for_update()
+                )
+            }
+
+            added, values = 0, []
+            for month, new_lines in by_month.items():
+                merged = existing.get(month, [])
+                seen = {(l[0], l[1]) for l in merged}
+                fresh = 0
+                for line in new_lines:
+                    if (line[0], line[1]) not in seen:
+                        seen.add((line[0], line[1]))
+                        merged.append(line)
+                        fresh += 1
+                if not fresh:
+                    continue
+                added += fresh
+                values.append({
+                    "user_id": user_id,
+                    "month": month,
+                    "line_count": len(merged),
+                    "payload": Invoice_Archive.pack(merged),
+                })
+
+            if values:
+                stmt = pg_insert(InvoiceArchive).values(values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["user_id", "month"],
+                    set_={"line_count": stmt.excluded.line_count, "payload": stmt.excluded.payload, "updated_at": func.now()}
+                )
+                db.execute(stmt)
+            db.commit()
+            return added
+
+    @staticmethod
+    def load(user_id: int, since: date = None) -> list:
+        """讀出使用者封存的所有明細 (可指定起始月份)"""
+        query = select(InvoiceArchive.payload).where(InvoiceArchive.user_id == user_id)
+        if since is not None:
+            query = query.where(InvoiceArchive.month >= since.replace(day=1))
+        with SessionLocal() as db:
+            payloads = db.scalars(query.order_by(InvoiceArchive.month)).all()
+
+        lines = []
+        for payload in payloads:
+            lines += Invoice_Archive.unpack(payload)
+        return lines
+
+    @staticmethod
+    def get_stats(user_id: int) -> dict:
+        with SessionLocal() as db:
+            months, lines, size = db.execute(
+                select(func.count(), func.coalesce(func.sum(InvoiceArchive.line_count), 0),
+                       func.coalesce(func.sum(func.length(InvoiceArchive.payload)), 0))
+                .where(InvoiceArchive.user_id == user_id)
+            ).one()
+        return {"months": months, "lines": lines, "compressed_bytes": size}
@@ -1,9 +1,16 @@
 from database.db import SessionLocal
-from database.models import User, TrackerCategory, TrackerSubCategory, LifeRecord
-from database.db_utils import with_db_decorator
+from database.models import User, TrackerCategory, TrackerSubCategory, LifeRecord, LifeRecordDailyStat
+from database.db_utils import with_db_decorator, with_async_db_decorator, aware_time
+from cogs.LifeTracker.utils.Chart_Cache import Chart_Cache
+from cogs.LifeTracker.utils.Classify_Memo import Classify_Memo
+from cogs.LifeTracker.utils.Local_Classifier import Local_Classifier
+from sqlalchemy import select, func, cast, case, delete, update, true, literal_column, tuple_, Float, JSON, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 from config import TW_TZ
 import math
+import time
 from cogs.LifeTracker.LifeTracker_config import (
     MAX_FIELDS,
     MAX_SUBCATS,
@@ -13,8 +20,25 @@ from cogs.LifeTracker.LifeTracker_config import (
     MAX_DAY_RANGE,
     MIN_DAY_RANGE,
     MAX_TEXT_LENGTH,
-    MAX_INPUT_VALUE
+    MAX_INPUT_VALUE,
+    RECORD_COUNT_TTL
 )
+
+# 彙總時只計入可轉成數字的欄位值
+NUMERIC_PATTERN = r"^\s*[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*$"
+
+# 紀錄列表的總筆數快取：(category_id, range_days) -> (筆數, 寫入時間)
+_record_count_cache: dict = {}
+
+
+def invalidate_record_count(category_id: int = None):
+    """新增/刪除紀錄後讓該分類 (或全部) 的總筆數快取失效"""
+    if category_id is None:
+        _record_count_cache.clear()
+        return
+    for key in [k for k in list(_record_count_cache) if k[0] == category_id]:  # 先複製 key，其他執行緒同時寫入也不會出錯
+        _record_count_cache.pop(key, None)
+
 class LifeTracker_Manager:
     
     @staticmethod
@@ -122,8 +146,12 @@ class LifeTracker_Manager:
             cat = db.query(TrackerCategory).filter(TrackerCategory.name == category_name).first()
         
         if cat:
+            deleted_id = cat.id
             db.delete(cat)
             db.commit()
+            invalidate_record_count(deleted_id)
+            Chart_Cache.invalidate(deleted_id)
+            Local_Classifier.invalidate(deleted_id)
             return True
         return False
 
@@ -147,64 +175,155 @@ class LifeTracker_Manager:
         return [c for c in categories if c.name != "消費"]        
 
     @staticmethod
-    def get_category_details(category_id: int):
+    @with_async_db_decorator
+    async def get_category_details(category_id: int, db=None):
         """取得單一分類詳情，包含區間選項與目前預設區間"""
-        with SessionLocal() as db:
-            category = db.query(TrackerCategory).filter(TrackerCategory.id == category_id).first()
-            if not category:
-                return None
-
-            cat_data = {
-                "id": category.id,
-                "name": category.name,
-                "fields": category.fields,
-                "range_options": category.range_options,
-                "current_range": category.current_range,
-                "last_ai_analysis": category.last_ai_analysis,
-                "analysis_updated_at": category.analysis_updated_at
-            }
-            subcats_data = [{"id": s.id, "name": s.name} for s in category.subcategories]
-            
-            return cat_data, subcats_data
+        result = await db.execute(
+            select(TrackerCategory)
+            .options(selectinload(TrackerCategory.subcategories))
+            .where(TrackerCategory.id == category_id)
+        )
+        category = result.scalars().first()
+        if not category:
+            return None
+
+        cat_data = {
+            "id": category.id,
+            "name": category.name,
+            "fields": category.fields,
+            "range_options": category.range_options,
+            "current_range": category.current_range,
+            "last_ai_analysis": category.last_ai_analysis,
+            "analysis_updated_at": category.analysis_updated_at
+        }
+        subcats_data = [{"id": s.id, "name": s.name} for s in category.subcategories]
+        
+        return cat_data, subcats_data
 
     @staticmethod
-    def get_recent_records(category_id: int, page: int = 0, limit: int = 10, range_days: int = None):
-        """取得紀錄與總頁數 (支援時間區間過濾)"""
-        with SessionLocal() as db:
-            from database.models import LifeRecord
-            from datetime import datetime, timedelta
-            from config import TW_TZ
-            
-            query = db.query(LifeRecord).filter(LifeRecord.category_id == category_id)
-            
-            if range_days:
-                start_date = datetime.now(TW_TZ) - timedelta(days=int(range_days))
-                query = query.filter(LifeRecord.created_at >= start_date)
-            
-            total_count = query.count()
-            
-            total_pages = math.ceil(total_count / limit) if total_count > 0 else 0
-            
-            offset = page * limit
-            records = query.order_by(LifeRecord.created_at.desc())\
-                           .offset(offset).limit(limit).all()
-            
-            record_list = []
-            for r in records:
-                record_list.append({
-                    "id": r.id,
-                    "sub_name": r.subcat_name or "其他",
-                    "values": r.values,
-                    "note": r.note,
-                    "created_at": r.created_at.strftime("%Y/%m/%d")
-                })
-            
-            return record_list, total_pages
+    @with_async_db_decorator
+    async def get_recent_records(category_id: int, page: int = 0, limit: int = 10, range_days: int = None, cursor: tuple = None, db=None):
+        """
+        取得紀錄與總頁數 (支援時間區間過濾)
+        cursor 為上一頁最後一筆的 (created_at, id)，有 cursor 時直接從索引定位，不再 OFFSET
+        回傳: (紀錄列表, 總頁數, 下一頁的 cursor)
+        """
+        conditions = [LifeRecord.category_id == category_id]
+        
+        if range_days:
+            start_date = datetime.now(TW_TZ) - timedelta(days=int(range_days))
+            conditions.append(LifeRecord.created_at >= aware_time(start_date))
+        
+        cache_key = (category_id, range_days)
+        cached = _record_count_cache.get(cache_key)
+        if cached and time.monotonic() - cached[1] < RECORD_COUNT_TTL:
+            total_count = cached[0]
+        else:
+            total_count = await db.scalar(select(func.count(LifeRecord.id)).where(*conditions))
+            _record_count_cache[cache_key] = (total_count, time.monotonic())
+        
+        total_pages = math.ceil(total_count / limit) if total_count > 0 else 0
+        
+        query = select(LifeRecord).where(*conditions)
+        if cursor:
+            query = query.where(tuple_(LifeRecord.created_at, LifeRecord.id) < tuple_(*cursor))
+        elif page > 0:
+            # 沒有 cursor (例如直接跳頁) 時退回 OFFSET
+            query = query.offset(page * limit)
+
+        result = await db.execute(
+            query.order_by(LifeRecord.created_at.desc(), LifeRecord.id.desc()).limit(limit)
+        )
+        records = result.scalars().all()
+        
+        record_list = []
+        for r in records:
+            record_list.append({
+                "id": r.id,
+                "sub_name": r.subcat_name or "其他",
+                "values": r.values,
+                "note": r.note,
+                "created_at": r.created_at.strftime("%Y/%m/%d")
+            })
+
+        next_cursor = (records[-1].created_at, records[-1].id) if len(records) == limit else None
+        return record_list, total_pages, next_cursor
         
     @staticmethod
-    def validate_record_data(category_id: int, values_dict: dict, note: str, record_time_str: str):
+    def _apply_daily_stats(db, *conditions, sign: int = 1):
         """
-        專門校驗紀錄數據的合法性 (不涉及寫入)
+        把符合條件的紀錄加進 (sign=1) 或扣出 (sign=-1) 每日彙總表
+        直接在資料庫端 GROUP BY 後 upsert，日期以台灣時間切分
+        """
+        kv = func.json_each_text(
+            case((func.json_typeof(LifeRecord.values) == "object", LifeRecord.values), else_=cast("{}", JSON))
+        ).table_valued("key", "value").lateral("kv")
+
+        name_expr = func.coalesce(func.nullif(LifeRecord.subcat_name, ""), "其他")
+        day_expr = func.date(func.timezone(literal_column("'Asia/Taipei'"), cast(LifeRecord.created_at, DateTime(timezone=True))))
+
+        rows = (
+            select(
+                LifeRecord.category_id, name_expr, day_expr, kv.c.key,
+                func.sum(cast(kv.c.value, Float)) * sign,
+                func.count() * sign
+            )
+            .select_from(LifeRecord).join(kv, true())
+            .where(*conditions, kv.c.value.regexp_match(NUMERIC_PATTERN))
+            .group_by(LifeRecord.category_id, name_expr, day_expr, kv.c.key)
+        )
+
+        stmt = pg_insert(LifeRecordDailyStat).from_select(
+            ["category_id", "subcat_name", "day", "field", "total", "record_count"], rows
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["category_id", "subcat_name", "day", "field"],
+            set_={
+                "total": LifeRecordDailyStat.total + stmt.excluded.total,
+                "record_count": LifeRecordDailyStat.record_count + stmt.excluded.record_count,
+            }
+        )
+        if sign > 0:
+            db.execute(stmt)
+            return
+
+        # 扣除後歸零的彙總列直接刪掉 (只看這次有動到的列，不掃整張表)
+        key_cols = (LifeRecordDailyStat.category_id, LifeRecordDailyStat.subcat_name, LifeRecordDailyStat.day, LifeRecordDailyStat.field)
+        emptied = [
+            tuple(row[:4]) for row in db.execute(stmt.returning(*key_cols, LifeRecordDailyStat.record_count))
+            if row[4] <= 0
+        ]
+        if emptied:
+            db.execute(delete(LifeRecordDailyStat).where(tuple_(*key_cols).in_(emptied)))
+
+    @staticmethod
+    @with_db_decorator
+    def rebuild_daily_stats(category_id: int = None, db=None):
+        """從原始紀錄重建每日彙總 (不指定分類則全部重建)，回傳重建後的彙總筆數"""
+        clear = delete(LifeRecordDailyStat)
+        conditions = []
+        if category_id is not None:
+            clear = clear.where(LifeRecordDailyStat.category_id == category_id)
+            conditions.append(LifeRecord.category_id == category_id)
+
+        try:
+            db.execute(clear)
+            LifeTracker_Manager._apply_daily_stats(db, *conditions)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[Error] 重建每日彙總失敗: {e}")
+            raise
+
+        count_query = select(func.count()).select_from(LifeRecordDailyStat)
+        if category_id is not None:
+            count_query = count_query.where(LifeRecordDailyStat.category_id == category_id)
+        return db.scalar(count_query)
+
+    @staticmethod
+    def _validate_against_fields(fields: list, values_dict: dict, note: str, record_time_str: str):
+        """
+        依分類的數值欄位校驗單筆紀錄 (不查資料庫，給單筆與批次寫入共用)
         回傳: (bool, str_or_none)
         """
         try:
@@ -215,26 +334,40 @@ class LifeTracker_Manager:
         if note and len(note) > MAX_TEXT_LENGTH:
             return False, f"備註太長了，請限制在 {MAX_TEXT_LENGTH} 字內。"
 
+        for f_name in fields:
+            val = values_dict.get(f_name)
+            if val is None or str(val).strip() == "":
+                return False, f"欄位「{f_name}」尚未填寫。"
+            
+            try:
+                num = float(str(val).strip())
+                if num < 0:
+                    return False, f"欄位「{f_name}」不能為負數。"
+                if num > MAX_INPUT_VALUE:
+                    return False, f"欄位「{f_name}」數值過大，最高限制 {MAX_INPUT_VALUE:,}。"
+            except ValueError:
+                return False, f"欄位「{f_name}」必須是有效的數字。"
+
+        return True, None
+
+    @staticmethod
+    def _build_record_time(record_time_str: str, now: datetime) -> datetime:
+        """紀錄日期 + 目前的時分秒 (台灣時間)"""
+        parsed_date = datetime.strptime(record_time_str, "%Y/%m/%d")
+        return parsed_date.replace(hour=now.hour, minute=now.minute, second=now.second, tzinfo=TW_TZ)
+
+    @staticmethod
+    def validate_record_data(category_id: int, values_dict: dict, note: str, record_time_str: str):
+        """
+        專門校驗紀錄數據的合法性 (不涉及寫入)
+        回傳: (bool, str_or_none)
+        """
         with SessionLocal() as db:
             cat = db.query(TrackerCategory).filter(TrackerCategory.id == category_id).first()
             if not cat:
                 return False, "找不到對應的分類。"
 
-            for f_name in cat.fields:
-                val = values_dict.get(f_name)
-                if val is None or str(val).strip() == "":
-                    return False, f"欄位「{f_name}」尚未填寫。"
-                
-                try:
-                    num = float(str(val).strip())
-                    if num < 0:
-                        return False, f"欄位「{f_name}」不能為負數。"
-                    if num > MAX_INPUT_VALUE:
-                        return False, f"欄位「{f_name}」數值過大，最高限制 {MAX_INPUT_VALUE:,}。"
-                except ValueError:
-                    return False, f"欄位「{f_name}」必須是有效的數字。"
-
-        return True, None
+            return LifeTracker_Manager._validate_against_fields(cat.fields, values_dict, note, record_time_str)
 
     @staticmethod
     def add_life_record(user_id: int, category_id: int, subcat_id: int, values_dict: dict, note: str, record_time_str: str = None):
@@ -244,9 +377,7 @@ class LifeTracker_Manager:
             return False, error
 
         with SessionLocal() as db:
-            now = datetime.now(TW_TZ)
-            parsed_date = datetime.strptime(record_time_str, "%Y/%m/%d")
-            final_time = parsed_date.replace(hour=now.hour, minute=now.minute, second=now.second, tzinfo=TW_TZ)
+            final_time = LifeTracker_Manager._build_record_time(record_time_str, datetime.now(TW_TZ))
 
             snapshot_name = "其他"
             if subcat_id:
@@ -263,9 +394,158 @@ class LifeTracker_Manager:
                 created_at=final_time
             )
             db.add(new_record)
+            db.flush()
+            LifeTracker_Manager._apply_daily_stats(db, LifeRecord.id == new_record.id)
             db.commit()
+            invalidate_record_count(category_id)
+            Chart_Cache.invalidate(category_id)
+            Local_Classifier.learn(category_id, note, snapshot_name)
             return True, None
 
+    @staticmethod
+    def add_life_records_bulk(user_id: int, category_id: int, records: list[dict]):
+        """
+        批次新增生活紀錄 (發票匯入等大量寫入使用)
+        分類與標籤只讀取一次，所有合法的紀錄在同一個交易內寫入。
+        records: [{"subcat_id", "values", "note", "record_time_str", "invoice_number"?, "invoice_date"?, "invoice_line"?}, ...]
+        帶有發票號碼的紀錄若已匯入過 (同號碼、同日期、同序號) 會直接略過 (不算錯誤)
+        回傳: (成功筆數, [(原始索引, 錯誤訊息), ...])
+        """
+        if not records:
+            return 0, []
+
+        with SessionLocal() as db:
+            cat = db.query(TrackerCategory).filter(TrackerCategory.id == category_id).first()
+            if not cat:
+                return 0, [(i, "找不到對應的分類。") for i in range(len(records))]
+
+            subcat_names = {s.id: s.name for s in cat.subcategories}
+            now = datetime.now(TW_TZ)
+
+            new_rows, pending, errors = [], [], []
+            for i, item in enumerate(records):
+                values_dict = item.get("values", {})
+                note = item.get("note")
+                record_time_str = item.get("record_time_str")
+
+                is_valid, error = LifeTracker_Manager._validate_against_fields(cat.fields, values_dict, note, record_time_str)
+                if not is_valid:
+                    errors.append((i, error))
+                    continue
+
+                # 標籤不屬於這個分類時視為「其他」
+                subcat_id = item.get("subcat_id")
+                if subcat_id not in subcat_names:
+                    subcat_id = None
+
+                pending.append(i)
+                new_rows.append({
+                    "user_id": user_id,
+                    "category_id": category_id,
+                    "subcategory_id": subcat_id,
+                    "subcat_name": subcat_names.get(subcat_id, "其他"),
+                    "values": values_dict,
+                    "note": note,
+                    "created_at": LifeTracker_Manager._build_record_time(record_time_str, now),
+                    "invoice_number": item.get("invoice_number"),
+                    "invoice_date": item.get("invoice_date"),
+                    "invoice_line": item.get("invoice_line"),
+                })
+
+            if not new_rows:
+                return 0, errors
+
+            try:
+                # 🌟 同一張發票的同一行已存在就略過，重跑同一個區間不會重複記帳
+                # 分段送出，避免超過單一語句的參數上限
+                inserted = []
+                for start in range(0, len(new_rows), 1000):
+                    stmt = (
+                        pg_insert(LifeRecord).values(new_rows[start:start + 1000])
+                        .on_conflict_do_nothing(index_elements=["user_id", "invoice_number", "invoice_date", "invoice_line"])
+                        .returning(LifeRecord.id, LifeRecord.note, LifeRecord.subcat_name)
+                    )
+                    inserted += db.execute(stmt).all()
+                if inserted:
+                    LifeTracker_Manager._apply_daily_stats(db, LifeRecord.id.in_([r.id for r in inserted]))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[Error] 批次新增紀錄失敗: {e}")
+                return 0, sorted(errors + [(i, f"批次寫入失敗: {e}") for i in pending])
+
+        # 已經寫入成功，之後的快取更新不影響回傳結果
+        invalidate_record_count(category_id)
+        Chart_Cache.invalidate(category_id)
+        for r in inserted:
+            Local_Classifier.learn(category_id, r.note, r.subcat_name)
+        return len(inserted), errors
+
+    @staticmethod
+    def get_imported_invoice_lines(user_id: int, invoice_numbers: list) -> set:
+        """查詢哪些發票明細已經匯入過，回傳 {(發票號碼, 發票日期, 明細序號), ...}"""
+        if not invoice_numbers:
+            return set()
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(LifeRecord.invoice_number, LifeRecord.invoice_date, LifeRecord.invoice_line).where(
+                    LifeRecord.user_id == user_id,
+                    LifeRecord.invoice_number.in_(set(invoice_numbers))
+                )
+            ).all()
+            return {tuple(row) for row in rows}
+
+    @staticmethod
+    def reclassify_invoice_records(user_id: int, category_id: int, assignments: dict) -> int:
+        """
+        依重新分類的結果更新發票匯入的紀錄 (單一交易，連同每日彙總一起調整)
+        assignments: {(發票號碼, 發票日期, 明細序號): subcategory_id 或 None(其他)}
+        回傳: 標籤有變動的紀錄數
+        """
+        if not assignments:
+            return 0
+
+        with SessionLocal() as db:
+            subcat_names = dict(db.execute(
+                select(TrackerSubCategory.id, TrackerSubCategory.name).where(TrackerSubCategory.category_id == category_id)
+            ).all())
+            rows = db.execute(
+                select(LifeRecord.id, LifeRecord.invoice_number, LifeRecord.invoice_date, LifeRecord.invoice_line,
+                       LifeRecord.subcategory_id).where(
+                    LifeRecord.user_id == user_id,
+                    LifeRecord.category_id == category_id,
+                    LifeRecord.invoice_number.is_not(None)
+                )
+            ).all()
+
+            changes = []
+            for record_id, number, invoice_date, line, current in rows:
+                key = (number, invoice_date, line)
+                if key not in assignments:
+                    continue
+                subcat_id = assignments[key]
+                if subcat_id not in subcat_names:
+                    subcat_id = None
+                if subcat_id != current:
+                    changes.append({"id": record_id, "subcategory_id": subcat_id, "subcat_name": subcat_names.get(subcat_id, "其他")})
+            if not changes:
+                return 0
+
+            try:
+                affected = LifeRecord.id.in_([c["id"] for c in changes])
+                LifeTracker_Manager._apply_daily_stats(db, affected, sign=-1)
+                db.execute(update(LifeRecord), changes)
+                LifeTracker_Manager._apply_daily_stats(db, affected)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[Error] 重新分類發票紀錄失敗: {e}")
+                raise
+
+        Chart_Cache.invalidate(category_id)
+        Local_Classifier.invalidate(category_id)
+        return len(changes)
+
     @staticmethod
     def add_subcategory(category_id: int, subcat_names_list: list[str]):
         """
@@ -300,7 +580,13 @@ class LifeTracker_Manager:
                 db.add(new_sub)
             
             db.commit()
-            return True, None
+            cat = db.get(TrackerCategory, category_id)
+            memo_user_id = cat.user_id if cat and cat.name == "消費" else None
+
+        # 🌟 消費分類多了新標籤：之前被歸到「其他」的品名讓 AI 重新判斷 (關掉上面的連線後再開，不巢狀佔用兩條連線)
+        if memo_user_id is not None:
+            Classify_Memo.forget_unmatched(memo_user_id)
+        return True, None
 
     @staticmethod
     def update_subcategory_name(category_id: int, subcat_id: int, new_name: str):
@@ -327,14 +613,26 @@ class LifeTracker_Manager:
 
             subcat = db.query(TrackerSubCategory).filter(TrackerSubCategory.id == subcat_id).first()
             if subcat:
-                db.query(LifeRecord).filter(LifeRecord.subcategory_id == subcat_id).update({
+                # 彙總以名稱分組：先扣掉舊名稱的數值，改名後再加回新名稱
+                affected = LifeRecord.subcategory_id == subcat_id
+                LifeTracker_Manager._apply_daily_stats(db, affected, sign=-1)
+                db.query(LifeRecord).filter(affected).update({
                     "subcat_name": new_name
                 })
+                LifeTracker_Manager._apply_daily_stats(db, affected)
                 subcat.name = new_name
                 db.commit()
-                return True, None
-            
-            return False, "找不到該標籤。"
+                Chart_Cache.invalidate(category_id)
+                Local_Classifier.invalidate(category_id)
+                cat = db.get(TrackerCategory, category_id)
+                memo_user_id = cat.user_id if cat and cat.name == "消費" else None
+            else:
+                return False, "找不到該標籤。"
+
+        # 改名後的標籤可能更適合之前被歸到「其他」的品名，讓它們重新判斷
+        if memo_user_id is not None:
+            Classify_Memo.forget_unmatched(memo_user_id)
+        return True, None
 
     @staticmethod
     def delete_subcategory(subcat_id: int):
@@ -347,96 +645,182 @@ class LifeTracker_Manager:
             
             if subcat:
                 try:
+                    record_ids = db.scalars(select(LifeRecord.id).where(LifeRecord.subcategory_id == subcat_id)).all()
+                    affected = LifeRecord.id.in_(record_ids)
+                    if record_ids:
+                        LifeTracker_Manager._apply_daily_stats(db, affected, sign=-1)
+
                     db.query(LifeRecord).filter(LifeRecord.subcategory_id == subcat_id).update({
                         "subcategory_id": None,
                         "subcat_name": "其他"
                     }, synchronize_session=False)
-                    
+
+                    if record_ids:
+                        LifeTracker_Manager._apply_daily_stats(db, affected)
+                    category_id = subcat.category_id
                     db.delete(subcat)
                     db.commit()
-                    return True
                 except Exception as e:
                     db.rollback()
                     print(f"[Error] 刪除標籤失敗: {e}")
                     return False
+
+                Chart_Cache.invalidate(category_id)
+                Local_Classifier.invalidate(category_id)
+                return True
             return False
         
     @staticmethod
-    def get_subcat_stats(category_id: int, target_field: str, range_days: int = 7) -> dict:
+    def _sum_record_values(rows, target_field: str, result_dict: dict):
+        """把 (subcat_name, values) 逐筆加總到 result_dict"""
+        for subcat_name, values in rows:
+            display_name = subcat_name if subcat_name else "其他"
+            amount = 0
+            
+            if isinstance(values, dict):
+                if target_field and target_field in values:
+                    try:
+                        amount = float(values[target_field])
+                    except (ValueError, TypeError):
+                        pass 
+                elif not target_field:
+                    for val in values.values():
+                        try:
+                            amount = float(val)
+                            break 
+                        except (ValueError, TypeError):
+                            continue 
+            
+            if display_name not in result_dict:
+                result_dict[display_name] = 0
+            result_dict[display_name] += amount
+
+    @staticmethod
+    @with_async_db_decorator
+    async def get_subcat_stats(category_id: int, target_field: str, range_days: int = 7, db=None) -> dict:
         """
         取得該分類下各子分類的「數值總和」。
         如果傳入 target_field，就只加總該欄位的數值。
+        完整的日子讀每日彙總表，只有起始那天需要掃原始紀錄。
         """
-        with SessionLocal() as db:
-            now = datetime.now(TW_TZ)
-            start_date = now - timedelta(days=int(range_days)) 
+        now = datetime.now(TW_TZ)
+        start_date = now - timedelta(days=int(range_days)) 
+
+        result_dict = {}
+        conditions = [
+            LifeRecord.category_id == category_id,
+            LifeRecord.created_at >= aware_time(start_date)
+        ]
+
+        if target_field:
+            next_day = datetime.combine(start_date.date() + timedelta(days=1), datetime.min.time(), tzinfo=TW_TZ)
+            conditions.append(LifeRecord.created_at < aware_time(next_day))
+
+            rollup = await db.execute(
+                select(LifeRecordDailyStat.subcat_name, func.sum(LifeRecordDailyStat.total)).where(
+                    LifeRecordDailyStat.category_id == category_id,
+                    LifeRecordDailyStat.field == target_field,
+                    LifeRecordDailyStat.day > start_date.date()
+                ).group_by(LifeRecordDailyStat.subcat_name)
+            )
+            for subcat_name, total in rollup.all():
+                result_dict[subcat_name] = result_dict.get(subcat_name, 0) + total
+
+        # 沒指定欄位時要取每筆的第一個數值，無法用彙總表，退回掃描原始紀錄
+        result = await db.execute(
+            select(LifeRecord.subcat_name, LifeRecord.values).where(*conditions)
+        )
+        LifeTracker_Manager._sum_record_values(result.all(), target_field, result_dict)
+
+        final_stats = {}
+        for k, v in result_dict.items():
+            if v > 0:
+                final_stats[k] = int(v) if v.is_integer() else round(v, 2)
+                
+        return final_stats
 
-            records = db.query(LifeRecord).filter(
-                LifeRecord.category_id == category_id,
-                LifeRecord.created_at >= start_date
-            ).all()
+    @staticmethod
+    def get_analysis_start(range_type: str = "week") -> datetime:
+        now = datetime.now(TW_TZ)
+        if range_type == "month":
+            return now - timedelta(days=30)
+        if range_type == "half_year":
+            return now - timedelta(days=180)
+        return now - timedelta(days=7)
 
-            result_dict = {}
-            for r in records:
-                display_name = r.subcat_name if r.subcat_name else "其他"
-                amount = 0
-                
-                if isinstance(r.values, dict):
-                    if target_field and target_field in r.values:
-                        try:
-                            amount = float(r.values[target_field])
-                        except (ValueError, TypeError):
-                            pass 
-                    elif not target_field:
-                        for val in r.values.values():
-                            try:
-                                amount = float(val)
-                                break 
-                            except (ValueError, TypeError):
-                                continue 
-                
-                if display_name not in result_dict:
-                    result_dict[display_name] = 0
-                result_dict[display_name] += amount
-
-            final_stats = {}
-            for k, v in result_dict.items():
-                if v > 0:
-                    final_stats[k] = int(v) if v.is_integer() else round(v, 2)
-                    
-            return final_stats
+    @staticmethod
+    @with_async_db_decorator
+    async def get_analysis_targets(start_date: datetime, db=None):
+        """
+        每週總結要處理的分類：區間內有紀錄的分類，附上目前的紀錄指紋
+        指紋 = 區間內 (id, 標籤名稱) 的 md5，紀錄新增/刪除或標籤改名都會改變
+        回傳: [(category_id, name, 目前指紋, 上次分析的指紋), ...]
+        """
+        fingerprints = (
+            select(
+                LifeRecord.category_id,
+                func.md5(func.string_agg(
+                    func.concat(LifeRecord.id, ":", LifeRecord.subcat_name),
+                    aggregate_order_by(literal_column("','"), LifeRecord.id)
+                )).label("fingerprint")
+            )
+            .where(LifeRecord.created_at >= aware_time(start_date))
+            .group_by(LifeRecord.category_id)
+            .subquery()
+        )
+
+        result = await db.execute(
+            select(TrackerCategory.id, TrackerCategory.name, fingerprints.c.fingerprint, TrackerCategory.analysis_fingerprint)
+            .join(fingerprints, fingerprints.c.category_id == TrackerCategory.id)
+            .order_by(TrackerCategory.id)
+        )
+        return result.all()
 
     @staticmethod
-    def get_records_for_analysis(category_id: int, range_type: str = "week"):
+    @with_async_db_decorator
+    async def save_ai_analysis(category_id: int, summary: str, fingerprint: str = None, db=None):
+        """寫入每週總結 (fingerprint 為 None 表示這次分析失敗，下次仍要重跑)"""
+        cat = await db.get(TrackerCategory, category_id)
+        if not cat:
+            return False
+        try:
+            cat.last_ai_analysis = summary
+            cat.analysis_updated_at = aware_time(datetime.now(TW_TZ))
+            cat.analysis_fingerprint = fingerprint
+            await db.commit()
+            return True
+        except Exception as e:
+            await db.rollback()
+            print(f"[Error] 寫入分類 {category_id} 的 AI 總結失敗: {e}")
+            return False
+
+    @staticmethod
+    @with_async_db_decorator
+    async def get_records_for_analysis(category_id: int, range_type: str = "week", start_date: datetime = None, db=None):
         """
         根據指定的範圍撈取紀錄：'week' (7天), 'month' (30天), 'half_year' (180天)
+        批次任務可直接傳入 start_date，確保與指紋計算使用同一個起點
         """
-        with SessionLocal() as db:
-            
-            now = datetime.now(TW_TZ)
-            if range_type == "week":
-                start_date = now - timedelta(days=7)
-            elif range_type == "month":
-                start_date = now - timedelta(days=30)
-            elif range_type == "half_year":
-                start_date = now - timedelta(days=180)
-            else:
-                start_date = now - timedelta(days=7)
+        if start_date is None:
+            start_date = LifeTracker_Manager.get_analysis_start(range_type)
 
-            records = db.query(LifeRecord).filter(
+        result = await db.execute(
+            select(LifeRecord).where(
                 LifeRecord.category_id == category_id,
-                LifeRecord.created_at >= start_date
-            ).order_by(LifeRecord.created_at.asc()).all()
-            
-            if not records:
-                return None
+                LifeRecord.created_at >= aware_time(start_date)
+            ).order_by(LifeRecord.created_at.asc())
+        )
+        records = result.scalars().all()
+        
+        if not records:
+            return None
 
-            data_str = f"--- 紀錄範圍：自 {start_date.strftime('%Y/%m/%d')} 起 ---\n"
-            for r in records:
-                val_text = ", ".join([f"{k}:{v}" for k, v in r.values.items()])
-                data_str += f"- {r.created_at.strftime('%m/%d')} | {r.subcat_name or '其他'} | {val_text} | {r.note or '無'}\n"
-            
-            return data_str
+        data_str = f"--- 紀錄範圍：自 {start_date.strftime('%Y/%m/%d')} 起 ---\n"
+        for r in records:
+            val_text = ", ".join([f"{k}:{v}" for k, v in r.values.items()])
+            data_str += f"- {r.created_at.strftime('%m/%d')} | {r.subcat_name or '其他'} | {val_text} | {r.note or '無'}\n"
+        
+        return data_str
         
     @staticmethod
     def delete_range_option(category_id: int, days: int):
@@ -515,15 +899,18 @@ class LifeTracker_Manager:
         note = ai_result.get("note", "")
 
         with SessionLocal() as db:
-            
-            # 1. 根據 AI 給的分類 ID 與 標籤名稱，找尋資料庫中對應的 subcat_id
-            subcat = db.query(TrackerSubCategory).filter(
-                TrackerSubCategory.category_id == category_id,
-                TrackerSubCategory.name == subcat_name_from_ai
-            ).first()
+            subcat_map = {
+                s.name: s.id for s in db.query(TrackerSubCategory).filter(
+                    TrackerSubCategory.category_id == category_id
+                ).all()
+            }
+
+        # 1. 本地分類器對備註有把握時以它為準 (它是用使用者自己的紀錄訓練的)，否則採用 AI 給的標籤
+        local_tag = Local_Classifier.classify(category_id, note, list(subcat_map.keys())) if note else None
+        tag = local_tag or subcat_name_from_ai
 
-            # 2. 如果找到了就拿 ID，沒找到（例如 AI 歸類為「其他」）就給 None
-            subcat_id = subcat.id if subcat else None
+        # 2. 找到對應的 subcat_id，沒找到（例如歸類為「其他」）就給 None
+        subcat_id = subcat_map.get(tag)
 
         return LifeTracker_Manager.add_life_record(
             user_id=user_id,
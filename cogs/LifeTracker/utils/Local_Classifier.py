@@ -0,0 +1,158 @@
+import math
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from database import SessionLocal
+from database.models import LifeRecord
+from cogs.LifeTracker.utils.Classify_Memo import Classify_Memo
+from cogs.LifeTracker.LifeTracker_config import (
+    LOCAL_CLASSIFY_THRESHOLD, LOCAL_CLASSIFY_MIN_SAMPLES, LOCAL_CLASSIFY_MIN_LABEL_SAMPLES,
+    LOCAL_CLASSIFY_MAX_TRAIN, LOCAL_CLASSIFY_MAX_MODELS
+)
+
+class Local_Classifier:
+    """
+    本地的標籤分類器 (字元 n-gram + 多項式單純貝氏)
+    每個分類各自用使用者過去的「備註 → 標籤」紀錄訓練，新增紀錄時增量更新；
+    有把握時直接回答，沒把握才交給 AI_Analyzer
+    """
+    _models: OrderedDict = OrderedDict()  # category_id -> 模型，超過上限時淘汰最久沒用的
+    _lock = threading.Lock()
+    _stats = {"local": 0, "fallback": 0}
+
+    @staticmethod
+    def features(text) -> list:
+        """正規化後切成 1~3 字的 n-gram (前後補邊界符號，讓開頭/結尾的字有額外權重)"""
+        norm = Classify_Memo.normalize(text)
+        if not norm:
+            return []
+        padded = f"^{norm}$"
+        grams = list(norm)
+        for n in (2, 3):
+            grams += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+        return grams
+
+    @staticmethod
+    def _new_model() -> dict:
+        return {"docs": {}, "tokens": {}, "counts": {}, "vocab": set(), "total": 0}
+
+    @classmethod
+    def _learn_into(cls, model: dict, note, label: str):
+        grams = cls.features(note)
+        if not grams:
+            return
+        label = label or "其他"
+        counts = model["counts"].setdefault(label, {})
+        for g in grams:
+            counts[g] = counts.get(g, 0) + 1
+            model["vocab"].add(g)
+        model["docs"][label] = model["docs"].get(label, 0) + 1
+        model["tokens"][label] = model["tokens"].get(label, 0) + len(grams)
+        model["total"] += 1
+
+    @classmethod
+    def _get_model(cls, category_id: int) -> dict:
+        """取得分類的模型，第一次使用時從資料庫的歷史紀錄訓練"""
+        with cls._lock:
+            model = cls._models.get(category_id)
+            if model is not None:
+                cls._models.move_to_end(category_id)
+                return model
+
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(LifeRecord.note, LifeRecord.subcat_name)
+                .where(LifeRecord.category_id == category_id, LifeRecord.note.is_not(None), LifeRecord.note != "")
+                .order_by(LifeRecord.id.desc())
+                .limit(LOCAL_CLASSIFY_MAX_TRAIN)
+            ).all()
+
+        model = cls._new_model()
+        for note, label in rows:
+            cls._learn_into(model, note, label)
+
+        with cls._lock:
+            # 訓練期間別的執行緒可能已經放進去了，以先到的為準
+            model = cls._models.setdefault(category_id, model)
+            cls._models.move_to_end(category_id)
+            while len(cls._models) > LOCAL_CLASSIFY_MAX_MODELS:
+                cls._models.popitem(last=False)
+        return model
+
+    @classmethod
+    def learn(cls, category_id: int, note, label: str):
+        """新增紀錄後的增量學習 (模型還沒載入就不用管，下次載入時會從資料庫讀到)"""
+        with cls._lock:
+            model = cls._models.get(category_id)
+            if model is not None:
+                cls._learn_into(model, note, label)
+
+    @classmethod
+    def invalidate(cls, category_id: int = None):
+        """標籤改名或刪除後，舊的標籤名稱已失效，丟掉模型下次重新訓練"""
+        with cls._lock:
+            if category_id is None:
+                cls._models.clear()
+            else:
+                cls._models.pop(category_id, None)
+
+    @classmethod
+    def predict(cls, category_id: int, note, labels: list) -> tuple:
+        """
+        預測備註屬於哪個標籤 (只在 labels 與「其他」之間選)
+        回傳: (標籤, 信心 0~1)；訓練資料不足或無法判斷時回傳 (None, 0.0)
+        """
+        grams = cls.features(note)
+        model = cls._get_model(category_id)
+        if not grams or model["total"] < LOCAL_CLASSIFY_MIN_SAMPLES:
+            return None, 0.0
+
+        allowed = set(labels) | {"其他"}
+        with cls._lock:
+            # 至少要有兩個標籤各有足夠的樣本才有比較的意義 (只學過一個標籤時，什麼都會被判成那個標籤)
+            trained = [l for l in allowed if model["docs"].get(l, 0) >= LOCAL_CLASSIFY_MIN_LABEL_SAMPLES]
+            if len(trained) < 2:
+                return None, 0.0
+
+            # 所有允許的標籤都參與比較；沒有訓練資料的標籤 (例如剛新增的) 以 Laplace 平滑給先驗分數
+            vocab_size = len(model["vocab"]) + 1
+            scores = {}
+            for label in allowed:
+                counts = model["counts"].get(label, {})
+                denom = model["tokens"].get(label, 0) + vocab_size
+                score = math.log((model["docs"].get(label, 0) + 1) / (model["total"] + len(allowed)))
+                for g in grams:
+                    score += math.log((counts.get(g, 0) + 1) / denom)
+                scores[label] = score
+
+        # log 分數轉成機率 (softmax)
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        confidence = 1 / sum(math.exp(s - top) for s in scores.values())
+        return best, confidence
+
+    @classmethod
+    def classify(cls, category_id: int, note, labels: list):
+        """有把握 (信心 >= LOCAL_CLASSIFY_THRESHOLD) 時回傳標籤，否則回傳 None 交給 AI"""
+        label, confidence = cls.predict(category_id, note, labels)
+        if label is not None and confidence >= LOCAL_CLASSIFY_THRESHOLD:
+            cls._stats["local"] += 1
+            return label
+        cls._stats["fallback"] += 1
+        return None
+
+    @classmethod
+    def classify_many(cls, category_id: int, notes: list, labels: list) -> list:
+        """批次版的 classify，回傳與 notes 等長的列表 (None 代表需要交給 AI)"""
+        return [cls.classify(category_id, note, labels) for note in notes]
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        local, fallback = cls._stats["local"], cls._stats["fallback"]
+        total = local + fallback
+        return {
+            "local": local,
+            "fallback": fallback,
+            "local_rate": local / total if total else 0.0,
+            "models": len(cls._models),
+        }
@@ -2,9 +2,17 @@ from .LifeTracker_Manager import LifeTracker_Manager
 from .AI_Analyzer import AI_Analyzer
 from .Crypto_Helper import Crypto_Helper
 from .EInvoice_Manager import EInvoice_Manager
+from .Chart_Cache import Chart_Cache
+from .Classify_Memo import Classify_Memo
+from .Local_Classifier import Local_Classifier
+from .Invoice_Archive import Invoice_Archive
 __all__ = [
     "LifeTracker_Manager",
     "AI_Analyzer",
     "Crypto_Helper",
-    "EInvoice_Manager"
+    "EInvoice_Manager",
+    "Chart_Cache",
+    "Classify_Memo",
+    "Local_Classifier",
+    "Invoice_Archive"
 ]
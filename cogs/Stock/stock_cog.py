@@ -45,7 +45,7 @@ class Stock(commands.Cog):
 
         try:
             # 🌟 [修改] 改用 Manager API 獲取資料
-            watches = StockManager.get_alert_watches()
+            watches = await StockManager.get_alert_watches() or []
             
             for watch in watches:
                 async with fugle_api_lock:
@@ -68,7 +68,7 @@ class Stock(commands.Cog):
                         await self.send_dm(watch['user_id'], alert_msg)
                         
                         # 🌟 [修改] 改用 Manager API 執行更新操作
-                        StockManager.update_notified_price(watch['user_id'], watch['stock_symbol'], curr_price)
+                        await StockManager.update_notified_price(watch['user_id'], watch['stock_symbol'], curr_price)
                 
                 # 免費版限流：每支股票請求後強制暫停
                 await asyncio.sleep(1.1) 
@@ -1,5 +1,7 @@
+from sqlalchemy import select
 from database.models import UserStockWatch, User
 from database import SessionLocal
+from database.db_utils import with_async_db_decorator
 from cogs.Stock.stock_config import TOTAL_SELL_COST_RATE
 
 class StockManager:
@@ -81,34 +83,32 @@ class StockManager:
             return False, str(e)
         
     @staticmethod
-    def get_alert_watches():
-        """獲取所有設定了漲跌幅預警的股票紀錄"""
-        from database import SessionLocal
-        with SessionLocal() as session:
-            from database.models import UserStockWatch
-            watches = session.query(UserStockWatch).filter(
-                (UserStockWatch.target_up.isnot(None)) | 
-                (UserStockWatch.target_down.isnot(None))
-            ).all()
-            
-            # 🌟 轉換為字典回傳，避免 Session 關閉後發生 DetachedInstanceError
-            return [{
-                "user_id": w.user_id,
-                "stock_symbol": w.stock_symbol,
-                "target_up": w.target_up,
-                "target_down": w.target_down,
-                "last_notified_price": w.last_notified_price,
-            } for w in watches]
+    @with_async_db_decorator
+    async def get_alert_watches(db=None):
+        """獲取所有設定了漲跌幅預警的股票紀錄 (每分鐘由監控排程呼叫，走非同步 session)"""
+        result = await db.execute(select(UserStockWatch).where(
+            (UserStockWatch.target_up.isnot(None)) | 
+            (UserStockWatch.target_down.isnot(None))
+        ))
+        watches = result.scalars().all()
+        
+        # 🌟 轉換為字典回傳，避免 Session 關閉後發生 DetachedInstanceError
+        return [{
+            "user_id": w.user_id,
+            "stock_symbol": w.stock_symbol,
+            "target_up": w.target_up,
+            "target_down": w.target_down,
+            "last_notified_price": w.last_notified_price,
+        } for w in watches]
 
     @staticmethod
-    def update_notified_price(user_id: int, symbol: str, price: float):
+    @with_async_db_decorator
+    async def update_notified_price(user_id: int, symbol: str, price: float, db=None):
         """更新股票的最後通知價格"""
-        from database import SessionLocal
-        with SessionLocal() as session:
-            from database.models import UserStockWatch
-            watch = session.query(UserStockWatch).filter_by(
-                user_id=user_id, stock_symbol=symbol
-            ).first()
-            if watch:
-                watch.last_notified_price = price
-                session.commit()
\ No newline at end of file
+        result = await db.execute(select(UserStockWatch).filter_by(
+            user_id=user_id, stock_symbol=symbol
+        ))
+        watch = result.scalars().first()
+        if watch:
+            watch.last_notified_price = price
+            await db.commit()
\ No newline at end of file
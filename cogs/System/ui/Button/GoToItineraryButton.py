@@ -18,7 +18,7 @@ class GoToItineraryButton(ui.Button):
         try:
             from cogs.Itinerary.ui.View.ItineraryDashboardView import ItineraryDashboardView
             
-            embed, view, file = ItineraryDashboardView.create_ui(interaction.user.id)
+            embed, view, file = await ItineraryDashboardView.create_ui(interaction.user.id)
             
             await interaction.edit_original_response(embed=embed, view=view, attachments=[file])
             
@@ -1,5 +1,6 @@
 from database.db import SessionLocal
 from database.models import User, BotSettings
+from database.db_utils import invalidate_botsettings
 
 class SystemManager:
     @staticmethod
@@ -55,6 +56,7 @@ class SystemManager:
                 # 使用 setattr 動態設定欄位名稱
                 setattr(settings, column_name, value)
                 db.commit()
+                invalidate_botsettings(guild_id)
                 return True, ""
                 
         except Exception as e:
@@ -129,7 +129,7 @@ class ActionHandler:
             if not success:
                 content = report
             else:
-                embed, view, file = Itinerary.create_itinerary_dashboard_ui(message.author.id)
+                embed, view, file = await Itinerary.create_itinerary_dashboard_ui(message.author.id)
                 embed.title = "✅ 行程新增成功！"
                 embed.color = discord.Color.green()
                 attachments = [file]
@@ -140,7 +140,7 @@ class ActionHandler:
         
         elif action == "VIEW_ITINERARY":
             from cogs.Itinerary.ui.View.ItineraryDashboardView import ItineraryDashboardView
-            embed, view, file = ItineraryDashboardView.create_ui(message.author.id)
+            embed, view, file = await ItineraryDashboardView.create_ui(message.author.id)
             attachments = [file]
 
         elif action == "GMAIL_HOME":
@@ -20,9 +20,9 @@ class VoiceSensorCog(commands.Cog):
         if message.author.bot:
             return
         
-        from database.db_utils import get_botsettings
+        from database.db_utils import get_botsettings_async
         from database.models import BotSettings
-        if message.guild and message.channel.id != get_botsettings(BotSettings.gpt_channel_id, message.guild.id):
+        if message.guild and message.channel.id != await get_botsettings_async(BotSettings.gpt_channel_id, message.guild.id):
             return
         if not LISTEN_FLAG:
             return
@@ -0,0 +1,262 @@
+# cogs/chart_service.py
+"""
+圖表渲染服務
+
+matplotlib 是同步且吃 CPU 的，直接在互動處理中畫圖會卡住整個事件迴圈。
+這裡維護一個預先暖機 (已載入 pyplot 與字體) 的 process pool，
+各模組透過 `await render(kind, ...)` 取得 PNG bytes。
+
+注意：這個檔案會在 worker 中被重新 import，請不要在頂層 import discord 或各 cog 套件。
+"""
+import asyncio
+import calendar
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import FONT_PATH, CHART_WORKERS
+
+_executor: ProcessPoolExecutor = None
+_metrics: dict = {}
+
+
+# ==================== Worker 端 ====================
+
+def _init_worker():
+    """每個 worker 啟動時執行一次：載入 pyplot、註冊字體並畫一張小圖暖機"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.font_manager as fm
+
+    if os.path.exists(FONT_PATH):
+        fe = fm.FontEntry(fname=FONT_PATH, name='CustomFont')
+        fm.fontManager.ttflist.insert(0, fe)
+        plt.rcParams['font.family'] = fe.name
+
+    fig = plt.figure(figsize=(1, 1))
+    fig.text(0.5, 0.5, "warm up")
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render_donut(category_name: str, stats_data: dict, target_field: str = "") -> bytes:
+    """生成甜甜圈圖 (LifeTracker 分類看板)"""
+    import matplotlib.pyplot as plt
+
+    raw_labels = list(stats_data.keys())
+    sizes = list(stats_data.values())
+
+    # 計算總計
+    total = sum(sizes)
+
+    # 圓餅圖上的文字：標籤 + 百分比
+    combined_labels = [f"{label}\n{size/total*100:.1f}%" for label, size in zip(raw_labels, sizes)]
+
+    # 將圖片寬度拉長 (7x4)
+    fig = plt.figure(figsize=(7, 4))
+    fig.patch.set_alpha(0.0)
+
+    # 手動加一個 Axes，座標為 [左, 下, 寬, 高]：寬度佔畫布的一半，高度全開，左貼齊
+    ax = fig.add_axes([0, 0, 0.5, 1])
+    ax.patch.set_alpha(0.0)
+
+    # 繪製圓餅圖 ( labeldistance 往內縮一點到 0.75)
+    wedges, texts = ax.pie(
+        sizes,
+        labels=combined_labels,
+        labeldistance=0.75,
+        startangle=140,
+        textprops={
+            'color': "white",
+            'fontsize': 14,
+            'fontweight': 'bold',
+            'ha': 'center',
+            'va': 'center'
+        },
+        wedgeprops=dict(width=0.45)
+    )
+
+    center_text = f"{target_field}\n總計: {total}"
+    ax.text(0, 0, center_text, ha='center', va='center', fontsize=18, fontweight='bold', color='white')
+
+    legend_labels = [f"{label}: {size}" for label, size in zip(raw_labels, sizes)]
+
+    legend = ax.legend(
+        wedges,
+        legend_labels,
+        title=f"{category_name} - {target_field}",
+        loc="center left",
+        bbox_to_anchor=(1.0, 0.5),
+        frameon=False,
+        labelcolor='white',
+        fontsize=15
+    )
+
+    # 讓圖例的標題也變成白色跟粗體
+    if legend.get_title():
+        legend.get_title().set_color("white")
+        legend.get_title().set_fontweight("bold")
+        legend.get_title().set_fontsize(16)
+
+    # 確保畫出來是正圓
+    ax.axis('equal')
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', transparent=True, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _render_month_calendar(year: int, month: int, event_days: list) -> bytes:
+    """生成包含行程標記的月曆圖片 (Itinerary 看板)"""
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+
+    # 設定畫布大小與背景
+    fig, ax = plt.subplots(figsize=(6, 4), facecolor='#2B2D31') # 使用 Discord 深色背景色
+    ax.axis('off')
+
+    cal = calendar.monthcalendar(year, month)
+    month_name = f"{year} / {month:02d}"
+
+    # 標題 (年份 / 月份)
+    ax.text(0.5, 0.95, month_name, ha='center', va='center', fontsize=20, fontweight='bold', color='white', transform=ax.transAxes)
+
+    # 星期標籤
+    days_of_week = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    for i, day in enumerate(days_of_week):
+        color = '#FF6B6B' if i >= 5 else '#A3A6AA' # 週末用紅色
+        ax.text(i/7 + 0.07, 0.82, day, ha='center', va='center', fontsize=12, fontweight='bold', color=color, transform=ax.transAxes)
+
+    # 繪製日期網格
+    y_start = 0.68
+    y_step = 0.13
+    for row_idx, week in enumerate(cal):
+        for col_idx, day in enumerate(week):
+            if day == 0: continue
+
+            x = col_idx / 7 + 0.07
+            y = y_start - row_idx * y_step
+
+            # 💡 如果這天有行程，畫一個圈做標記
+            if day in event_days:
+                circle = patches.Circle((x, y), 0.045, color='#E0A04A', transform=ax.transAxes, zorder=1)
+                ax.add_patch(circle)
+                text_color = 'white'
+            else:
+                text_color = '#FFFFFF' if col_idx < 5 else '#FFB3B3' # 週末淺紅
+
+            ax.text(x, y, str(day), ha='center', va='center', fontsize=12, color=text_color, zorder=2, transform=ax.transAxes)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=120, transparent=True)
+    plt.close(fig) # 釋放資源
+    return buf.getvalue()
+
+
+_RENDERERS = {
+    "donut": _render_donut,
+    "month_calendar": _render_month_calendar,
+}
+
+
+def _run(kind: str, args: tuple):
+    """在 worker 內執行渲染，回傳 (PNG bytes, 純渲染耗時 ms)"""
+    started = time.perf_counter()
+    png = _RENDERERS[kind](*args)
+    return png, (time.perf_counter() - started) * 1000
+
+
+# ==================== 主程式端 ====================
+
+def start(workers: int = None):
+    """建立 process pool 並讓每個 worker 先完成暖機 (重複呼叫不會重建)"""
+    global _executor
+    if _executor is not None:
+        return
+
+    workers = workers or CHART_WORKERS
+    if not os.path.exists(FONT_PATH):
+        print(f"⚠️ 警告：找不到字體檔案於 {FONT_PATH}，將使用系統預設字體。")
+
+    # bot 主程式已經有事件迴圈與多條執行緒，避免直接 fork；Windows 只能用 spawn
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker)
+    # worker 是按需建立的，先丟 workers 個空任務把它們全部叫起來
+    for _ in range(workers):
+        _executor.submit(_ping)
+    print(f"🎨 圖表渲染服務啟動，worker 數量: {workers}")
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _record(kind: str, render_ms: float, total_ms: float, failed: bool = False):
+    m = _metrics.setdefault(kind, {"count": 0, "errors": 0, "render_ms_total": 0.0, "render_ms_max": 0.0, "total_ms_total": 0.0})
+    if failed:
+        m["errors"] += 1
+        return
+    m["count"] += 1
+    m["render_ms_total"] += render_ms
+    m["render_ms_max"] = max(m["render_ms_max"], render_ms)
+    m["total_ms_total"] += total_ms
+
+
+async def render(kind: str, *args) -> bytes:
+    """
+    非同步渲染圖表，回傳 PNG bytes
+    kind: "donut" / "month_calendar"，args 與對應的 _render_* 函式相同
+    """
+    if kind not in _RENDERERS:
+        raise ValueError(f"未知的圖表類型: {kind}")
+
+    start()
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        executor = _executor
+        try:
+            png, render_ms = await loop.run_in_executor(executor, _run, kind, args)
+        except BrokenProcessPool:
+            # worker 意外死掉 (例如被 OOM kill)：重建 pool 再試一次
+            # 同一個壞掉的 pool 上所有進行中的渲染都會收到這個例外，只有第一個負責重建，其他直接用新的 pool 重試
+            if _executor is executor:
+                print("⚠️ 圖表 worker 異常結束，重新建立 process pool")
+                shutdown()
+            start()
+            png, render_ms = await loop.run_in_executor(_executor, _run, kind, args)
+    except Exception:
+        _record(kind, 0, 0, failed=True)
+        raise
+
+    _record(kind, render_ms, (time.perf_counter() - started) * 1000)
+    return png
+
+
+def get_chart_metrics() -> dict:
+    """各圖表類型的渲染次數與耗時 (render 為 worker 內純繪圖時間，total 含排隊與傳輸)"""
+    stats = {}
+    for kind, m in _metrics.items():
+        count = m["count"]
+        stats[kind] = {
+            "count": count,
+            "errors": m["errors"],
+            "avg_render_ms": round(m["render_ms_total"] / count, 1) if count else 0.0,
+            "max_render_ms": round(m["render_ms_max"], 1),
+            "avg_total_ms": round(m["total_ms_total"] / count, 1) if count else 0.0,
+        }
+    return stats
@@ -0,0 +1,332 @@
+# cogs/job_queue.py
+"""
+背景工作佇列
+
+每日發票抓取、每週總結這類工作原本都在 tasks.loop 裡一口氣跑完，bot 中途重啟時剩下的使用者就被忘掉了。
+這裡把每一件工作存進 background_jobs 表，由 worker 領取執行：
+    - 以 SELECT ... FOR UPDATE SKIP LOCKED 領取，多個 worker (或多個 bot 程序) 不會拿到同一件工作
+    - 領取時取得租約並定期續約；程序當掉、租約過期後，工作會被重新領取
+    - 失敗時依指數退避重試，超過次數標記為 failed
+    - priority 數字大的先執行
+
+使用方式：
+    job_queue.register("invoice_fetch", handler, concurrency=2)    # cog 初始化時註冊處理函式
+    await job_queue.enqueue("invoice_fetch", {"user_id": 123}, dedupe_key="invoice_fetch:123")
+處理函式為 async def handler(payload: dict)，拋出例外即視為失敗；拋出 PermanentError 代表重試也沒用 (例如帳密錯誤)，直接標記為 failed。
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+from datetime import timedelta
+
+from sqlalchemy import select, update, delete, func, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+
+from config import JOB_POLL_INTERVAL, JOB_LEASE_SECONDS
+from database.db import AsyncSessionLocal
+from database.models import BackgroundJob
+
+RETRY_BASE_SECONDS = 30       # 第一次重試前等待的秒數，之後每次加倍
+RETRY_MAX_SECONDS = 60 * 60   # 重試等待的上限
+KEEP_FINISHED_DAYS = 7        # 完成 / 失敗的工作保留天數
+PURGE_INTERVAL = 60 * 60      # 清理舊工作的間隔秒數
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class PermanentError(Exception):
+    """處理函式拋出此例外時不重試，工作直接標記為 failed"""
+
+
+_handlers: dict = {}   # kind -> {"handler": async func, "concurrency": int}
+_running: dict = {}    # kind -> 執行中的 asyncio.Task 集合
+_dispatcher: asyncio.Task = None
+_wake: asyncio.Event = None
+_metrics: dict = {}
+
+
+# ==================== 註冊 / 放入工作 ====================
+
+def register(kind: str, handler, concurrency: int = 1):
+    """註冊工作類型的處理函式；concurrency 為這個 bot 程序同時執行該類工作的上限"""
+    _handlers[kind] = {"handler": handler, "concurrency": max(1, concurrency)}
+
+
+def _notify():
+    if _wake is not None:
+        _wake.set()
+
+
+async def enqueue_many(kind: str, payloads: list, *, dedupe_keys: list = None, priority: int = 0,
+                       delay: float = 0, max_attempts: int = 5) -> list:
+    """
+    一次放入多件同類工作 (同一個交易)
+    dedupe_keys 與 payloads 等長；同一個 key 已經有排隊中的工作時略過
+    回傳: 實際新增的工作 ID
+    """
+    if not payloads:
+        return []
+    dedupe_keys = dedupe_keys or [None] * len(payloads)
+    run_after = func.now() + timedelta(seconds=delay)
+    values = [
+        {
+            "kind": kind, "payload": payload or {}, "priority": priority, "dedupe_key": key,
+            "max_attempts": max_attempts, "run_after": run_after,
+        }
+        for payload, key in zip(payloads, dedupe_keys)
+    ]
+
+    ids = []
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(values), 1000):
+            stmt = (
+                pg_insert(BackgroundJob).values(values[start:start + 1000])
+                .on_conflict_do_nothing(index_elements=["dedupe_key"], index_where=BackgroundJob.status == "queued")
+                .returning(BackgroundJob.id)
+            )
+            ids += (await db.execute(stmt)).scalars().all()
+        await db.commit()
+
+    _notify()
+    return ids
+
+
+async def enqueue(kind: str, payload: dict = None, *, dedupe_key: str = None, priority: int = 0,
+                  delay: float = 0, max_attempts: int = 5):
+    """放入一件工作，回傳工作 ID (相同 dedupe_key 已在排隊時回傳 None)"""
+    ids = await enqueue_many(
+        kind, [payload], dedupe_keys=[dedupe_key], priority=priority, delay=delay, max_attempts=max_attempts
+    )
+    return ids[0] if ids else None
+
+
+# ==================== 領取 / 回報 ====================
+
+async def _claim(kind: str, limit: int) -> list:
+    """領取最多 limit 件可執行的工作 (排隊中且已到時間，或租約已過期)，回傳 [(id, payload, attempts, max_attempts), ...]"""
+    now = func.now()
+    candidates = (
+        select(BackgroundJob.id)
+        .where(
+            BackgroundJob.kind == kind,
+            or_(
+                and_(BackgroundJob.status == "queued", BackgroundJob.run_after <= now),
+                and_(BackgroundJob.status == "running", BackgroundJob.lease_until < now),
+            )
+        )
+        .order_by(BackgroundJob.priority.desc(), BackgroundJob.run_after, BackgroundJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(BackgroundJob)
+        .where(BackgroundJob.id.in_(candidates.scalar_subquery()))
+        .values(
+            status="running",
+            locked_by=WORKER_ID,
+            lease_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            attempts=BackgroundJob.attempts + 1,
+        )
+        .returning(BackgroundJob.id, BackgroundJob.payload, BackgroundJob.attempts, BackgroundJob.max_attempts)
+        .execution_options(synchronize_session=False)
+    )
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt)).all()
+        await db.commit()
+    return [tuple(r) for r in rows]
+
+
+def _owned(job_id: int):
+    """只更新仍由自己持有的工作 (租約過期被別人領走後就不能再動)"""
+    return and_(BackgroundJob.id == job_id, BackgroundJob.status == "running", BackgroundJob.locked_by == WORKER_ID)
+
+
+async def _update_owned(job_id: int, **values) -> bool:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(BackgroundJob).where(_owned(job_id)).values(**values).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount > 0
+
+
+async def _requeue(job_id: int, delay: float, error: str = None, refund: bool = False):
+    """放回佇列；同一個 dedupe_key 已經有新的工作在排隊時，這件就交給新的處理"""
+    values = {"status": "queued", "locked_by": None, "lease_until": None, "run_after": func.now() + timedelta(seconds=delay)}
+    if error is not None:
+        values["last_error"] = error
+    if refund:
+        values["attempts"] = BackgroundJob.attempts - 1
+    try:
+        await _update_owned(job_id, **values)
+    except IntegrityError:
+        await _update_owned(job_id, status="done", finished_at=func.now(), last_error="已有相同的工作在排隊，由該工作接手")
+
+
+async def _keep_lease(job_id: int):
+    """執行期間定期續約，避免長時間的工作被其他 worker 當成當掉"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            if not await _update_owned(job_id, lease_until=func.now() + timedelta(seconds=JOB_LEASE_SECONDS)):
+                print(f"⚠️ [JobQueue] 工作 #{job_id} 的租約已被其他 worker 接手")
+                return
+        except Exception as e:
+            print(f"⚠️ [JobQueue] 工作 #{job_id} 續約失敗: {e}")
+
+
+def _record(kind: str, outcome: str, seconds: float):
+    m = _metrics.setdefault(kind, {"done": 0, "retried": 0, "failed": 0, "seconds_total": 0.0})
+    m[outcome] += 1
+    m["seconds_total"] += seconds
+
+
+async def _execute(kind: str, job: tuple):
+    job_id, payload, attempts, max_attempts = job
+    if attempts > max_attempts:
+        # 已用完次數卻又被領取：代表最後一次執行時 worker 當掉了
+        await _update_owned(job_id, status="failed", finished_at=func.now(), last_error="執行期間 worker 中斷，且已超過重試次數")
+        _record(kind, "failed", 0.0)
+        return
+
+    lease = asyncio.create_task(_keep_lease(job_id))
+    started = time.perf_counter()
+    try:
+        await _handlers[kind]["handler"](payload)
+    except asyncio.CancelledError:
+        # bot 關機：放回佇列，這次不算一次嘗試
+        await asyncio.shield(_requeue(job_id, 0, refund=True))
+        raise
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        error = f"{type(e).__name__}: {e}"
+        if attempts < max_attempts and not isinstance(e, PermanentError):
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+            print(f"⚠️ [JobQueue] {kind} #{job_id} 第 {attempts} 次失敗，{delay:.0f} 秒後重試: {error}")
+            await _requeue(job_id, delay, error)
+            _record(kind, "retried", elapsed)
+        else:
+            print(f"❌ [JobQueue] {kind} #{job_id} 第 {attempts} 次失敗，放棄: {error}")
+            await _update_owned(job_id, status="failed", finished_at=func.now(), last_error=error)
+            _record(kind, "failed", elapsed)
+    else:
+        await _update_owned(job_id, status="done", finished_at=func.now(), locked_by=None, lease_until=None)
+        _record(kind, "done", time.perf_counter() - started)
+    finally:
+        lease.cancel()
+
+
+async def _run_slot(kind: str, job: tuple):
+    """一個執行位置：做完手上的工作後，繼續領同類的下一件，直到沒有工作為止"""
+    while job:
+        try:
+            await _execute(kind, job)
+            jobs = await _claim(kind, 1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ [JobQueue] {kind} 執行位置發生錯誤: {e}")
+            return
+        job = jobs[0] if jobs else None
+
+
+# ==================== Worker ====================
+
+async def _purge():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(BackgroundJob).where(
+                BackgroundJob.status.in_(("done", "failed")),
+                BackgroundJob.finished_at < func.now() - timedelta(days=KEEP_FINISHED_DAYS)
+            )
+        )
+        await db.commit()
+    if result.rowcount:
+        print(f"🧹 [JobQueue] 已清除 {result.rowcount} 件舊工作")
+
+
+async def _dispatch_loop():
+    last_purge = 0.0
+    while True:
+        try:
+            for kind, entry in list(_handlers.items()):
+                slots = _running.setdefault(kind, set())
+                free = entry["concurrency"] - len(slots)
+                if free <= 0:
+                    continue
+                for job in await _claim(kind, free):
+                    task = asyncio.create_task(_run_slot(kind, job))
+                    slots.add(task)
+                    task.add_done_callback(slots.discard)
+
+            if time.monotonic() - last_purge > PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                await _purge()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ [JobQueue] 領取工作失敗: {e}")
+
+        try:
+            await asyncio.wait_for(_wake.wait(), JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+
+
+def start():
+    """在目前的事件迴圈啟動 worker (重複呼叫不會重複啟動)"""
+    global _dispatcher, _wake
+    if _dispatcher is not None and not _dispatcher.done():
+        return
+    _wake = asyncio.Event()
+    _dispatcher = asyncio.get_running_loop().create_task(_dispatch_loop())
+    print(f"📮 背景工作佇列啟動 (worker: {WORKER_ID})")
+
+
+async def shutdown():
+    """停止領取新工作，執行中的工作放回佇列"""
+    global _dispatcher
+    tasks = [t for slots in _running.values() for t in slots]
+    if _dispatcher is not None:
+        tasks.append(_dispatcher)
+        _dispatcher = None
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ==================== 查詢 ====================
+
+async def pending_count(kind: str) -> int:
+    """尚未完成 (排隊中或執行中) 的工作數"""
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count()).select_from(BackgroundJob)
+            .where(BackgroundJob.kind == kind, BackgroundJob.status.in_(("queued", "running")))
+        )
+
+
+async def get_stats() -> dict:
+    """各類工作在資料庫中的狀態數量，以及本程序執行的次數與平均耗時"""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(BackgroundJob.kind, BackgroundJob.status, func.count())
+            .group_by(BackgroundJob.kind, BackgroundJob.status)
+        )).all()
+
+    stats = {}
+    for kind, status, count in rows:
+        stats.setdefault(kind, {})[status] = count
+    for kind, m in _metrics.items():
+        runs = m["done"] + m["retried"] + m["failed"]
+        stats.setdefault(kind, {}).update({
+            "processed": m["done"],
+            "retried": m["retried"],
+            "gave_up": m["failed"],
+            "avg_seconds": round(m["seconds_total"] / runs, 2) if runs else 0.0,
+            "running_here": len(_running.get(kind, ())),
+        })
+    return stats
@@ -17,6 +17,9 @@ if not DATABASE_URL:
     raise ValueError("Database URL not found in environment")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+# 非同步連線改用 asyncpg 驅動 (asyncpg 不認得 sslmode，需轉成 ssl)
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1).replace("sslmode=", "ssl=")
     
 FUGLE_TOKEN = os.getenv("FUGLE_TOKEN")
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
@@ -24,5 +27,17 @@ DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 RENDER = os.getenv("RENDER")
 
 FONT_PATH = os.path.join(BASE_DIR, "jf-openhuninn-1.1.ttf")
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))  # 圖表渲染 process pool 的 worker 數量
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))    # 背景工作佇列沒有工作時的輪詢秒數
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))     # 執行中工作的租約秒數 (worker 會定期續約)
+
+# 電子發票平台 (可改指向本機的測試用假平台)
+EINVOICE_BASE_URL = os.getenv("EINVOICE_BASE_URL", "https://www.einvoice.nat.gov.tw").rstrip("/")
+# 匯出 CSV 的 API 路徑：正式平台沒有公開文件，未經確認前不給預設值 (假平台為 /portal/btc/mobile/btc502w/detail/csv)
+EINVOICE_CSV_EXPORT_PATH = os.getenv("EINVOICE_CSV_EXPORT_PATH", "")
+# browser: 用 Selenium 點日曆下載；http: 登入後直接用登入 cookie 打匯出 API (失敗時退回 browser)
+INVOICE_FETCH_MODE = os.getenv("INVOICE_FETCH_MODE", "browser")
+if INVOICE_FETCH_MODE == "http" and not EINVOICE_CSV_EXPORT_PATH:
+    raise ValueError("INVOICE_FETCH_MODE=http 需要設定 EINVOICE_CSV_EXPORT_PATH (匯出 API 的路徑)")
 TW_TZ = timezone(timedelta(hours=8))
 
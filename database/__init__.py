@@ -1,11 +1,12 @@
 # database/__init__.py
-from .db import init_db, SessionLocal
+from .db import init_db, SessionLocal, AsyncSessionLocal
 from .models import *
 
 # 統一匯出清單
 __all__ = [
     "init_db",
     "SessionLocal",
+    "AsyncSessionLocal",
     "Base",
     "User",
     "EmailConfig",
@@ -15,5 +16,7 @@ __all__ = [
     "TrackerCategory",
     "TrackerSubCategory",
     "LifeRecord",
+    "LifeRecordDailyStat",
+    "ConsumptionMemo",
     "UserStockWatch"
 ]
\ No newline at end of file
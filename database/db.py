@@ -1,7 +1,8 @@
 # database/db.py
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import DATABASE_URL, ASYNC_DATABASE_URL
 
 _engine = create_engine(
     DATABASE_URL,
@@ -12,6 +13,17 @@ _engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
 
+# 非同步引擎：給 discord 事件迴圈內的熱路徑使用，查詢等待時不會卡住 gateway 心跳
+_async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args={
+        "timeout": 30
+    }
+)
+# expire_on_commit=False：commit 後仍可讀取物件屬性，避免在 async 環境觸發隱性 lazy load
+AsyncSessionLocal = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db() -> bool:
     """初始化資料庫，建立所有 Table
         return True if succeed
@@ -4,10 +4,12 @@ db_utils.py
 Common database utility functions.
 """
 
-from sqlalchemy import Column
-from database.db import SessionLocal
+from sqlalchemy import Column, DateTime, literal, select
+from database.db import SessionLocal, AsyncSessionLocal
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import BotSettings, User, Memory
+from datetime import datetime
 from functools import wraps
 import inspect
 
@@ -40,17 +42,129 @@ def with_db_decorator(func):
     return wrapper
 
 
+def with_async_db_decorator(func):
+    """
+    Async version of with_db_decorator for coroutine functions.
+    Provides an AsyncSession ('db') so queries await on the event loop instead of blocking it.
+    If an error occurs during connection, it will return None; otherwise it returns original function's result.
+    """
+    sig = inspect.signature(func)
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        bound = sig.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        db = bound.arguments.get("db", None)
+        need_close = False
+        if db is None:
+            db = AsyncSessionLocal()
+            bound.arguments["db"] = db
+            need_close = True
+        try:
+            return await func(*bound.args, **bound.kwargs)
+        except Exception as e:
+            print(f"{func.__module__}.{func.__name__}: ❌ 資料庫互動失敗: {e}")
+            return None
+        finally:
+            if need_close:
+                await db.close()
+    return wrapper
+
+
+def aware_time(dt: datetime):
+    """
+    將帶時區的 datetime 以 timestamptz 型別綁定成查詢參數。
+    asyncpg 不接受把 aware datetime 直接比對 timestamp 欄位，
+    明確指定型別後，比對語意與 psycopg2 版本完全相同。
+    """
+    return literal(dt, DateTime(timezone=True))
+
+
+# BotSettings 快取：guild id -> 整列設定的 dict (None 代表資料庫沒有這筆設定)
+# on_message 每則訊息都要讀取設定，命中快取時完全不碰資料庫；寫入時由 setter 主動失效
+_botsettings_cache: dict = {}
+_botsettings_stats = {"hits": 0, "misses": 0}
+# 每次失效就加一；查詢期間若有失效 (值已變)，查到的舊資料就不寫回快取
+_botsettings_generation = 0
+
+
+def _botsettings_to_dict(obj):
+    if obj is None:
+        return None
+    return {c.key: getattr(obj, c.key) for c in BotSettings.__table__.columns}
+
+
+def _lookup_botsettings_cache(column: Column, ID):
+    """回傳 (是否命中, 欄位值)"""
+    if ID in _botsettings_cache:
+        _botsettings_stats["hits"] += 1
+        row = _botsettings_cache[ID]
+        return True, (row.get(column.key) if row else None)
+    _botsettings_stats["misses"] += 1
+    return False, None
+
+
+def _store_botsettings(ID, obj, generation: int):
+    """查詢開始後沒有發生失效才寫入快取"""
+    if generation == _botsettings_generation:
+        _botsettings_cache[ID] = _botsettings_to_dict(obj)
+
+
+def invalidate_botsettings(ID=None):
+    """讓指定伺服器 (或全部) 的 BotSettings 快取失效"""
+    global _botsettings_generation
+    _botsettings_generation += 1
+    if ID is None:
+        _botsettings_cache.clear()
+    else:
+        _botsettings_cache.pop(ID, None)
+
+
+def get_botsettings_cache_stats() -> dict:
+    hits, misses = _botsettings_stats["hits"], _botsettings_stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "size": len(_botsettings_cache),
+    }
+
+
 # BotSettings getter
 @with_db_decorator
 def get_botsettings(column: Column, ID, db: Session=None):
-    row = db.query(column).filter(BotSettings.id == ID).first()
+    hit, item = _lookup_botsettings_cache(column, ID)
+    if hit:
+        return item
+
+    generation = _botsettings_generation
+    obj = db.query(BotSettings).filter(BotSettings.id == ID).first()
+    _store_botsettings(ID, obj, generation)
     
-    if row is None:
+    if obj is None:
+        print(f"讀取 {column.key} 失敗 (資料不存在)")
+        return None
+
+    return getattr(obj, column.key)
+
+
+# BotSettings async getter (給 on_message 等事件迴圈內的熱路徑使用)
+@with_async_db_decorator
+async def get_botsettings_async(column: Column, ID, db: AsyncSession=None):
+    hit, item = _lookup_botsettings_cache(column, ID)
+    if hit:
+        return item
+
+    generation = _botsettings_generation
+    result = await db.execute(select(BotSettings).where(BotSettings.id == ID))
+    obj = result.scalars().first()
+    _store_botsettings(ID, obj, generation)
+
+    if obj is None:
         print(f"讀取 {column.key} 失敗 (資料不存在)")
         return None
 
-    item = row[0]  # 因為 query 單一欄位，first() 回傳 tuple
-    return item
+    return getattr(obj, column.key)
 
 
 # BotSettings setter
@@ -68,6 +182,7 @@ def set_botsettings(column: Column, value, ID, db: Session=None):
     setattr(obj, column.key, value)
     
     db.commit()
+    invalidate_botsettings(ID)
     print(f"✅ 更新 {column.key} 成功，值={value}")
     return True
 
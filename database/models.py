@@ -1,5 +1,5 @@
 # database/models.py
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Boolean, Text, JSON, func, Float, Date
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Boolean, Text, JSON, func, Float, Date, Index, LargeBinary
 from sqlalchemy.orm import declarative_base, relationship
 # from sqlalchemy.dialects.postgresql import VECTOR  # pgvector
 from datetime import datetime
@@ -41,7 +41,8 @@ class EmailConfig(Base):
     
     email_address = Column(String, nullable=False)
     email_password = Column(String, nullable=False)
-    last_email_id = Column(String, nullable=True)
+    last_email_id = Column(String, nullable=True)        # 最後處理過的信件 UID
+    uid_validity = Column(BigInteger, nullable=True)     # 收件匣的 UIDVALIDITY，變更時代表 UID 全部重編
 
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
@@ -74,6 +75,11 @@ class CategorizedEmail(Base):
 
     category = relationship("EmailCategory", back_populates="emails")
 
+    __table_args__ = (
+        # get_category_emails: 依分類撈信並以 id 由新到舊排序
+        Index('ix_categorized_emails_category_id_id', 'category_id', 'id'),
+    )
+
 class CalendarEvent(Base):
     __tablename__ = 'calendar_events'
 
@@ -86,6 +92,11 @@ class CalendarEvent(Base):
     
     user = relationship("User", back_populates="calendar_events")
 
+    __table_args__ = (
+        # check_reminders 每分鐘以 event_time 做區間掃描
+        Index('ix_calendar_events_event_time', 'event_time'),
+    )
+
 class Memory(Base):
     __tablename__ = "memories"
 
@@ -107,6 +118,7 @@ class TrackerCategory(Base):
     
     last_ai_analysis = Column(Text, nullable=True)
     analysis_updated_at = Column(DateTime, nullable=True)
+    analysis_fingerprint = Column(String(32), nullable=True)  # 上次分析時紀錄的指紋，沒變就不重新分析
 
     created_at = Column(DateTime, default=datetime.now)
 
@@ -133,6 +145,10 @@ class EInvoiceConfig(Base):
     password = Column(String, nullable=True)
     last_fetch_date = Column(Date, nullable=True)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # 上次登入取得的 cookie (Crypto_Helper 加密後的 JSON)，還有效就不必重新過驗證碼
+    session_cookies = Column(Text, nullable=True)
+    session_saved_at = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="einvoice_config")
 
@@ -152,9 +168,86 @@ class LifeRecord(Base):
     note = Column(String, nullable=True) 
     created_at = Column(DateTime, default=datetime.now)
 
+    # 發票匯入的來源 (發票號碼 + 發票日期 + 明細序號)，重複匯入時以此去重；手動紀錄為 NULL
+    # 發票字軌號碼會在之後的期別重新配發，只看號碼會把不同年份的發票當成同一張
+    invoice_number = Column(String(20), nullable=True)
+    invoice_date = Column(Date, nullable=True)
+    invoice_line = Column(Integer, nullable=True)
+
     category = relationship("TrackerCategory", back_populates="records")
     subcategory = relationship("TrackerSubCategory", back_populates="records")
 
+    __table_args__ = (
+        # 統計以 (category_id, created_at) 過濾；紀錄列表以 (created_at, id) 做 keyset 翻頁
+        Index('ix_life_records_category_id_created_at_id', 'category_id', 'created_at', 'id'),
+        Index('uq_life_records_user_invoice_line', 'user_id', 'invoice_number', 'invoice_date', 'invoice_line', unique=True),
+    )
+
+class LifeRecordDailyStat(Base):
+    # 生活紀錄的每日彙總 (分類 × 標籤 × 台灣日期 × 欄位)，統計圖表只需讀這張表
+    __tablename__ = 'life_record_daily_stats'
+
+    category_id = Column(Integer, ForeignKey('tracker_categories.id', ondelete='CASCADE'), primary_key=True)
+    subcat_name = Column(String, primary_key=True)  # 與 LifeRecord.subcat_name 相同，空值記為「其他」
+    day = Column(Date, primary_key=True)            # 台灣時間的日期
+    field = Column(String, primary_key=True)
+
+    total = Column(Float, nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+
+class ConsumptionMemo(Base):
+    # 消費品名 → 標籤的分類記憶，同樣的品名下次直接套用，不用再問 AI
+    __tablename__ = 'consumption_memos'
+
+    user_id = Column(BigInteger, ForeignKey('users.discord_id'), primary_key=True)
+    normalized_name = Column(String, primary_key=True)
+
+    # NULL 代表歸類為「其他」；標籤被刪除時記憶一起刪掉
+    subcategory_id = Column(Integer, ForeignKey('tracker_subcategories.id', ondelete='CASCADE'), nullable=True)
+    source = Column(String(10), nullable=False, default='ai')  # 'ai' / 'manual'，手動的優先
+    hit_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class InvoiceArchive(Base):
+    # 發票原始明細的壓縮封存 (每位使用者每月一列)，新增或修改標籤後可直接重新分類，不必再爬一次
+    __tablename__ = 'invoice_archives'
+
+    user_id = Column(BigInteger, ForeignKey('users.discord_id'), primary_key=True)
+    month = Column(Date, primary_key=True)  # 發票月份 (該月 1 號)
+
+    line_count = Column(Integer, nullable=False, default=0)
+    payload = Column(LargeBinary, nullable=False)  # zlib 壓縮的 JSON 明細列表
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class BackgroundJob(Base):
+    # 背景工作佇列：各模組把工作放進來，由 cogs/job_queue.py 的 worker 以 SKIP LOCKED 搶工作執行
+    __tablename__ = 'background_jobs'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)       # 工作類型 (對應註冊的處理函式)
+    payload = Column(JSON, nullable=False, default=dict)
+    priority = Column(Integer, nullable=False, default=0)  # 數字越大越先執行
+    dedupe_key = Column(String, nullable=True)      # 同一個 key 同時只會有一個排隊中的工作
+
+    status = Column(String(10), nullable=False, default='queued')  # queued / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # 執行中的工作由 worker 持有租約，worker 當掉、租約過期後會被其他 worker 重新領取
+    locked_by = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_background_jobs_claim', 'kind', 'status', 'priority', 'run_after'),
+        Index('uq_background_jobs_queued_dedupe', 'dedupe_key', unique=True,
+              postgresql_where=(status == 'queued')),
+    )
+
 class UserStockWatch(Base):
     __tablename__ = 'user_stock_watch'
 
@@ -182,3 +275,8 @@ class UserStockWatch(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
     user = relationship("User", back_populates="stocks")
+
+    __table_args__ = (
+        # 每位使用者同一檔股票只會有一筆監控
+        Index('uq_user_stock_watch_user_id_stock_symbol', 'user_id', 'stock_symbol', unique=True),
+    )
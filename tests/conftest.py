@@ -0,0 +1,9 @@
+import os
+import sys
+
+# 測試不會連資料庫或呼叫 AI，只是 import 時 config 與各模組需要這些設定存在
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
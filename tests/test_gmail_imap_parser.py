@@ -0,0 +1,93 @@
+import base64
+
+from cogs.Gmail.utils.Gmail_imap_parser import parse_fetch_response, get_item, find_text_part, decode_part
+
+# 以下的 lines 都是 aioimaplib 的 Response.lines 格式：literal 是獨立的 bytearray，其餘的行是 bytes，最後一行是完成訊息
+
+HEADER_1 = b"From: Sender <s@example.com>\r\nSubject: =?utf-8?b?5Li75peo?=\r\nDate: Mon, 19 Oct 2026 10:00:00 +0800\r\n\r\n"
+HEADER_2 = b"From: Other <o@example.com>\r\nSubject: hi\r\n\r\n"
+
+ALTERNATIVE_WITH_ATTACHMENT = (
+    b'(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "8BIT" 44 1)("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "8BIT" 77 1) "ALTERNATIVE")'
+    b'("APPLICATION" "PDF" ("NAME" "a.pdf") NIL NIL "BASE64" 1404 NIL ("ATTACHMENT" ("FILENAME" "a.pdf")) NIL) "MIXED"'
+)
+
+
+def test_parse_literal_headers_for_several_messages():
+    lines = [
+        b'1 FETCH (UID 101 BODYSTRUCTURE (' + ALTERNATIVE_WITH_ATTACHMENT + b') BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {%d}' % len(HEADER_1),
+        bytearray(HEADER_1),
+        b')',
+        b'2 FETCH (UID 102 BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "big5") NIL NIL "QUOTED-PRINTABLE" 12 1 NIL NIL NIL NIL) BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {%d}' % len(HEADER_2),
+        bytearray(HEADER_2),
+        b')',
+        b'Success',
+    ]
+    messages = parse_fetch_response(lines)
+
+    assert sorted(messages) == [101, 102]
+    assert get_item(messages[101], "BODY[HEADER") == HEADER_1
+    assert get_item(messages[102], "BODY[HEADER") == HEADER_2
+    assert messages[102]["BODYSTRUCTURE"][:2] == ["TEXT", "PLAIN"]
+
+
+def test_parse_literal_body_keeps_raw_bytes():
+    body = "中文內文\r\n(括號) \"引號\" {3}\r\n".encode("utf-8")
+    lines = [b'7 FETCH (UID 55 BODY[1.1]<0> {%d}' % len(body), bytearray(body), b')', b'Success']
+    assert get_item(parse_fetch_response(lines)[55], "BODY[1.1]") == body
+
+
+def test_parse_quoted_header_fields_echo_and_quoted_values():
+    # 部分伺服器會把 HEADER.FIELDS 的欄位名稱加上引號回傳；很短的內文也可能用帶引號字串而不是 literal
+    lines = [
+        b'3 FETCH (UID 9 BODY[HEADER.FIELDS ("From" "Subject")] {%d}' % len(HEADER_2),
+        bytearray(HEADER_2),
+        b' BODY[TEXT]<0> "say \\"hi\\"")',
+        b'4 FETCH (UID 10 BODY[TEXT]<0> NIL)',
+        b'Success',
+    ]
+    messages = parse_fetch_response(lines)
+    assert get_item(messages[9], "BODY[HEADER") == HEADER_2
+    assert get_item(messages[9], "BODY[TEXT]") == 'say "hi"'
+    assert get_item(messages[10], "BODY[TEXT]") is None
+
+
+def test_find_text_part_nested_multipart_with_attachment():
+    structure = parse_fetch_response([b'1 FETCH (UID 1 BODYSTRUCTURE (' + ALTERNATIVE_WITH_ATTACHMENT + b'))', b'Success'])[1]["BODYSTRUCTURE"]
+    assert find_text_part(structure) == ("1.1", False, "8bit", "utf-8")
+
+
+def test_find_text_part_skips_text_attachment_and_falls_back_to_last_html():
+    structure = [
+        ["TEXT", "HTML", ["CHARSET", "utf-8"], None, None, "7BIT", "10", "1"],
+        ["TEXT", "PLAIN", ["CHARSET", "utf-8"], None, None, "BASE64", "10", "1", None, ["ATTACHMENT", ["FILENAME", "a.txt"]], None],
+        ["TEXT", "HTML", ["CHARSET", "big5"], None, None, "QUOTED-PRINTABLE", "10", "1"],
+        "MIXED",
+    ]
+    # 與原本的 msg.walk() 邏輯相同：沒有 text/plain 時採用最後一個 text/html
+    assert find_text_part(structure) == ("3", True, "quoted-printable", "big5")
+
+
+def test_find_text_part_single_part_uses_text_section():
+    structure = ["TEXT", "PLAIN", ["CHARSET", "big5"], None, None, "QUOTED-PRINTABLE", "12", "1", None, None, None, None]
+    assert find_text_part(structure) == ("TEXT", False, "quoted-printable", "big5")
+    assert find_text_part(["APPLICATION", "PDF", None, None, None, "BASE64", "100", None]) is None
+
+
+def test_decode_truncated_base64():
+    encoded = base64.encodebytes("héllo wörld，你好".encode("utf-8"))
+    # 取內文前 N bytes 時會在 base64 字元組或 UTF-8 字元的中間截斷
+    text = decode_part(encoded[:21], "base64", "utf-8")
+    assert text.startswith("héllo wörld")
+    assert decode_part(encoded, "base64", "utf-8") == "héllo wörld，你好"
+
+
+def test_decode_truncated_quoted_printable():
+    assert decode_part(b"caf=C3=A9 =E4=BD=A0=E5=A5=BD", "quoted-printable", "utf-8") == "café 你好"
+    # 截在多位元組字元或 =XX 跳脫序列的中間時，不會拋出例外
+    assert decode_part(b"caf=C3=A9 =E4=BD", "quoted-printable", "utf-8").startswith("café ")
+    assert decode_part(b"caf=C3=A9 =E", "quoted-printable", "utf-8").startswith("café ")
+
+
+def test_decode_unknown_charset_falls_back_to_utf8():
+    assert decode_part("你好".encode("utf-8"), "8bit", "x-unknown") == "你好"